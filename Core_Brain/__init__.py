@@ -1,7 +1,8 @@
 import logging
 from .speech_to_text import SpeechToText 
 from .text_to_speech import TextToSpeech 
-from .memory_manager import MemoryManager
+from .memory_manager import MemoryManager, PersistentMemoryManager
+from .memory_store import MEMORY_DB_PATH
 from .nlp_engine.nlp_engine import NLPEngine
 
 # Configure logging for the core brain
@@ -39,7 +40,8 @@ def _initialize_components():
         components['nlp'] = None
     
     try:
-        components['memory'] = MemoryManager()
+        # With MEMORY_DB_PATH set, conversations persist and are shared by the host's workers
+        components['memory'] = PersistentMemoryManager() if MEMORY_DB_PATH else MemoryManager()
         logger.info("Memory Manager initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize Memory Manager: {e}")
@@ -62,6 +64,7 @@ __all__ = [
     'TextToSpeech', 
     'NLPEngine',
     'MemoryManager',
+    'PersistentMemoryManager',
     'stt',
     'tts',
     'nlp', 
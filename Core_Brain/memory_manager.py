@@ -1,53 +1,345 @@
 from cryptography.fernet import Fernet
+import os
+import json
+import time
 import uuid
+import threading
+from collections import OrderedDict, deque
 from datetime import datetime
+
+try:
+    from .memory_store import MemoryStore, MEMORY_DB_PATH
+except ImportError:
+    # Loaded as a top-level module, as benchmark_memory.py does
+    from memory_store import MemoryStore, MEMORY_DB_PATH
+
+# Turns kept per session, and in total across sessions
+MEMORY_SESSION_DEPTH = int(os.getenv("MEMORY_SESSION_DEPTH", "5"))
+MEMORY_MAX_ENTRIES = int(os.getenv("MEMORY_MAX_ENTRIES", "10000"))
+# Sessions whose turns are held decrypted; the rest stay sealed until they are read again
+MEMORY_WORKING_SET = int(os.getenv("MEMORY_WORKING_SET", "1000"))
+# Fernet key for turns that outlive the process; every worker must share it
+MEMORY_ENCRYPTION_KEY = os.getenv("MEMORY_ENCRYPTION_KEY")
+
+
+def _zero(buffer):
+    """Overwrite a plaintext buffer in place before it is let go."""
+    buffer[:] = bytes(len(buffer))
+
+
+class _Session:
+    """
+    One session's turns: decrypted (user, echo, timestamp) entries while the
+    session is in the working set, and the token they were last sealed into.
+    dirty means turns were added since that seal.
+    """
+    __slots__ = ("turns", "sealed", "count", "dirty")
+
+    def __init__(self, depth):
+        self.turns = deque(maxlen=depth)
+        self.sealed = None
+        self.count = 0
+        self.dirty = False
+
+    def wipe(self):
+        if self.turns is not None:
+            for user, echo, _ in self.turns:
+                _zero(user)
+                _zero(echo)
+            self.turns = None
+
+
 class MemoryManager:
-    def __init__(self , key = None):
+    """
+    Encrypted conversation turns indexed by session. Each session holds a deque
+    of its last session_depth turns, so appending, looking up and clearing a
+    session cost the same however many sessions exist. Once more than
+    max_entries turns are stored in total, the least recently used sessions
+    are dropped whole.
+
+    The turns of the working_set most recently used sessions are held in
+    plaintext buffers, so building a reply's context costs no cryptography.
+    A session leaving the working set is sealed - all its turns encrypted as one
+    Fernet token - and its buffers are zeroed; reading it again decrypts that
+    token once. seal_pending() seals every session with unsealed turns, for a
+    caller that persists them.
+    """
+    # Lookups never wait on I/O, so async callers may make them on the event loop
+    blocking = False
+
+    def __init__(self , key = None, session_depth = MEMORY_SESSION_DEPTH, max_entries = MEMORY_MAX_ENTRIES,
+                 working_set = MEMORY_WORKING_SET):
         if key is None:
             key = Fernet.generate_key()
         self.fernet = Fernet(key)
 
-        self.history = []
+        self.session_depth = session_depth
+        self.max_entries = max_entries
+        self.working_set = max(1, working_set)
+        # session id -> _Session, least recently used first
+        self.sessions = OrderedDict()
+        # ids of the sessions holding plaintext, least recently used first
+        self.working = OrderedDict()
+        self.entries = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "appends": 0, "unsessioned": 0, "lookups": 0, "evicted_sessions": 0, "evicted_entries": 0,
+            "working_set_hits": 0, "working_set_misses": 0, "seals": 0, "sealed_turns": 0, "unseals": 0
+        }
+
+    def _seal(self, session):
+        payload = json.dumps([
+            [user.decode(), echo.decode(), timestamp] for user, echo, timestamp in session.turns
+        ]).encode()
+        session.sealed = self.fernet.encrypt(payload)
+        session.dirty = False
+        self.stats["seals"] += 1
+        self.stats["sealed_turns"] += len(session.turns)
+
+    def _unseal(self, session):
+        turns = json.loads(self.fernet.decrypt(session.sealed))
+        session.turns = deque(
+            ((bytearray(user.encode()), bytearray(echo.encode()), timestamp) for user, echo, timestamp in turns),
+            maxlen=self.session_depth
+        )
+        self.stats["unseals"] += 1
+
+    def _load(self, session_id, session):
+        """Bring the session into the working set, decrypting it if it was sealed away."""
+        if session.turns is None:
+            self.stats["working_set_misses"] += 1
+            self._unseal(session)
+        else:
+            self.stats["working_set_hits"] += 1
+        self.working[session_id] = None
+        self.working.move_to_end(session_id)
+
+        while len(self.working) > self.working_set:
+            evicted_id, _ = self.working.popitem(last=False)
+            evicted = self.sessions[evicted_id]
+            if evicted.dirty:
+                self._seal(evicted)
+            evicted.wipe()
+
+    def _drop(self, session_id):
+        session = self.sessions.pop(session_id)
+        self.working.pop(session_id, None)
+        self.entries -= session.count
+        session.wipe()
+        return session
+
+    def _evict(self):
+        # The caller holds the lock; the session just written is the most recent and stays
+        while self.entries > self.max_entries and len(self.sessions) > 1:
+            session = self._drop(next(iter(self.sessions)))
+            self.stats["evicted_sessions"] += 1
+            self.stats["evicted_entries"] += session.count
 
     def add_memory(self, user ,echo , session_id = None):
         if not session_id:
-            session_id = str(uuid.uuid4())
+            # No later lookup could ever return the turn, and sharing one bucket would leak it to others
+            with self._lock:
+                self.stats["unsessioned"] += 1
+            return
+        entry = (bytearray(user.encode()), bytearray(echo.encode()), datetime.now().isoformat())
 
-        encrypted_user = self.fernet.encrypt(user.encode()).decode()
-        encrypted_echo = self.fernet.encrypt(echo.encode()).decode()
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = _Session(self.session_depth)
+            else:
+                self.sessions.move_to_end(session_id)
+            self._load(session_id, session)
 
-        self.history.append({
-            "session": session_id,
-            "user": encrypted_user,
-            "echo": encrypted_echo,
-            "timestamp": datetime.now().isoformat()
-            })
-            
-        if len(self.history) > 5:
-            self.history.pop(0)
+            if len(session.turns) == session.turns.maxlen:
+                # The deque drops its oldest turn
+                oldest_user, oldest_echo, _ = session.turns[0]
+                _zero(oldest_user)
+                _zero(oldest_echo)
+            else:
+                session.count += 1
+                self.entries += 1
+            session.turns.append(entry)
+            session.dirty = True
+            self.stats["appends"] += 1
+            self._evict()
 
 
-    def get_context_text(self , session_id = None):
-        session_history = [
-            msg for msg in self.history if msg["session"] == session_id
-        ]
+    def get_context_turns(self , session_id = None):
+        """Decrypted (user, echo) pairs for the session, oldest first; none without a session id"""
+        if not session_id:
+            return []
+        with self._lock:
+            self.stats["lookups"] += 1
+            session = self.sessions.get(session_id)
+            if session is None:
+                return []
+            self.sessions.move_to_end(session_id)
+            self._load(session_id, session)
+            return [(user.decode(), echo.decode()) for user, echo, _ in session.turns]
 
+
+    def get_context_text(self , session_id = None):
         return "\n".join([
-            f"User: {self.fernet.decrypt(msg['user'].encode()).decode()}\n"
-            f"Echo: {self.fernet.decrypt(msg['echo'].encode()).decode()}"
-            for msg in session_history
+            f"User: {user}\n"
+            f"Echo: {echo}"
+            for user, echo in self.get_context_turns(session_id)
         ])
 
-        
+
+    def seal_pending(self):
+        """Seal every session with turns added since its last seal; returns {session_id: token}."""
+        with self._lock:
+            sealed = {}
+            for session_id, session in self.sessions.items():
+                if session.dirty:
+                    self._seal(session)
+                    sealed[session_id] = session.sealed
+            return sealed
+
+
     # Inside MemoryManager class
     def clear_memory(self , session_id = None):
-        if session_id:
-            self.history = [
-                msg for msg in self.history if msg["session"] != session_id
-            ]
+        """Forget one session, or every session when none is given"""
+        with self._lock:
+            if session_id:
+                if session_id in self.sessions:
+                    self._drop(session_id)
+            else:
+                for session in self.sessions.values():
+                    session.wipe()
+                self.sessions.clear()
+                self.working.clear()
+                self.entries = 0
+
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, sessions=len(self.sessions), entries=self.entries,
+                        working_sessions=len(self.working), session_depth=self.session_depth,
+                        max_entries=self.max_entries, working_set=self.working_set)
+
+
+
+
+class PersistentMemoryManager(MemoryManager):
+    """
+    MemoryManager backed by a MemoryStore (SQLite in WAL mode): context survives
+    restarts, and every worker on the host reads the same conversations.
+    Turns are written behind, in batches, off the request thread. A lookup is
+    one indexed range query for the session's newest session_depth turns plus
+    this process's writes still queued; turns decrypted before stay in the
+    plaintext working set, so only turns written by other workers cost a
+    decryption. The store prunes turns itself (MEMORY_DB_KEEP_PER_SESSION,
+    MEMORY_DB_MAX_AGE), so max_entries does not apply.
+    The key must be the same for every worker and across restarts.
+    """
+    # Lookups query SQLite
+    blocking = True
+
+    def __init__(self , key = None, path = None, session_depth = MEMORY_SESSION_DEPTH,
+                 working_set = MEMORY_WORKING_SET):
+        key = key or MEMORY_ENCRYPTION_KEY
+        if not key:
+            raise ValueError("PersistentMemoryManager needs a fixed key: set MEMORY_ENCRYPTION_KEY")
+        super().__init__(key, session_depth=session_depth, working_set=working_set)
+        self.store = MemoryStore(path or MEMORY_DB_PATH, self.fernet)
+
+    def _cached(self, session_id):
+        """The session's plaintext turns, turn id -> (created_at, user, echo); the caller holds the lock."""
+        turns = self.working.get(session_id)
+        if turns is None:
+            turns = self.working[session_id] = {}
+            while len(self.working) > self.working_set:
+                _, evicted = self.working.popitem(last=False)
+                for turn_id in list(evicted):
+                    self._forget(evicted, turn_id)
         else:
-            self.history = []
+            self.working.move_to_end(session_id)
+        return turns
+
+    @staticmethod
+    def _forget(turns, turn_id):
+        _, user, echo = turns.pop(turn_id)
+        _zero(user)
+        _zero(echo)
+
+    def _trim(self, turns, keep=None):
+        """Zero and drop turns not in `keep`, then all but the newest session_depth."""
+        if keep is not None:
+            for turn_id in [turn_id for turn_id in turns if turn_id not in keep]:
+                self._forget(turns, turn_id)
+        while len(turns) > self.session_depth:
+            self._forget(turns, min(turns, key=lambda turn_id: turns[turn_id][0]))
+
+    def add_memory(self, user ,echo , session_id = None):
+        if not session_id:
+            with self._lock:
+                self.stats["unsessioned"] += 1
+            return
+        turn_id = uuid.uuid4().hex
+        created_at = time.time()
+
+        with self._lock:
+            turns = self._cached(session_id)
+            turns[turn_id] = (created_at, bytearray(user.encode()), bytearray(echo.encode()))
+            self._trim(turns)
+            self.stats["appends"] += 1
+        self.store.append(session_id, turn_id, user, echo, created_at)
+
+
+    def get_context_turns(self , session_id = None):
+        """Decrypted (user, echo) pairs for the session, oldest first; none without a session id"""
+        if not session_id:
+            return []
+        # Snapshot the queued writes first: a turn committed after this shows up in the query
+        pending = self.store.pending_ids(session_id)
+        rows = self.store.recent(session_id, self.session_depth)
+
+        with self._lock:
+            turns = self._cached(session_id)
+            missing = [(turn_id, created_at, payload) for turn_id, created_at, payload in rows if turn_id not in turns]
+        # Only turns this process has not seen (written by another worker) are decrypted
+        decrypted = [(turn_id, created_at) + self.store.decrypt(payload) for turn_id, created_at, payload in missing]
+
+        with self._lock:
+            self.stats["lookups"] += 1
+            self.stats["working_set_hits"] += len(rows) - len(missing)
+            self.stats["working_set_misses"] += len(missing)
+            self.stats["unseals"] += len(missing)
+            turns = self._cached(session_id)
+            for turn_id, created_at, user, echo in decrypted:
+                turns[turn_id] = (created_at, bytearray(user.encode()), bytearray(echo.encode()))
+            self._trim(turns, keep={row[0] for row in rows} | pending)
+            return [
+                (user.decode(), echo.decode())
+                for _, user, echo in sorted(turns.values(), key=lambda turn: turn[0])
+            ]
+
+
+    def flush(self):
+        """Block until every queued turn is committed to the store."""
+        self.store.flush()
+
+
+    def clear_memory(self , session_id = None):
+        """Forget one session, or every session when none is given, in this worker and in the store"""
+        with self._lock:
+            for cached_id in ([session_id] if session_id else list(self.working)):
+                turns = self.working.pop(cached_id, None)
+                for turn_id in list(turns or ()):
+                    self._forget(turns, turn_id)
+        self.store.clear(session_id or None)
+        self.store.flush()
+
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats, working_sessions=len(self.working), session_depth=self.session_depth,
+                         working_set=self.working_set)
+        stats["store"] = self.store.get_stats()
+        return stats
 
 
 #     def get_content(self):
-#         return self.history
\ No newline at end of file
+#         return self.history
@@ -0,0 +1,275 @@
+# Durable conversation turns in SQLite, shared by every worker on a host
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import sqlite3
+import threading
+
+from dotenv import load_dotenv
+
+# The memory settings here and in memory_manager.py are read at import; .env comes first
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Where turns are stored; empty keeps memory in process only
+MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", "")
+# The write-behind thread commits up to this many queued writes per transaction,
+# waiting at most this long (seconds) for a batch to fill
+MEMORY_DB_BATCH = int(os.getenv("MEMORY_DB_BATCH", "200"))
+MEMORY_DB_FLUSH_INTERVAL = float(os.getenv("MEMORY_DB_FLUSH_INTERVAL", "0.05"))
+# A failed batch (e.g. "database is locked") is retried this many times, backing off
+# from the base delay (seconds), doubling up to 2s, before its writes are dropped
+MEMORY_DB_WRITE_RETRIES = int(os.getenv("MEMORY_DB_WRITE_RETRIES", "5"))
+MEMORY_DB_RETRY_DELAY = float(os.getenv("MEMORY_DB_RETRY_DELAY", "0.1"))
+# Retention, applied by the write-behind thread: turns kept per session (0 keeps all)
+# and the age (seconds) after which turns are deleted (0 never expires them)
+MEMORY_DB_KEEP_PER_SESSION = int(os.getenv("MEMORY_DB_KEEP_PER_SESSION", "100"))
+MEMORY_DB_MAX_AGE = float(os.getenv("MEMORY_DB_MAX_AGE", "0"))
+
+# Schema versions, applied in order and recorded in PRAGMA user_version
+MIGRATIONS = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS turns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            turn_id TEXT NOT NULL UNIQUE,
+            session_id TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            payload BLOB NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_turns_session_time ON turns (session_id, created_at)",
+    ]),
+    (2, [
+        # Age-based retention deletes across sessions
+        "CREATE INDEX IF NOT EXISTS idx_turns_time ON turns (created_at)",
+    ]),
+]
+
+
+class MemoryStore:
+    """
+    Encrypted turns in a SQLite file in WAL mode, so readers never wait on the
+    writer and every process on the host sees the same conversations.
+    append() and clear() only queue the write; a background thread encrypts
+    queued turns with `fernet` and commits them in batches, in order. recent()
+    is one range query on the (session_id, created_at) index. Writes still
+    queued are listed by pending_ids() so callers can read their own writes.
+    Each batch also prunes the sessions it wrote to down to their newest
+    keep_per_session turns, and deletes turns older than max_age.
+    A batch that fails is retried in place with backoff, so later writes stay
+    behind it and its turns stay pending until it commits or is given up.
+    """
+    def __init__(self, path, fernet, batch_size=MEMORY_DB_BATCH, flush_interval=MEMORY_DB_FLUSH_INTERVAL,
+                 keep_per_session=MEMORY_DB_KEEP_PER_SESSION, max_age=MEMORY_DB_MAX_AGE,
+                 write_retries=MEMORY_DB_WRITE_RETRIES, retry_delay=MEMORY_DB_RETRY_DELAY):
+        self.path = path
+        self.fernet = fernet
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.keep_per_session = keep_per_session
+        self.max_age = max_age
+        self.write_retries = write_retries
+        self.retry_delay = retry_delay
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._pending = {}
+        self.stats = {"queued": 0, "written": 0, "cleared": 0, "batches": 0, "write_errors": 0, "reads": 0,
+                      "pruned": 0, "dropped": 0}
+
+        self.schema_version = self._migrate()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        # sqlite3 connections must not cross threads or forks
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _migrate(self) -> int:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Read under the write lock, so concurrent workers migrate once
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, statements in MIGRATIONS:
+                if target > version:
+                    for statement in statements:
+                        conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version = {target}")
+                    logger.info(f"Memory store {self.path} migrated to schema version {target}")
+                    version = target
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return version
+
+    def _writer_queue(self):
+        """The queue of this process's writer thread, started on first use and again after a fork."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pending = {}
+                threading.Thread(target=self._run, args=(self._queue,), name="memory-store-writer", daemon=True).start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def append(self, session_id, turn_id, user, echo, created_at):
+        write_queue = self._writer_queue()
+        with self._lock:
+            self._pending.setdefault(session_id, set()).add(turn_id)
+            self.stats["queued"] += 1
+        write_queue.put(("append", session_id, turn_id, user, echo, created_at))
+
+    def clear(self, session_id=None):
+        """Delete one session's turns, or all turns, after every write queued before it."""
+        self._writer_queue().put(("clear", session_id))
+
+    def flush(self):
+        """Block until every queued write is committed."""
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def pending_ids(self, session_id) -> set:
+        with self._lock:
+            return set(self._pending.get(session_id, ()))
+
+    def recent(self, session_id, limit):
+        """
+        The session's newest `limit` turns as (turn_id, created_at, payload),
+        oldest first. Payloads are still encrypted; decrypt() gives (user, echo).
+        """
+        rows = self._connect().execute(
+            "SELECT turn_id, created_at, payload FROM turns WHERE session_id = ? "
+            "ORDER BY created_at DESC LIMIT ?",
+            (session_id, limit)
+        ).fetchall()
+        with self._lock:
+            self.stats["reads"] += 1
+        return rows[::-1]
+
+    def decrypt(self, payload):
+        user, echo = json.loads(self.fernet.decrypt(payload))
+        return user, echo
+
+    def _run(self, write_queue):
+        while True:
+            batch = [write_queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(write_queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self._write_with_retries(batch)
+            finally:
+                with self._lock:
+                    for operation in batch:
+                        if operation[0] == "append":
+                            ids = self._pending.get(operation[1])
+                            if ids is not None:
+                                ids.discard(operation[2])
+                                if not ids:
+                                    del self._pending[operation[1]]
+                for _ in batch:
+                    write_queue.task_done()
+
+    def _write_with_retries(self, batch):
+        for attempt in range(self.write_retries + 1):
+            try:
+                self._write(batch)
+                return
+            except Exception as e:
+                # A connection left in a bad state is replaced on the next attempt
+                conn, self._local.conn = getattr(self._local, "conn", None), None
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+                with self._lock:
+                    self.stats["write_errors"] += 1
+                if attempt == self.write_retries:
+                    logger.error(f"Memory store write of {len(batch)} operations failed, dropping it: {e}")
+                    with self._lock:
+                        self.stats["dropped"] += len(batch)
+                    return
+                delay = min(self.retry_delay * 2 ** attempt, 2.0)
+                logger.warning(f"Memory store write of {len(batch)} operations failed, retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+
+    def _write(self, batch):
+        # Encrypt before taking the write lock, so other workers wait only for the inserts
+        rows = []
+        for operation in batch:
+            if operation[0] == "append":
+                _, session_id, turn_id, user, echo, created_at = operation
+                payload = self.fernet.encrypt(json.dumps([user, echo]).encode())
+                rows.append(("append", (turn_id, session_id, created_at, payload)))
+            else:
+                rows.append(operation)
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for kind, values in rows:
+                if kind == "append":
+                    conn.execute(
+                        "INSERT OR IGNORE INTO turns (turn_id, session_id, created_at, payload) VALUES (?, ?, ?, ?)",
+                        values
+                    )
+                elif values is None:
+                    conn.execute("DELETE FROM turns")
+                else:
+                    conn.execute("DELETE FROM turns WHERE session_id = ?", (values,))
+            pruned = self._prune(conn, {values[1] for kind, values in rows if kind == "append"})
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+        with self._lock:
+            self.stats["pruned"] += pruned
+            self.stats["batches"] += 1
+            self.stats["written"] += sum(1 for kind, _ in rows if kind == "append")
+            self.stats["cleared"] += sum(1 for kind, _ in rows if kind == "clear")
+
+    def _prune(self, conn, session_ids) -> int:
+        """Apply retention inside the batch's transaction; only sessions that just grew can exceed the cap."""
+        pruned = 0
+        if self.keep_per_session > 0:
+            for session_id in session_ids:
+                pruned += conn.execute(
+                    "DELETE FROM turns WHERE session_id = ? AND id NOT IN ("
+                    "SELECT id FROM turns WHERE session_id = ? ORDER BY created_at DESC LIMIT ?)",
+                    (session_id, session_id, self.keep_per_session)
+                ).rowcount
+        if self.max_age > 0:
+            pruned += conn.execute(
+                "DELETE FROM turns WHERE created_at < ?", (time.time() - self.max_age,)
+            ).rowcount
+        return pruned
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, pending=sum(len(ids) for ids in self._pending.values()))
+        stats.update(
+            path=self.path,
+            schema_version=self.schema_version,
+            avg_batch=round(stats["written"] / stats["batches"], 2) if stats["batches"] else 0.0
+        )
+        return stats
@@ -1,4 +1,16 @@
 from .nlp_engine import NLPEngine
+from .config import DEFAULT_MODEL, SUPPORTED_INTENTS
+from .backends import LLMBackend, GroqBackend, OpenAICompatibleBackend, StandInBackend, get_backend
+from .errors import (
+    LLMError, LLMTimeoutError, LLMConnectionError, LLMRateLimitError,
+    LLMHTTPError, LLMResponseError, CircuitOpenError
+)
+
+# The async engine needs httpx; the sync engine works without it
+try:
+    from .async_engine import AsyncNLPEngine
+except ImportError:
+    AsyncNLPEngine = None
 
 # Package metadata
 __version__ = "1.0.0"
@@ -8,17 +20,19 @@ __description__ = "NLP Engine for intent detection and emotion analysis"
 # Export main classes/functions
 __all__ = [
     'NLPEngine',
-]
-
-DEFAULT_MODEL = "llama3-8b-8192"
-SUPPORTED_INTENTS = [
-    "greeting", 
-    "question", 
-    "request", 
-    "get_weather", 
-    "emotional_support", 
-    "manipulation_check", 
-    "unknown"
+    'AsyncNLPEngine',
+    'LLMBackend',
+    'GroqBackend',
+    'OpenAICompatibleBackend',
+    'StandInBackend',
+    'get_backend',
+    'LLMError',
+    'LLMTimeoutError',
+    'LLMConnectionError',
+    'LLMRateLimitError',
+    'LLMHTTPError',
+    'LLMResponseError',
+    'CircuitOpenError',
 ]
 
 def create_nlp_engine(model_name=None):
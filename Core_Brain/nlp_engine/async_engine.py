@@ -0,0 +1,487 @@
+# Non-blocking counterpart of NLPEngine for ASGI serving
+import time
+import asyncio
+import functools
+
+import httpx
+
+from .config import (
+    CACHE_LABEL_TTL, CLASSIFIER_TIMEOUT, HTTP_POOL_MAXSIZE, BATCH_PACK_SIZE, BATCH_CONCURRENCY,
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, SPECULATIVE_RECHECK_INTENTS
+)
+from .nlp_engine import NLPEngine, RetryBudget, STREAM_DONE
+from .single_flight import AsyncSingleFlight, payload_key
+from .errors import LLMError, LLMTimeoutError, LLMConnectionError, error_for_status
+from .rate_limiter import RateLimitTimeoutError, estimate_request_tokens
+from .prompt_builder import history_turns
+from .hedging import run_hedged_async
+from .load_shedding import FULL, LOCAL_LABELS, CANNED
+
+
+class AsyncNLPEngine(NLPEngine):
+    """
+    Same surface as NLPEngine (call_groq_model, detect_*, classify, analyze,
+    analyze_stream) but every method that talks to the model is a coroutine.
+    HTTP goes through one pooled httpx.AsyncClient and retries back off with
+    asyncio.sleep, so a waiting call never holds a thread. The retry policy and
+    circuit breaker are the ones the sync engine uses. Cache and memory lookups
+    that can block on SQLite run on worker threads.
+
+    Prompt construction and response parsing are inherited unchanged.
+    """
+    def __init__(self, model_name="llama3-8b-8192", analysis_mode=None, emotion_mode=None, backend=None):
+        super().__init__(
+            model_name=model_name, analysis_mode=analysis_mode, emotion_mode=emotion_mode, backend=backend
+        )
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=HTTP_POOL_MAXSIZE
+            ),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        )
+        self.async_requests = 0
+        self.async_single_flight = AsyncSingleFlight()
+        # Prompts are built synchronously, so an LLM summary would block the event loop
+        self.prompt_builder.summarizer = None
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    @staticmethod
+    async def _off_loop(blocking, fn, *args, **kwargs):
+        """fn(*args, **kwargs) on a worker thread when it can block on SQLite, inline otherwise"""
+        if blocking:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    @property
+    def _cache_blocks(self) -> bool:
+        return self.cache is not None and self.cache.blocking
+
+    async def _cache_get_async(self, kind, text, **key_parts):
+        return await self._off_loop(self._cache_blocks, self._cache_get, kind, text, **key_parts)
+
+    def _cache_set(self, kind, text, value, ttl=CACHE_LABEL_TTL, **key_parts):
+        # A blocking cache is written on a worker thread; nothing waits for it
+        if self._cache_blocks:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                write = functools.partial(super()._cache_set, kind, text, value, ttl, **key_parts)
+                loop.run_in_executor(None, write)
+                return
+        super()._cache_set(kind, text, value, ttl, **key_parts)
+
+    async def _history_turns(self, memory_manager, session_id):
+        return await self._off_loop(
+            getattr(memory_manager, "blocking", False), history_turns, memory_manager, session_id
+        )
+
+    async def call_groq_model(self, messages, max_tokens=None, temperature=None, response_format=None,
+                              task="reply", personality=None, intent=None, stop=None):
+        """Call the LLM backend without blocking the event loop"""
+        max_tokens, stop = self._apply_reply_policy(intent, personality, max_tokens, stop)
+        route = self._resolve_route(task, personality, max_tokens, temperature)
+        payload = self._build_payload(messages, route, response_format=response_format, stop=stop)
+        completion = await self.async_single_flight.do(
+            payload_key(payload), lambda: self._request_completion(payload, route["timeout"], task)
+        )
+        if intent is not None:
+            return self.finish_reply(completion, intent, route["max_tokens"])
+        return completion
+
+    async def _request_completion(self, payload: dict, timeout: float = None, task: str = None) -> str:
+        deadline = self.retry_policy.start(timeout)
+        tokens = estimate_request_tokens(payload)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                async with self.rate_limiter.slot_async(tokens, deadline):
+                    content = await self._send_attempt(payload, deadline, task, tokens)
+            except RateLimitTimeoutError as e:
+                self.call_stats.record_error(e)
+                raise
+            except LLMError as e:
+                self.breaker.record_failure(e)
+                await self._penalize_rate_limit_async(e, attempt)
+                await asyncio.sleep(self._retry_delay(attempt, e, deadline))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return content
+
+    async def _send_attempt(self, payload: dict, deadline: float, task: str, tokens: int) -> str:
+        async def attempt():
+            return await self._send_completion(payload, self.retry_policy.remaining(deadline))
+
+        if not self.hedging.applies(task):
+            return await attempt()
+        return await run_hedged_async(self.hedging, task, attempt, admit=lambda: self._admit_hedge_async(tokens))
+
+    async def _admit_hedge_async(self, tokens: int):
+        """_admit_hedge without blocking the event loop on the limiter's store"""
+        if not self.rate_limiter.enabled:
+            return lambda: None
+        wait, lease_id = await self.rate_limiter.try_acquire_async(tokens, lease_ttl=60.0)
+        if wait > 0:
+            return None
+        return lambda: self.rate_limiter.release_nowait(lease_id)
+
+    async def _penalize_rate_limit_async(self, error, attempt):
+        seconds = self._rate_limit_pause(error, attempt)
+        if seconds is not None:
+            await self.rate_limiter.penalize_async(seconds)
+
+    def _attempt_timeout(self, remaining: float):
+        connect, read = super()._attempt_timeout(remaining)
+        return httpx.Timeout(read, connect=connect)
+
+    async def _send_completion(self, payload: dict, remaining: float) -> str:
+        try:
+            self.async_requests += 1
+            response = await self.client.post(
+                self.api_url, headers=self.headers, json=payload, timeout=self._attempt_timeout(remaining)
+            )
+        except httpx.TimeoutException as e:
+            raise LLMTimeoutError(f"Request timed out: {e!r}") from e
+        except httpx.HTTPError as e:
+            raise LLMConnectionError(f"Request Error: {e!r}") from e
+
+        if response.status_code != 200:
+            raise error_for_status(response.status_code, response.headers, response.text)
+        return self._completion_content(payload, response.content)
+
+    async def stream_groq_model(self, messages, max_tokens=None, temperature=None, task="reply", personality=None,
+                                intent=None, stop=None):
+        """Async generator of content deltas. Retries only before the first token."""
+        max_tokens, stop = self._apply_reply_policy(intent, personality, max_tokens, stop)
+        route = self._resolve_route(task, personality, max_tokens, temperature)
+        payload = self._build_payload(messages, route, stream=True, stop=stop)
+        deadline = self.retry_policy.start(route["timeout"])
+        tokens = estimate_request_tokens(payload)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            streamed = []
+            try:
+                async with self.rate_limiter.slot_async(tokens, deadline):
+                    async for delta in self._stream_completion(payload, self.retry_policy.remaining(deadline)):
+                        streamed.append(delta)
+                        yield delta
+            except RateLimitTimeoutError as e:
+                self.call_stats.record_error(e)
+                raise
+            except LLMError as e:
+                self.breaker.record_failure(e)
+                await self._penalize_rate_limit_async(e, attempt)
+                if streamed:
+                    self.call_stats.record_error(e)
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt, e, deadline))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            self._record_usage(payload, None, "".join(streamed))
+            if intent is not None:
+                self.finish_reply("".join(streamed), intent, route["max_tokens"], trim=False)
+            return
+
+    async def _stream_completion(self, payload: dict, remaining: float):
+        try:
+            self.async_requests += 1
+            async with self.client.stream(
+                "POST", self.api_url, headers=self.headers, json=payload,
+                timeout=self._attempt_timeout(remaining)
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise error_for_status(response.status_code, response.headers, body.decode("utf-8", "replace"))
+
+                async for line in response.aiter_lines():
+                    delta = self._parse_stream_line(line)
+                    if delta is STREAM_DONE:
+                        return
+                    if delta:
+                        yield delta
+        except httpx.TimeoutException as e:
+            raise LLMTimeoutError(f"Stream timed out: {e!r}") from e
+        except httpx.HTTPError as e:
+            raise LLMConnectionError(f"Stream Request Error: {e!r}") from e
+
+    def get_metrics(self) -> dict:
+        metrics = super().get_metrics()
+        metrics["async_http"] = {"requests": self.async_requests}
+        metrics["single_flight"] = self.async_single_flight.get_stats()
+        return metrics
+
+    async def detect_intent_cached(self, user_input: str) -> str:
+        return await self.detect_intent(user_input)
+
+    async def detect_intent(self, user_input: str) -> str:
+        local = self._local_intent(user_input)
+        if local is not None:
+            return local
+
+        cached = await self._cache_get_async("intent", user_input)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await self.call_groq_model(self._intent_messages(user_input), task="intent")
+        except LLMError as e:
+            self.logger.warning(f"[Intent] Model unavailable: {e}")
+            return "unknown"
+        return self._finish_llm_intent(user_input, result)
+
+    async def detect_emotion(self, user_input: str) -> dict:
+        local = self._local_emotion(user_input)
+        if local is not None:
+            return local
+
+        cached = await self._cache_get_async("emotion", user_input)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await self.call_groq_model(self._emotion_messages(user_input), task="emotion")
+        except LLMError as e:
+            self.logger.warning(f"[Emotion] Model unavailable: {e}")
+            result = None
+        return self._resolve_llm_emotion(user_input, result)
+
+    async def analyze_fused(self, user_input: str, context=None, personality=None):
+        intent = self._local_intent(user_input)
+        result = await self.call_groq_model(
+            self._fused_messages(user_input, context, intent), task="analysis", personality=personality,
+            response_format={"type": "json_object"}
+        )
+        analysis = self._parse_fused(result, intent=intent)
+        if analysis is not None:
+            self.finish_reply(analysis["response"], analysis["intent"], trim=False)
+        return analysis
+
+    async def classify(self, user_input: str) -> dict:
+        intent = self._local_intent(user_input)
+        emotion_data = self._local_emotion(user_input)
+        if intent is not None and emotion_data is not None:
+            return {"intent": intent, **emotion_data}
+
+        if self.analysis_mode in ("fused", "speculative"):
+            cached = await self._cache_get_async("labels", user_input)
+            if cached is not None:
+                return self._merge_local_labels(dict(cached), intent, emotion_data)
+
+            try:
+                result = await self.call_groq_model(
+                    self._classify_messages(user_input), task="classify",
+                    response_format={"type": "json_object"}
+                )
+            except LLMError as e:
+                self.logger.warning(f"[Classifier] Model unavailable: {e}")
+                return self._merge_local_labels(
+                    {"intent": "unknown", "emotion": "neutral", "sentiment": "neutral"}, intent, emotion_data
+                )
+
+            labels = self._parse_fused(result, with_reply=False)
+            if labels is not None:
+                self._cache_set("labels", user_input, labels)
+                return self._merge_local_labels(dict(labels), intent, emotion_data)
+            self.logger.info("Fused classification unusable, falling back to separate detectors")
+
+        # Only ask the model for what the local analyzers could not decide
+        if intent is not None:
+            return {"intent": intent, **(await self.detect_emotion(user_input))}
+        if emotion_data is not None:
+            return {"intent": await self.detect_intent(user_input), **emotion_data}
+        return await self.classify_concurrent(user_input)
+
+    async def classify_concurrent(self, user_input: str, timeout: float = None) -> dict:
+        """detect_intent and detect_emotion as concurrent tasks with a shared timeout"""
+        timeout = CLASSIFIER_TIMEOUT if timeout is None else timeout
+
+        intent, emotion_data = await asyncio.gather(
+            asyncio.wait_for(self.detect_intent(user_input), timeout),
+            asyncio.wait_for(self.detect_emotion(user_input), timeout),
+            return_exceptions=True
+        )
+
+        if isinstance(intent, BaseException):
+            self.logger.warning(f"[Classifier] detect_intent failed: {intent!r}")
+            intent = "unknown"
+        if isinstance(emotion_data, BaseException) or not emotion_data:
+            self.logger.warning(f"[Classifier] detect_emotion failed: {emotion_data!r}")
+            emotion_data = {"emotion": "neutral", "sentiment": "neutral"}
+
+        return {
+            "intent": intent,
+            "emotion": emotion_data.get("emotion", "neutral"),
+            "sentiment": emotion_data.get("sentiment", "neutral")
+        }
+
+    async def _label_pack(self, texts, budget) -> dict:
+        default = {"intent": "unknown", "emotion": "neutral", "sentiment": "neutral"}
+        try:
+            result = await self.call_groq_model(
+                self._batch_messages(texts), max_tokens=self._batch_max_tokens(len(texts)), task="batch",
+                response_format={"type": "json_object"}
+            )
+        except LLMError as e:
+            self.logger.warning(f"[Batch analysis] Model unavailable for a pack of {len(texts)}: {e}")
+            return {text: dict(default) for text in texts}
+
+        done, failed = self._collect_pack(texts, self._parse_batch(result, len(texts)))
+        if failed:
+            retry_packs = self._split_failed(texts, failed, budget)
+            if not retry_packs:
+                done.update({text: dict(default) for text in failed})
+            for labels_by_text in await asyncio.gather(*(self._label_pack(pack, budget) for pack in retry_packs)):
+                done.update(labels_by_text)
+        return done
+
+    async def analyze_batch(self, texts, pack_size: int = None, concurrency: int = None) -> list:
+        """Same contract as NLPEngine.analyze_batch; packs run as tasks under a semaphore"""
+        texts = list(texts)
+        # Known labels come from the cache, one lookup per distinct text
+        results, pending, packs = await self._off_loop(
+            self._cache_blocks, self._prepare_batch, texts, pack_size or BATCH_PACK_SIZE
+        )
+        semaphore = asyncio.Semaphore(concurrency or BATCH_CONCURRENCY)
+        budget = RetryBudget.for_packs(len(packs))
+
+        async def run(pack):
+            async with semaphore:
+                return await self._label_pack(pack, budget)
+
+        for labels_by_text in await asyncio.gather(*(run(pack) for pack in packs)):
+            self._fill_batch(results, pending, labels_by_text)
+        return results
+
+    async def analyze_sequential(self, user_input: str, context=None, personality=None) -> dict:
+        labels = await self.classify_concurrent(user_input)
+        messages = self._build_reply_messages(user_input, labels, context)
+        response = await self.call_groq_model(
+            messages, task="reply", personality=personality, intent=labels["intent"]
+        )
+
+        return {
+            "intent": labels["intent"],
+            "emotion": labels["emotion"],
+            "sentiment": labels["sentiment"],
+            "response": response
+        }
+
+    async def _timed_reply(self, messages, intent=None, personality=None):
+        started = time.monotonic()
+        response = await self.call_groq_model(messages, task="reply", personality=personality, intent=intent)
+        return response, time.monotonic() - started
+
+    async def analyze_speculative(self, user_input: str, context=None, personality=None) -> dict:
+        """Same contract as NLPEngine.analyze_speculative; a discarded reply is cancelled mid-flight"""
+        started = time.monotonic()
+        speculative = asyncio.ensure_future(self._timed_reply(
+            self._speculative_messages(user_input, context), personality=personality
+        ))
+        # A discarded reply's failure is of no interest; retrieve it so asyncio does not warn
+        speculative.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            labels = await self.classify(user_input)
+            classify_seconds = time.monotonic() - started
+
+            if labels["intent"] in SPECULATIVE_RECHECK_INTENTS:
+                speculative.cancel()
+                self.logger.info(f"[Speculative] Intent '{labels['intent']}' needs a label-aware reply; regenerating")
+                messages = self._build_reply_messages(user_input, labels, context)
+                response, reply_seconds = await self._timed_reply(
+                    messages, intent=labels["intent"], personality=personality
+                )
+                self._record_speculation(False, classify_seconds, reply_seconds, time.monotonic() - started)
+            else:
+                response, reply_seconds = await speculative
+                max_tokens = self.route("reply", personality)["max_tokens"]
+                response = self.finish_reply(response, labels["intent"], max_tokens)
+                self._record_speculation(True, classify_seconds, reply_seconds, time.monotonic() - started)
+        finally:
+            if not speculative.done():
+                speculative.cancel()
+
+        return {
+            "intent": labels["intent"],
+            "emotion": labels["emotion"],
+            "sentiment": labels["sentiment"],
+            "response": response
+        }
+
+    async def analyze_shed(self, user_input: str, context=None, tier: int = LOCAL_LABELS, personality=None) -> dict:
+        labels = self._local_labels(user_input)
+        if tier == CANNED:
+            response = self._canned_reply(labels)
+        else:
+            messages, max_tokens = self._shed_reply_request(user_input, labels, context, tier, personality)
+            response = await self.call_groq_model(
+                messages, max_tokens=max_tokens, task="reply", personality=personality, intent=labels["intent"]
+            )
+        return dict(labels, response=response)
+
+    async def analyze(self, user_input: str, memory_manager=None, session_id=None, personality=None) -> dict:
+        context = await self._history_turns(memory_manager, session_id)
+        tier = self.shedder.current_tier()
+
+        result = await self._off_loop(self._cache_blocks, self._cached_reply, user_input, context, personality)
+
+        if result is None and tier != FULL:
+            result = await self.analyze_shed(user_input, context, tier, personality)
+
+        if result is None:
+            if self.analysis_mode == "speculative":
+                result = await self.analyze_speculative(user_input, context, personality)
+            elif self.analysis_mode == "fused":
+                result = await self.analyze_fused(user_input, context, personality)
+                if result is None:
+                    self.logger.info("Fused analysis unusable, falling back to sequential analysis")
+
+            if result is None:
+                result = await self.analyze_sequential(user_input, context, personality)
+            self._store_reply(user_input, context, result, personality)
+
+        # Save memory
+        if memory_manager:
+            memory_manager.add_memory(user_input, result["response"], session_id)
+
+        return dict(result, tier=tier)
+
+    async def analyze_stream(self, user_input: str, memory_manager=None, session_id=None, personality=None):
+        """Async generator with the same events as NLPEngine.analyze_stream"""
+        context = await self._history_turns(memory_manager, session_id)
+        tier = self.shedder.current_tier()
+
+        if tier == FULL:
+            labels = await self.classify(user_input)
+            messages, max_tokens = self._build_reply_messages(user_input, labels, context), None
+        else:
+            labels = self._local_labels(user_input)
+        yield {"type": "analysis", **labels, "tier": tier}
+
+        tokens = []
+        if tier == CANNED:
+            tokens.append(self._canned_reply(labels))
+            yield {"type": "token", "token": tokens[0]}
+        else:
+            if tier != FULL:
+                messages, max_tokens = self._shed_reply_request(user_input, labels, context, tier, personality)
+            async for token in self.stream_groq_model(
+                messages, max_tokens=max_tokens, task="reply", personality=personality, intent=labels["intent"]
+            ):
+                tokens.append(token)
+                yield {"type": "token", "token": token}
+
+        response = "".join(tokens).strip()
+
+        # Save memory
+        if memory_manager:
+            memory_manager.add_memory(user_input, response, session_id)
+
+        yield {"type": "done", "response": response}
@@ -0,0 +1,85 @@
+# LLM backends: where chat completion requests go and how they authenticate
+import os
+
+from .config import LLM_BACKEND, LLM_BASE_URL, LLM_API_KEY, STANDIN_URL
+
+
+class LLMBackend:
+    """
+    An OpenAI-style chat completions upstream: endpoint URLs, auth headers and
+    the name its circuit breaker is kept under. Backends only describe the
+    upstream; the engines own the HTTP clients, retries and rate limiting, so
+    every backend gets the same call path.
+    """
+    name = "llm"
+
+    def __init__(self, base_url: str, api_key: str = None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    @property
+    def models_url(self) -> str:
+        """Cheap endpoint for keep-warm requests"""
+        return f"{self.base_url}/models"
+
+    @property
+    def headers(self) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.base_url!r})"
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Any server implementing /chat/completions: vLLM, Ollama, llama.cpp, OpenAI itself."""
+    name = "openai"
+
+    def __init__(self, base_url: str = None, api_key: str = None):
+        base_url = base_url or LLM_BASE_URL
+        if not base_url:
+            raise ValueError("The openai backend needs a base URL (set NLP_LLM_BASE_URL)")
+        super().__init__(base_url, api_key or LLM_API_KEY or None)
+
+
+class GroqBackend(OpenAICompatibleBackend):
+    """api.groq.com; only ever sent GROQ_API_KEY, never the NLP_LLM_API_KEY meant for another server."""
+    name = "groq"
+    BASE_URL = "https://api.groq.com/openai/v1"
+
+    def __init__(self, api_key: str = None):
+        api_key = api_key or os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("The groq backend needs an API key (set GROQ_API_KEY)")
+        LLMBackend.__init__(self, self.BASE_URL, api_key)
+
+
+class StandInBackend(OpenAICompatibleBackend):
+    """The bundled local stand-in server (standin_server.py); accepts any model name."""
+    name = "standin"
+
+    def __init__(self, base_url: str = None):
+        super().__init__(base_url or STANDIN_URL, "standin")
+
+
+BACKENDS = {
+    "groq": GroqBackend,
+    "openai": OpenAICompatibleBackend,
+    "standin": StandInBackend,
+}
+
+
+def get_backend(backend=None) -> LLMBackend:
+    """An LLMBackend instance, a backend name, or None for NLP_LLM_BACKEND."""
+    if isinstance(backend, LLMBackend):
+        return backend
+    name = (backend or LLM_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'; expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
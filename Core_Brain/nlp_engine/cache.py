@@ -0,0 +1,237 @@
+# Bounded TTL cache for classifier labels and (optionally) replies
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from .config import CACHE_BACKEND, CACHE_PATH, CACHE_MAXSIZE
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n.!?,;:'\"…"
+
+
+def normalize_text(text: str) -> str:
+    """Fold case, whitespace and trailing punctuation so near-identical messages share a key."""
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip(_EDGE_PUNCTUATION)
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def record(self, field, count=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + count)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+class InProcessCacheBackend:
+    """LRU-ordered dict with per-entry expiry. Shared by every engine in the process."""
+    blocking = False
+
+    def __init__(self, stats, maxsize=CACHE_MAXSIZE):
+        self.stats = stats
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.stats.record("expirations")
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.record("evictions")
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """
+    Cache in a local SQLite file, shared by every worker process on the host.
+    Reads bump accessed_at so size-based eviction removes least recently used rows.
+    """
+    _EVICT_EVERY = 64  # sets between size checks
+    # Reads and writes can wait on other workers' writes for the 5 s busy timeout
+    blocking = True
+
+    def __init__(self, stats, path=CACHE_PATH, maxsize=CACHE_MAXSIZE):
+        self.stats = stats
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._sets = 0
+        self._connect().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at);
+            CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires_at);
+            """
+        )
+
+    def _connect(self):
+        # sqlite3 connections must not cross threads or forks
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self.stats.record("expirations")
+            return None
+        conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + ttl, now)
+        )
+        self._sets += 1
+        if self._sets % self._EVICT_EVERY == 0:
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        expired = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+        if expired:
+            self.stats.record("expirations", expired)
+
+        excess = len(self) - self.maxsize
+        if excess > 0:
+            evicted = conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            ).rowcount
+            self.stats.record("evictions", evicted)
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class ResponseCache:
+    """
+    Keys are built from the normalized input plus everything that changes the
+    answer: what is cached (kind), personality, model and a hash of the context.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.stats = backend.stats
+
+    @property
+    def blocking(self) -> bool:
+        """Whether lookups can block, so async callers should make them off the event loop."""
+        return self.backend.blocking
+
+    @staticmethod
+    def make_key(kind, text, personality=None, model=None, context=None) -> str:
+        context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()[:16] if context else ""
+        raw = "\x1f".join([kind, personality or "", model or "", context_hash, normalize_text(text)])
+        return f"{kind}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, kind, text, **key_parts):
+        try:
+            value = self.backend.get(self.make_key(kind, text, **key_parts))
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed: {e}")
+            value = None
+        self.stats.record("hits" if value is not None else "misses")
+        return value
+
+    def set(self, kind, text, value, ttl, **key_parts):
+        try:
+            self.backend.set(self.make_key(kind, text, **key_parts), value, ttl)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed: {e}")
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_stats(self) -> dict:
+        stats = self.stats.snapshot()
+        stats["backend"] = type(self.backend).__name__
+        stats["size"] = len(self.backend)
+        return stats
+
+
+_cache = None
+_cache_pid = None
+_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Per-process cache selected by NLP_CACHE_BACKEND (memory, sqlite or none)."""
+    global _cache, _cache_pid
+
+    if CACHE_BACKEND == "none":
+        return None
+
+    with _lock:
+        if _cache is None or _cache_pid != os.getpid():
+            stats = CacheStats()
+            if CACHE_BACKEND == "sqlite":
+                backend = SQLiteCacheBackend(stats)
+            else:
+                backend = InProcessCacheBackend(stats)
+            _cache = ResponseCache(backend)
+            _cache_pid = os.getpid()
+        return _cache
@@ -1,6 +1,220 @@
-# from dotenv import load_dotenv
-# load_dotenv()
-
 # import os
 # HF_API_TOKEN = os.getenv("HF_API_TOKEN")
 
+
+import os
+import re
+import tempfile
+
+from dotenv import load_dotenv
+
+# Every setting below is read once, at import, so .env must be loaded first
+load_dotenv()
+
+DEFAULT_MODEL = "llama3-8b-8192"
+SUPPORTED_INTENTS = [
+    "greeting", 
+    "question", 
+    "request", 
+    "get_weather", 
+    "emotional_support", 
+    "manipulation_check", 
+    "unknown"
+]
+SUPPORTED_SENTIMENTS = ["positive", "negative", "neutral"]
+
+# How NLPEngine.analyze talks to the model:
+#   "fused"       - one JSON-constrained completion returns intent, emotion,
+#                   sentiment and the reply together (one round trip)
+#   "sequential"  - detect_intent, detect_emotion, then the reply (three calls)
+#   "speculative" - a label-agnostic reply starts at once, overlapped with
+#                   classification; it is thrown away and regenerated with the
+#                   labels only when the intent is in SPECULATIVE_RECHECK_INTENTS
+# The fused path falls back to the sequential one when its output fails validation.
+ANALYSIS_MODE = os.getenv("NLP_ANALYSIS_MODE", "fused").lower()
+# Intents whose replies must see the labels (speculative mode regenerates these)
+SPECULATIVE_RECHECK_INTENTS = [
+    intent.strip() for intent in
+    os.getenv("NLP_SPECULATIVE_RECHECK_INTENTS", "emotional_support,manipulation_check").split(",")
+    if intent.strip()
+]
+
+# Where chat completions are sent:
+#   "groq"    - api.groq.com, authenticated with GROQ_API_KEY
+#   "openai"  - any OpenAI-compatible server at NLP_LLM_BASE_URL (vLLM, Ollama, OpenAI, ...)
+#   "standin" - the bundled local stand-in (python Core_Brain/nlp_engine/standin_server.py),
+#               for load tests and benchmarks without network or quota
+LLM_BACKEND = os.getenv("NLP_LLM_BACKEND", "groq").lower()
+LLM_BASE_URL = os.getenv("NLP_LLM_BASE_URL", "")
+LLM_API_KEY = os.getenv("NLP_LLM_API_KEY", "")
+STANDIN_URL = os.getenv("NLP_STANDIN_URL", "http://127.0.0.1:8089/v1")
+
+# Shared thread pool used to fan out independent classifier calls
+EXECUTOR_WORKERS = int(os.getenv("NLP_EXECUTOR_WORKERS", "16"))
+# Per-call timeout (seconds) when gathering concurrent classifier results
+CLASSIFIER_TIMEOUT = float(os.getenv("NLP_CLASSIFIER_TIMEOUT", "20"))
+
+# Pooled keep-alive HTTP client for LLM calls
+HTTP_POOL_CONNECTIONS = int(os.getenv("NLP_HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE = int(os.getenv("NLP_HTTP_POOL_MAXSIZE", "32"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("NLP_HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("NLP_HTTP_READ_TIMEOUT", "30"))
+# Seconds of idleness after which a background request re-warms the pool (0 disables)
+HTTP_KEEP_WARM_INTERVAL = float(os.getenv("NLP_HTTP_KEEP_WARM_INTERVAL", "0"))
+
+# Local fast-path intent classifier (rules + hashed n-gram model) in front of the LLM
+LOCAL_INTENT_ENABLED = os.getenv("NLP_LOCAL_INTENT", "1") == "1"
+INTENT_MODEL_PATH = os.getenv(
+    "NLP_INTENT_MODEL_PATH",
+    os.path.join(os.path.dirname(__file__), "models", "intent_model.npz")
+)
+# Local predictions below this confidence fall through to the LLM; in fused mode a
+# confident one is given to the model, which then only labels emotion and sentiment
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("NLP_INTENT_THRESHOLD", "0.8"))
+# When set, every LLM-decided intent is appended here as JSONL training data
+INTENT_LOG_PATH = os.getenv("NLP_INTENT_LOG_PATH")
+
+# Where emotion/sentiment come from:
+#   "llm"      - always ask the model
+#   "lexicon"  - local lexicon analyzer only (no network call)
+#   "fallback" - ask the model, use the lexicon when the call or its JSON fails
+#   "ensemble" - lexicon first, escalate only ambiguous inputs to the model
+EMOTION_MODE = os.getenv("NLP_EMOTION_MODE", "llm").lower()
+
+# Label/reply cache: "memory" (per process), "sqlite" (shared by workers on one host) or "none"
+CACHE_BACKEND = os.getenv("NLP_CACHE_BACKEND", "memory").lower()
+CACHE_PATH = os.getenv("NLP_CACHE_PATH", os.path.join(tempfile.gettempdir(), "echo_nlp_cache.sqlite3"))
+CACHE_MAXSIZE = int(os.getenv("NLP_CACHE_MAXSIZE", "10000"))
+CACHE_LABEL_TTL = float(os.getenv("NLP_CACHE_LABEL_TTL", "3600"))
+# Replies depend on context and sampling, so caching them is opt-in and short-lived
+CACHE_REPLIES = os.getenv("NLP_CACHE_REPLIES", "0") == "1"
+CACHE_REPLY_TTL = float(os.getenv("NLP_CACHE_REPLY_TTL", "300"))
+
+# Retries for one logical LLM call: exponential backoff with full jitter,
+# Retry-After honoured, and never past the call's overall deadline (seconds)
+RETRY_MAX_ATTEMPTS = int(os.getenv("NLP_RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("NLP_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("NLP_RETRY_MAX_DELAY", "8"))
+CALL_DEADLINE = float(os.getenv("NLP_CALL_DEADLINE", "25"))
+# Circuit breaker: open after this many consecutive upstream failures, fail fast
+# for BREAKER_RESET_TIMEOUT seconds, then let BREAKER_HALF_OPEN_MAX probes through
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("NLP_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("NLP_BREAKER_RESET_TIMEOUT", "30"))
+BREAKER_HALF_OPEN_MAX = int(os.getenv("NLP_BREAKER_HALF_OPEN_MAX", "1"))
+
+# Client-side limiter in front of every LLM call (0 disables a limit). Set these just
+# under the account's Groq quota; with the sqlite backend all workers on a host share them.
+RATE_LIMIT_RPM = float(os.getenv("NLP_RATE_LIMIT_RPM", "0"))
+RATE_LIMIT_TPM = float(os.getenv("NLP_RATE_LIMIT_TPM", "0"))
+# Cap on LLM requests in flight at once across the host's workers
+RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv("NLP_RATE_LIMIT_MAX_CONCURRENCY", "0"))
+RATE_LIMIT_BACKEND = os.getenv("NLP_RATE_LIMIT_BACKEND", "sqlite").lower()
+RATE_LIMIT_PATH = os.getenv(
+    "NLP_RATE_LIMIT_PATH", os.path.join(tempfile.gettempdir(), "echo_nlp_ratelimit.sqlite3")
+)
+# Longest a call queues for quota before failing with RateLimitTimeoutError (seconds)
+RATE_LIMIT_MAX_WAIT = float(os.getenv("NLP_RATE_LIMIT_MAX_WAIT", "10"))
+
+# Batch analysis: messages per packed classification request, packs in flight at once,
+# and the most messages one /api/analyze/batch request may carry
+BATCH_PACK_SIZE = int(os.getenv("NLP_BATCH_PACK_SIZE", "20"))
+BATCH_CONCURRENCY = int(os.getenv("NLP_BATCH_CONCURRENCY", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("NLP_BATCH_MAX_ITEMS", "1000"))
+# Re-sends of slots the model dropped, per batch, as a fraction of its packs (at least one)
+BATCH_RETRY_RATIO = float(os.getenv("NLP_BATCH_RETRY_RATIO", "0.5"))
+
+# Token budget for an assembled reply prompt (system + history + user message);
+# older turns beyond it are summarized or dropped
+PROMPT_TOKEN_BUDGET = int(os.getenv("NLP_PROMPT_TOKEN_BUDGET", "1500"))
+# Tokens held back for the summary of trimmed turns, and characters kept per summarized message
+PROMPT_SUMMARY_TOKENS = int(os.getenv("NLP_PROMPT_SUMMARY_TOKENS", "60"))
+PROMPT_SUMMARY_CHARS = int(os.getenv("NLP_PROMPT_SUMMARY_CHARS", "80"))
+# How trimmed history is summarized: "extractive" (quotes of the user's messages, no call)
+# or "llm" (one call on the summary route, falling back to extractive when it fails)
+PROMPT_SUMMARY_MODE = os.getenv("NLP_PROMPT_SUMMARY_MODE", "extractive").lower()
+
+# Per-task model routing: each kind of LLM call has its own model, output cap,
+# temperature and overall timeout (seconds), so classification can run on a small
+# fast model while replies use a larger one. A model of None means the engine's model_name.
+#   intent, emotion - single-label detectors          classify - joint labels as JSON
+#   batch           - packed labels (max_tokens sized per pack)
+#   analysis        - fused labels + reply             reply    - the chat reply
+#   summary         - LLM summary of trimmed history (NLP_PROMPT_SUMMARY_MODE=llm)
+# Override one field with NLP_ROUTE_<TASK>_<FIELD>, e.g. NLP_ROUTE_REPLY_MODEL=llama3-70b-8192,
+# or for one personality with NLP_ROUTE_<PERSONALITY>_<TASK>_<FIELD>, e.g. NLP_ROUTE_SUZI_REPLY_TEMPERATURE=1.0
+ROUTE_FIELDS = {"model": str, "max_tokens": int, "temperature": float, "timeout": float}
+ROUTES = {
+    "intent":   {"model": None, "max_tokens": 10,   "temperature": 0.0, "timeout": 10.0},
+    "emotion":  {"model": None, "max_tokens": 50,   "temperature": 0.0, "timeout": 10.0},
+    "classify": {"model": None, "max_tokens": 50,   "temperature": 0.0, "timeout": 10.0},
+    "batch":    {"model": None, "max_tokens": None, "temperature": 0.0, "timeout": CALL_DEADLINE},
+    "analysis": {"model": None, "max_tokens": 250,  "temperature": 0.8, "timeout": CALL_DEADLINE},
+    "reply":    {"model": None, "max_tokens": 150,  "temperature": 0.8, "timeout": CALL_DEADLINE},
+    "summary":  {"model": None, "max_tokens": 80,   "temperature": 0.2, "timeout": 10.0},
+}
+# Personality tweaks merged over ROUTES for that personality's calls
+PERSONALITY_ROUTES = {
+    "echo": {"reply": {"temperature": 0.7}},
+    "suzi": {"reply": {"temperature": 0.95}},
+}
+
+_ROUTE_ENV = re.compile(
+    r"NLP_ROUTE_(?:(\w+?)_)?(%s)_(%s)$" % (
+        "|".join(task.upper() for task in ROUTES), "|".join(field.upper() for field in ROUTE_FIELDS)
+    )
+)
+for _name, _value in sorted(os.environ.items()):
+    _match = _ROUTE_ENV.match(_name)
+    if not _match or not _value.strip():
+        continue
+    _personality, _task, _field = _match.group(1), _match.group(2).lower(), _match.group(3).lower()
+    _target = ROUTES[_task] if _personality is None else \
+        PERSONALITY_ROUTES.setdefault(_personality.lower(), {}).setdefault(_task, {})
+    _target[_field] = ROUTE_FIELDS[_field](_value.strip())
+
+# Hedged requests (opt-in per task): when a call has not answered by the task's rolling
+# HEDGE_QUANTILE latency, a duplicate goes out and the first answer wins. Short, deterministic
+# classification calls are the natural fit, e.g. NLP_HEDGE_TASKS=intent,emotion,classify
+HEDGE_TASKS = [task.strip() for task in os.getenv("NLP_HEDGE_TASKS", "").split(",") if task.strip()]
+HEDGE_QUANTILE = float(os.getenv("NLP_HEDGE_QUANTILE", "0.9"))
+# Never hedge sooner than this (seconds), whatever the quantile says
+HEDGE_MIN_DELAY = float(os.getenv("NLP_HEDGE_MIN_DELAY", "0.1"))
+# At most this fraction of calls may be hedged
+HEDGE_MAX_RATE = float(os.getenv("NLP_HEDGE_MAX_RATE", "0.1"))
+# Latency samples kept per task, and how many are needed before hedging starts
+HEDGE_WINDOW = int(os.getenv("NLP_HEDGE_WINDOW", "200"))
+HEDGE_MIN_SAMPLES = int(os.getenv("NLP_HEDGE_MIN_SAMPLES", "20"))
+
+# Reply length policy by detected intent: the reply's max_tokens, and stop sequences that end
+# it at a paragraph (greetings: line) break. A reply cut off by max_tokens is trimmed back to
+# its last full sentence. Override a budget with NLP_REPLY_TOKENS_<INTENT>, e.g. NLP_REPLY_TOKENS_GREETING=30
+REPLY_TOKENS = {
+    "greeting": 40,
+    "question": 120,
+    "request": 150,
+    "get_weather": 80,
+    "emotional_support": 200,
+    "manipulation_check": 150,
+    "unknown": 120,
+}
+for _intent in REPLY_TOKENS:
+    _value = os.getenv(f"NLP_REPLY_TOKENS_{_intent.upper()}")
+    if _value:
+        REPLY_TOKENS[_intent] = int(_value)
+# Personalities scale the budgets; Suzi's teasing one-liners run shorter
+PERSONALITY_REPLY_SCALE = {"echo": 1.0, "suzi": 0.8}
+REPLY_STOP = ["\n\n", "\nUser:"]
+REPLY_STOP_BY_INTENT = {"greeting": ["\n"]}
+
+# Load shedding: each request gets a quality tier from live pressure on the LLM path
+#   0 - full analysis                        1 - local classifiers only, then the reply
+#   2 - reply only, on SHED_REPLY_TOKENS     3 - cached or canned reply, no LLM call
+# A tier starts when LLM calls queued for rate-limiter quota (not those in flight) reach
+# SHED_QUEUE_TIERS[tier - 1], or the recent rate-limiter wait (seconds) reaches
+# SHED_WAIT_TIERS[tier - 1]. A half-open circuit means tier 2 and an open one tier 3.
+SHED_ENABLED = os.getenv("NLP_SHED_ENABLED", "1") == "1"
+SHED_QUEUE_TIERS = [int(n) for n in os.getenv("NLP_SHED_QUEUE_TIERS", "8,16,32").split(",")]
+SHED_WAIT_TIERS = [float(n) for n in os.getenv("NLP_SHED_WAIT_TIERS", "0.5,2,5").split(",")]
+SHED_REPLY_TOKENS = int(os.getenv("NLP_SHED_REPLY_TOKENS", "60"))
+# A tier is held this long (seconds) after pressure last called for it, so the ladder does not flap
+SHED_HOLD_SECONDS = float(os.getenv("NLP_SHED_HOLD_SECONDS", "5"))
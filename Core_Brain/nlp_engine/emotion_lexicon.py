@@ -0,0 +1,196 @@
+# Offline lexicon-based emotion and sentiment detector with a vectorised batch API
+import re
+
+import numpy as np
+
+EMOTIONS = ["happy", "sad", "angry", "anxious", "afraid", "surprised", "grateful", "calm"]
+
+# Sentiment each emotion implies; a result whose sentiment contradicts its emotion is not confident
+EMOTION_POLARITY = {
+    "happy": 1, "grateful": 1, "calm": 1, "sad": -1, "angry": -1, "anxious": -1, "afraid": -1, "surprised": 0,
+}
+SENTIMENT_POLARITY = {"positive": 1, "negative": -1, "neutral": 0}
+
+# word -> (emotion, valence). Valence is roughly -3 (very negative) .. +3 (very positive).
+LEXICON = {
+    # happy
+    "happy": ("happy", 2.0), "glad": ("happy", 1.8), "great": ("happy", 2.0), "good": ("happy", 1.5),
+    "awesome": ("happy", 2.5), "amazing": ("happy", 2.5), "wonderful": ("happy", 2.5), "love": ("happy", 2.5),
+    "loving": ("happy", 2.2), "excited": ("happy", 2.2), "exciting": ("happy", 2.0), "fun": ("happy", 1.8),
+    "joy": ("happy", 2.5), "joyful": ("happy", 2.5), "delighted": ("happy", 2.5), "yay": ("happy", 2.0),
+    "proud": ("happy", 2.0), "promotion": ("happy", 1.5), "celebrate": ("happy", 2.0), "fantastic": ("happy", 2.6),
+    "nice": ("happy", 1.4), "cool": ("happy", 1.2), "enjoy": ("happy", 1.8), "enjoyed": ("happy", 1.8),
+    "smile": ("happy", 1.6), "laugh": ("happy", 1.6), "lol": ("happy", 1.2), "haha": ("happy", 1.2),
+    "best": ("happy", 2.0), "perfect": ("happy", 2.2), "thrilled": ("happy", 2.6), "cheerful": ("happy", 2.2),
+    # sad
+    "sad": ("sad", -2.0), "unhappy": ("sad", -2.0), "depressed": ("sad", -2.8), "depression": ("sad", -2.8),
+    "lonely": ("sad", -2.2), "alone": ("sad", -1.5), "cry": ("sad", -2.0), "crying": ("sad", -2.2),
+    "cried": ("sad", -2.0), "tears": ("sad", -1.8), "heartbroken": ("sad", -3.0), "broken": ("sad", -2.0),
+    "miss": ("sad", -1.2), "lost": ("sad", -1.6), "grief": ("sad", -2.6), "hopeless": ("sad", -2.8),
+    "empty": ("sad", -2.0), "down": ("sad", -1.2), "miserable": ("sad", -2.8), "hurt": ("sad", -2.0),
+    "worthless": ("sad", -3.0), "disappointed": ("sad", -2.0), "sorry": ("sad", -0.8), "tired": ("sad", -1.2),
+    "exhausted": ("sad", -1.8), "bad": ("sad", -1.8), "terrible": ("sad", -2.6), "awful": ("sad", -2.5),
+    # angry
+    "angry": ("angry", -2.4), "mad": ("angry", -2.2), "furious": ("angry", -3.0), "annoyed": ("angry", -1.8),
+    "annoying": ("angry", -1.8), "irritated": ("angry", -1.8), "hate": ("angry", -2.7), "hated": ("angry", -2.5),
+    "frustrated": ("angry", -2.2), "frustrating": ("angry", -2.2), "rage": ("angry", -3.0), "unfair": ("angry", -2.0),
+    "stupid": ("angry", -2.0), "idiot": ("angry", -2.4), "sick": ("angry", -1.5), "pissed": ("angry", -2.6),
+    # anxious
+    "anxious": ("anxious", -2.0), "anxiety": ("anxious", -2.2), "worried": ("anxious", -1.9), "worry": ("anxious", -1.8),
+    "nervous": ("anxious", -1.8), "stressed": ("anxious", -2.1), "stress": ("anxious", -2.0), "stressful": ("anxious", -2.0),
+    "overwhelmed": ("anxious", -2.3), "panic": ("anxious", -2.6), "tense": ("anxious", -1.6), "uneasy": ("anxious", -1.6),
+    "restless": ("anxious", -1.4), "exam": ("anxious", -0.6), "exams": ("anxious", -0.6), "deadline": ("anxious", -0.8),
+    # afraid
+    "afraid": ("afraid", -2.2), "scared": ("afraid", -2.2), "fear": ("afraid", -2.2), "terrified": ("afraid", -3.0),
+    "frightened": ("afraid", -2.5), "horrified": ("afraid", -2.8), "creepy": ("afraid", -1.5), "danger": ("afraid", -2.0),
+    # surprised
+    "surprised": ("surprised", 0.5), "surprise": ("surprised", 0.8), "shocked": ("surprised", -0.8), "wow": ("surprised", 1.2),
+    "unexpected": ("surprised", 0.2), "omg": ("surprised", 0.8), "unbelievable": ("surprised", 0.4),
+    # grateful
+    "thanks": ("grateful", 1.8), "thank": ("grateful", 1.8), "grateful": ("grateful", 2.4), "thankful": ("grateful", 2.4),
+    "appreciate": ("grateful", 2.0), "appreciated": ("grateful", 2.0), "blessed": ("grateful", 2.4),
+    # calm
+    "calm": ("calm", 1.4), "relaxed": ("calm", 1.8), "peaceful": ("calm", 2.0), "fine": ("calm", 0.8),
+    "okay": ("calm", 0.4), "ok": ("calm", 0.4), "content": ("calm", 1.5), "relieved": ("calm", 1.8),
+}
+
+NEGATORS = {
+    "not", "no", "never", "none", "nobody", "nothing", "neither", "nor", "without", "hardly", "barely",
+    "cannot", "cant", "can't", "dont", "don't", "doesnt", "doesn't", "didnt", "didn't", "isnt", "isn't",
+    "wasnt", "wasn't", "arent", "aren't", "wont", "won't", "shouldnt", "shouldn't", "aint", "ain't",
+}
+
+INTENSIFIERS = {
+    "very": 1.5, "really": 1.5, "so": 1.4, "extremely": 1.8, "super": 1.5, "incredibly": 1.8, "totally": 1.4,
+    "absolutely": 1.6, "completely": 1.5, "too": 1.3, "truly": 1.4, "deeply": 1.6, "utterly": 1.7,
+    "slightly": 0.6, "somewhat": 0.7, "bit": 0.7, "little": 0.7, "kinda": 0.7, "kind": 1.0, "mildly": 0.6,
+}
+
+# A negated emotion word counts toward its opposite ("not happy" -> sad); others are dropped.
+# Negated thanks ("no thanks") is a polite refusal, not anger, so grateful is dropped too.
+NEGATED_EMOTION = {"happy": "sad", "calm": "anxious"}
+
+NEGATION_SCOPE = 3          # tokens after a negator that it applies to, within one clause
+NEGATION_VALENCE = -0.7     # valence multiplier inside a negation scope
+COMPOUND_ALPHA = 15.0       # normalisation constant for the compound score
+SENTIMENT_THRESHOLD = 0.05  # |compound| below this is neutral
+
+# Words, and the punctuation that ends a clause (and with it a negation's scope)
+_TOKEN_RE = re.compile(r"[a-z']+|[.,;:!?]")
+_CLAUSE_BREAKS = set(".,;:!?")
+
+
+class LexiconEmotionAnalyzer:
+    """
+    Emotion and sentiment from a word lexicon with negation and intensifier
+    handling. A batch is flattened into token arrays and scored with NumPy in one
+    pass, so scoring thousands of stored messages costs no network calls.
+    """
+    def __init__(self, lexicon=None):
+        lexicon = lexicon or LEXICON
+        self.emotions = list(EMOTIONS)
+        emotion_index = {emotion: i for i, emotion in enumerate(self.emotions)}
+
+        self.vocab = {word: i for i, word in enumerate(sorted(lexicon))}
+        self.word_emotion = np.array([emotion_index[lexicon[w][0]] for w in sorted(lexicon)], dtype=np.int64)
+        self.word_valence = np.array([lexicon[w][1] for w in sorted(lexicon)], dtype=np.float64)
+        # -1 means "drop this emotion when negated"
+        self.negated_emotion = np.array(
+            [emotion_index.get(NEGATED_EMOTION.get(emotion), -1) for emotion in self.emotions], dtype=np.int64
+        )
+
+    def _tokenize(self, texts):
+        """Flatten a batch into parallel token arrays."""
+        doc, lex, negator, intensity, clause_break = [], [], [], [], []
+        for i, text in enumerate(texts):
+            for token in _TOKEN_RE.findall(text.lower()):
+                doc.append(i)
+                lex.append(self.vocab.get(token, -1))
+                negator.append(token in NEGATORS or token.endswith("n't"))
+                intensity.append(INTENSIFIERS.get(token, 1.0))
+                clause_break.append(token in _CLAUSE_BREAKS)
+        return (
+            np.asarray(doc, dtype=np.int64),
+            np.asarray(lex, dtype=np.int64),
+            np.asarray(negator, dtype=bool),
+            np.asarray(intensity, dtype=np.float64),
+            np.asarray(clause_break, dtype=bool),
+        )
+
+    def score_batch(self, texts):
+        """
+        Score every text at once. Returns a list of dicts with emotion, sentiment,
+        compound (-1..1), hits (lexicon words found) and confident (False when
+        the text is ambiguous, or its emotion and sentiment disagree, and it is
+        worth escalating to the LLM).
+        """
+        n = len(texts)
+        doc, lex, negator, intensity, clause_break = self._tokenize(texts)
+
+        # A token is negated if a negator appears within the previous NEGATION_SCOPE tokens of the
+        # same text with no clause break in between; clear[t] says the span back to t - shift is unbroken
+        negated = np.zeros(len(doc), dtype=bool)
+        clear = ~clause_break
+        for shift in range(1, NEGATION_SCOPE + 1):
+            if len(doc) > shift:
+                negated[shift:] |= negator[:-shift] & (doc[shift:] == doc[:-shift]) & clear[shift:]
+                clear[shift:] &= ~clause_break[:-shift]
+
+        # Intensifiers scale the word that immediately follows them
+        scale = np.ones(len(doc), dtype=np.float64)
+        if len(doc) > 1:
+            same_doc = doc[1:] == doc[:-1]
+            scale[1:] = np.where(same_doc, intensity[:-1], 1.0)
+
+        hit = lex >= 0
+        doc, lex, negated, scale = doc[hit], lex[hit], negated[hit], scale[hit]
+
+        valence = self.word_valence[lex] * scale * np.where(negated, NEGATION_VALENCE, 1.0)
+        emotion = np.where(negated, self.negated_emotion[self.word_emotion[lex]], self.word_emotion[lex])
+
+        emotion_scores = np.zeros((n, len(self.emotions)), dtype=np.float64)
+        keep = emotion >= 0
+        np.add.at(emotion_scores, (doc[keep], emotion[keep]), scale[keep])
+
+        total_valence = np.bincount(doc, weights=valence, minlength=n)
+        hits = np.bincount(doc, minlength=n)
+        compound = total_valence / np.sqrt(total_valence ** 2 + COMPOUND_ALPHA)
+
+        ranked = np.sort(emotion_scores, axis=1)
+        top, second = ranked[:, -1], ranked[:, -2]
+        margin = np.where(top > 0, (top - second) / np.maximum(top, 1e-9), 0.0)
+        best = np.argmax(emotion_scores, axis=1)
+
+        results = []
+        for i in range(n):
+            if compound[i] >= SENTIMENT_THRESHOLD:
+                sentiment = "positive"
+            elif compound[i] <= -SENTIMENT_THRESHOLD:
+                sentiment = "negative"
+            else:
+                sentiment = "neutral"
+
+            emotion = self.emotions[best[i]] if top[i] > 0 else "neutral"
+            # Mixed messages ("happy but exhausted and miserable") land on one side each; let the LLM decide
+            agrees = EMOTION_POLARITY.get(emotion, 0) * SENTIMENT_POLARITY[sentiment] >= 0
+            results.append({
+                "emotion": emotion,
+                "sentiment": sentiment,
+                "compound": float(compound[i]),
+                "hits": int(hits[i]),
+                "confident": bool(hits[i] > 0 and margin[i] >= 0.5 and abs(compound[i]) >= 0.3 and agrees),
+            })
+        return results
+
+    def score(self, text: str) -> dict:
+        return self.score_batch([text])[0]
+
+    def detect_emotion_batch(self, texts) -> list:
+        """Same {"emotion", "sentiment"} shape as NLPEngine.detect_emotion, for many texts"""
+        return [
+            {"emotion": result["emotion"], "sentiment": result["sentiment"]}
+            for result in self.score_batch(texts)
+        ]
+
+    def detect_emotion(self, text: str) -> dict:
+        return self.detect_emotion_batch([text])[0]
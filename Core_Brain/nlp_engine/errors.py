@@ -0,0 +1,72 @@
+# Typed failures for LLM calls, raised instead of returning "[Groq Error]" strings
+import time
+from email.utils import parsedate_to_datetime
+
+
+class LLMError(Exception):
+    """Base class: the model call failed and there is no completion to use."""
+    retryable = True
+    # Whether this failure says something about upstream health (counts toward the circuit breaker)
+    trips_breaker = True
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMTimeoutError(LLMError):
+    """Connect or read timeout, or the call's overall deadline ran out."""
+
+
+class LLMConnectionError(LLMError):
+    """DNS, TCP or TLS failure before a response arrived."""
+
+
+class LLMRateLimitError(LLMError):
+    """HTTP 429. retry_after holds the server's Retry-After in seconds, if sent."""
+    trips_breaker = False
+
+
+class LLMHTTPError(LLMError):
+    """Any other non-200 status. 5xx and 408 are retried; other 4xx are not."""
+    def __init__(self, message, status_code, retry_after=None):
+        super().__init__(message, retry_after=retry_after)
+        self.status_code = status_code
+        server_side = status_code >= 500 or status_code == 408
+        self.retryable = server_side
+        self.trips_breaker = server_side
+
+
+class LLMResponseError(LLMError):
+    """A 200 response with an empty or malformed body."""
+    trips_breaker = False
+
+
+class CircuitOpenError(LLMError):
+    """The circuit breaker is open; the call was rejected without touching the network."""
+    retryable = False
+    trips_breaker = False
+
+
+def parse_retry_after(value):
+    """Retry-After header as seconds (delta-seconds or HTTP-date form), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def error_for_status(status_code, headers, body=""):
+    """Map a non-200 HTTP response to the matching LLMError."""
+    retry_after = parse_retry_after(headers.get("Retry-After") or headers.get("retry-after"))
+    detail = f"HTTP {status_code}: {str(body)[:200]}"
+    if status_code == 429:
+        return LLMRateLimitError(detail, retry_after=retry_after)
+    return LLMHTTPError(detail, status_code, retry_after=retry_after)
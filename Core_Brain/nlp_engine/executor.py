@@ -0,0 +1,26 @@
+# Shared bounded thread pool for fanning out blocking LLM calls
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import EXECUTOR_WORKERS
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the process-wide classifier pool, creating it on first use.
+
+    The pool is recreated after a fork (gunicorn workers) because worker
+    threads do not survive into the child process.
+    """
+    global _executor, _executor_pid
+
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="nlp")
+            _executor_pid = os.getpid()
+        return _executor
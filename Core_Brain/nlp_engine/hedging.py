@@ -0,0 +1,223 @@
+# Hedged requests: a call that is running late gets a duplicate, and the first answer wins
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures, FIRST_COMPLETED
+
+from .config import (
+    EXECUTOR_WORKERS, HEDGE_TASKS, HEDGE_QUANTILE, HEDGE_MIN_DELAY, HEDGE_MAX_RATE,
+    HEDGE_WINDOW, HEDGE_MIN_SAMPLES
+)
+
+logger = logging.getLogger(__name__)
+
+_BUDGET_BURST = 10.0  # hedges that may be banked during quiet periods
+
+
+class HedgingPolicy:
+    """
+    Decides when a task's call is late enough to hedge. The threshold is the
+    rolling HEDGE_QUANTILE of the task's recent latencies (never below
+    min_delay), and a budget that earns max_rate of a hedge per call caps the
+    extra load at that fraction. No hedging happens until a task has
+    min_samples latencies.
+    """
+    def __init__(self, tasks=HEDGE_TASKS, quantile=HEDGE_QUANTILE, min_delay=HEDGE_MIN_DELAY,
+                 max_rate=HEDGE_MAX_RATE, window=HEDGE_WINDOW, min_samples=HEDGE_MIN_SAMPLES):
+        self.tasks = set(tasks)
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_rate = max_rate
+        self.window = window
+        self.min_samples = min_samples
+
+        self._lock = threading.Lock()
+        self._latencies = {task: deque(maxlen=window) for task in self.tasks}
+        self._budget = 0.0
+        self._stats = {task: {"calls": 0, "hedged": 0, "won": 0, "suppressed": 0} for task in self.tasks}
+
+    def applies(self, task) -> bool:
+        return task in self.tasks
+
+    @staticmethod
+    def _quantile(samples, q) -> float:
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def begin(self, task):
+        """Count a call; returns the hedge delay in seconds, or None while there is too little history."""
+        with self._lock:
+            self._stats[task]["calls"] += 1
+            self._budget = min(_BUDGET_BURST, self._budget + self.max_rate)
+            samples = self._latencies[task]
+            if len(samples) < self.min_samples:
+                return None
+            return max(self.min_delay, self._quantile(samples, self.quantile))
+
+    def try_hedge(self, task) -> bool:
+        """Spend one hedge from the budget; False (and counted as suppressed) when it is exhausted."""
+        with self._lock:
+            if self._budget < 1.0:
+                self._stats[task]["suppressed"] += 1
+                return False
+            self._budget -= 1.0
+            self._stats[task]["hedged"] += 1
+            return True
+
+    def record_suppressed(self, task):
+        with self._lock:
+            self._stats[task]["suppressed"] += 1
+
+    def record(self, task, seconds, hedge_won=False):
+        with self._lock:
+            self._latencies[task].append(seconds)
+            if hedge_won:
+                self._stats[task]["won"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = {}
+            for task, counts in self._stats.items():
+                samples = self._latencies[task]
+                stats[task] = dict(
+                    counts,
+                    p50=round(self._quantile(samples, 0.5), 4) if samples else None,
+                    p90=round(self._quantile(samples, 0.9), 4) if samples else None
+                )
+            return {"tasks": stats, "budget": round(self._budget, 2), "max_rate": self.max_rate}
+
+
+def run_hedged(policy, task, attempt, admit=None):
+    """
+    Run attempt() (one blocking request) and return its result. If it has not
+    finished by the task's hedge delay and the budget allows, a second
+    attempt() starts and the first to succeed wins; the loser's result is
+    discarded. admit(), if given, may veto the hedge by returning None, or
+    returns a callable that releases what it reserved once the hedge finishes.
+    If both attempts fail, the primary's error is raised.
+    """
+    delay = policy.begin(task)
+    started = time.monotonic()
+    if delay is None:
+        result = attempt()
+        policy.record(task, time.monotonic() - started)
+        return result
+
+    pool = get_hedge_executor()
+    primary = pool.submit(attempt)
+    done, _ = wait_futures([primary], timeout=delay)
+    release = None
+    if not done:
+        release = admit() if admit is not None else (lambda: None)
+        if release is None:
+            policy.record_suppressed(task)
+        elif not policy.try_hedge(task):
+            release()
+            release = None
+    if release is None:
+        result = primary.result()
+        policy.record(task, time.monotonic() - started)
+        return result
+
+    hedge = pool.submit(attempt)
+    hedge.add_done_callback(lambda _: release())
+    logger.info(f"[Hedge] {task} call still running after {delay:.3f}s; sent a duplicate")
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+        for future in sorted(done, key=lambda f: f is hedge):
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                policy.record(task, time.monotonic() - started, hedge_won=future is hedge)
+                return future.result()
+    raise primary.exception()
+
+
+async def run_hedged_async(policy, task, attempt, admit=None):
+    """
+    run_hedged for coroutines: attempt and admit are coroutine functions, and
+    the loser is cancelled.
+    """
+    delay = policy.begin(task)
+    started = time.monotonic()
+    if delay is None:
+        result = await attempt()
+        policy.record(task, time.monotonic() - started)
+        return result
+
+    primary = asyncio.ensure_future(attempt())
+    hedge = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        release = None
+        if not done:
+            release = await admit() if admit is not None else (lambda: None)
+            if release is None:
+                policy.record_suppressed(task)
+            elif not policy.try_hedge(task):
+                release()
+                release = None
+        if release is None:
+            result = await primary
+            policy.record(task, time.monotonic() - started)
+            return result
+
+        hedge = asyncio.ensure_future(attempt())
+        hedge.add_done_callback(lambda _: release())
+        logger.info(f"[Hedge] {task} call still running after {delay:.3f}s; sent a duplicate")
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: f is hedge):
+                if future.exception() is None:
+                    policy.record(task, time.monotonic() - started, hedge_won=future is hedge)
+                    return future.result()
+        raise primary.exception()
+    finally:
+        # The loser (or both, if the caller was cancelled) stops here, closing its connection
+        for future in (primary, hedge):
+            if future is not None and not future.done():
+                future.cancel()
+
+
+_policy = None
+_executor = None
+_pid = None
+_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _policy, _executor, _pid
+    if _pid != os.getpid():
+        _policy = None
+        _executor = None
+        _pid = os.getpid()
+
+
+def get_hedging_policy() -> HedgingPolicy:
+    """Per-process policy, so every engine's calls feed one latency history per task."""
+    global _policy
+
+    with _lock:
+        _reset_after_fork()
+        if _policy is None:
+            _policy = HedgingPolicy()
+        return _policy
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """
+    Pool for hedged attempts. Separate from the shared classifier pool, whose
+    threads are the callers waiting on these attempts.
+    """
+    global _executor
+
+    with _lock:
+        _reset_after_fork()
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2 * EXECUTOR_WORKERS, thread_name_prefix="nlp-hedge")
+        return _executor
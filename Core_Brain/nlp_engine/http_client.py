@@ -0,0 +1,145 @@
+# Pooled, keep-alive HTTP client shared by every LLM call in a process
+import os
+import time
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .config import (
+    HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE,
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Counts requests sent and TCP/TLS connections opened by a client."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": max(0, self.requests - self.connections_opened)
+            }
+
+
+def _counting_pool(base_class, stats):
+    """Subclass a urllib3 pool so every new connection is counted."""
+    class CountingPool(base_class):
+        def _new_conn(self):
+            stats.record_connection()
+            return super()._new_conn()
+
+    CountingPool.__name__ = f"Counting{base_class.__name__}"
+    return CountingPool
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, stats, **kwargs):
+        # init_poolmanager runs inside HTTPAdapter.__init__, so stats must exist first
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self._stats),
+            "https": _counting_pool(HTTPSConnectionPool, self._stats),
+        }
+
+
+class PooledHTTPClient:
+    """
+    requests.Session with a tuned connection pool, split connect/read
+    timeouts and an optional keep-warm thread.
+    """
+    def __init__(self, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                 connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT):
+        self.stats = PoolStats()
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+
+        # Retries are handled by the caller, never silently inside urllib3
+        adapter = _CountingAdapter(
+            self.stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._last_used = time.monotonic()
+        self._keep_warm_thread = None
+        self._keep_warm_stop = threading.Event()
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        self.stats.record_request()
+        self._last_used = time.monotonic()
+        return self.session.request(method, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def start_keep_warm(self, url, interval, headers=None):
+        """
+        Send a cheap HEAD to url whenever the client has been idle for `interval`
+        seconds, so the first real request after a quiet period reuses a live
+        connection instead of paying for a new handshake. Safe to call repeatedly.
+        """
+        if interval <= 0 or (self._keep_warm_thread and self._keep_warm_thread.is_alive()):
+            return
+
+        def _run():
+            while not self._keep_warm_stop.wait(interval):
+                if time.monotonic() - self._last_used < interval:
+                    continue
+                try:
+                    self.request("HEAD", url, headers=headers).close()
+                except requests.RequestException as e:
+                    logger.debug(f"Keep-warm request failed: {e}")
+
+        self._keep_warm_thread = threading.Thread(target=_run, name="nlp-keep-warm", daemon=True)
+        self._keep_warm_thread.start()
+
+    def stop_keep_warm(self):
+        self._keep_warm_stop.set()
+
+    def get_stats(self) -> dict:
+        stats = self.stats.snapshot()
+        stats["keep_warm"] = bool(self._keep_warm_thread and self._keep_warm_thread.is_alive())
+        return stats
+
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def get_http_client() -> PooledHTTPClient:
+    """Return the per-process client. Sessions are never shared across a fork."""
+    global _client, _client_pid
+
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = PooledHTTPClient()
+            _client_pid = os.getpid()
+        return _client
@@ -0,0 +1,176 @@
+# Local CPU-only intent classifier: pattern rules + hashed n-gram linear model
+import re
+import zlib
+
+import numpy as np
+
+from .config import SUPPORTED_INTENTS
+
+N_FEATURES = 2 ** 14
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+|[?!]")
+
+# (intent, pattern, confidence). First match wins, so the order matters.
+RULES = [
+    ("greeting", re.compile(
+        r"^\s*(hi+|hello+|hey+|hiya|howdy|yo|sup|good (morning|afternoon|evening|night)|"
+        r"thanks?( you)?( so much)?|thank you|thx|ty|bye|goodbye|see you)"
+        r"( there| echo| suzi)?\s*[!.?]*\s*$"
+    ), 0.97),
+    ("get_weather", re.compile(
+        r"\b(weather|forecast|temperature outside|is it (going to )?(rain|snow)|raining|snowing|humidity)\b"
+    ), 0.93),
+    ("emotional_support", re.compile(
+        r"\b(i('m| am) (so |really |very )?(sad|depressed|lonely|anxious|stressed|scared|overwhelmed|hopeless|upset)|"
+        r"i feel (so |really |very )?(sad|down|lonely|anxious|stressed|empty|lost|worthless)|"
+        r"can't cope|panic attack|nobody cares)\b"
+    ), 0.9),
+    ("question", re.compile(
+        r"^\s*(what|who|when|where|why|how|which|is|are|can|could|do|does|did|will|would|should)\b[^.!]*\?\s*$"
+    ), 0.85),
+]
+
+
+def match_rules(text: str):
+    """Return (intent, confidence) for the first matching rule, or (None, 0.0)."""
+    lowered = text.lower()
+    for intent, pattern, confidence in RULES:
+        if pattern.search(lowered):
+            return intent, confidence
+    return None, 0.0
+
+
+def _hash(feature: str, n_features: int) -> int:
+    # crc32 is stable across processes, unlike hash() with PYTHONHASHSEED randomization
+    return zlib.crc32(feature.encode("utf-8")) % n_features
+
+
+def featurize(texts, n_features=N_FEATURES):
+    """
+    Sparse hashed features for a batch: word unigrams, word bigrams and
+    character trigrams, L2-normalised per text.
+    Returns (rows, cols, vals) coordinate arrays.
+    """
+    rows, cols = [], []
+    for i, text in enumerate(texts):
+        tokens = _TOKEN_RE.findall(text.lower())
+        features = [f"w:{t}" for t in tokens]
+        features += [f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+        for t in tokens:
+            padded = f"#{t}#"
+            features += [f"c:{padded[j:j + 3]}" for j in range(len(padded) - 2)]
+        features.append("bias")
+
+        rows.extend([i] * len(features))
+        cols.extend(_hash(f, n_features) for f in features)
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    counts = np.bincount(rows, minlength=len(texts)).astype(np.float32)
+    vals = 1.0 / np.sqrt(counts[rows])
+    return rows, cols, vals.astype(np.float32)
+
+
+class LocalIntentClassifier:
+    """
+    Softmax regression over hashed n-grams, fronted by high-precision pattern rules.
+    predict() returns (intent, confidence); callers send low-confidence inputs to the LLM.
+    """
+    def __init__(self, weights=None, bias=None, labels=None, n_features=N_FEATURES):
+        self.labels = list(labels or SUPPORTED_INTENTS)
+        self.n_features = n_features
+        self.weights = weights  # (n_features, n_labels) or None until trained/loaded
+        self.bias = bias        # (n_labels,)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        return cls(
+            weights=data["weights"],
+            bias=data["bias"],
+            labels=[str(label) for label in data["labels"]],
+            n_features=int(data["n_features"])
+        )
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            labels=np.asarray(self.labels),
+            n_features=np.asarray(self.n_features)
+        )
+
+    @property
+    def trained(self) -> bool:
+        return self.weights is not None
+
+    def _logits(self, rows, cols, vals, n):
+        logits = np.tile(self.bias, (n, 1)).astype(np.float32)
+        np.add.at(logits, rows, vals[:, None] * self.weights[cols])
+        return logits
+
+    def predict_proba(self, texts) -> np.ndarray:
+        """(len(texts), n_labels) class probabilities from the linear model"""
+        if not self.trained:
+            raise ValueError("LocalIntentClassifier has no weights; train or load a model first")
+        rows, cols, vals = featurize(texts, self.n_features)
+        return _softmax(self._logits(rows, cols, vals, len(texts)))
+
+    def predict(self, text: str):
+        """Return (intent, confidence). Rules take precedence over the model."""
+        intent, confidence = match_rules(text)
+        if intent is not None:
+            return intent, confidence
+        if not self.trained:
+            return None, 0.0
+
+        proba = self.predict_proba([text])[0]
+        best = int(np.argmax(proba))
+        return self.labels[best], float(proba[best])
+
+    def predict_batch(self, texts):
+        """Vectorised predict() for many texts; returns a list of (intent, confidence)."""
+        results = [match_rules(text) for text in texts]
+        pending = [i for i, (intent, _) in enumerate(results) if intent is None]
+        if pending and self.trained:
+            proba = self.predict_proba([texts[i] for i in pending])
+            best = np.argmax(proba, axis=1)
+            for i, label_idx, p in zip(pending, best, proba[np.arange(len(pending)), best]):
+                results[i] = (self.labels[int(label_idx)], float(p))
+        return results
+
+    def fit(self, texts, labels, epochs=40, learning_rate=2.0, l2=1e-5, batch_size=256, seed=0):
+        """Mini-batch gradient descent on the softmax cross-entropy loss."""
+        label_index = {label: i for i, label in enumerate(self.labels)}
+        y = np.asarray([label_index[label] for label in labels], dtype=np.int64)
+        n, k = len(texts), len(self.labels)
+
+        rng = np.random.default_rng(seed)
+        self.weights = np.zeros((self.n_features, k), dtype=np.float32)
+        self.bias = np.zeros(k, dtype=np.float32)
+
+        for _ in range(epochs):
+            order = rng.permutation(n)
+            for start in range(0, n, batch_size):
+                batch = order[start:start + batch_size]
+                rows, cols, vals = featurize([texts[i] for i in batch], self.n_features)
+                m = len(batch)
+
+                error = _softmax(self._logits(rows, cols, vals, m))
+                error[np.arange(m), y[batch]] -= 1.0
+                error /= m
+
+                grad = np.zeros_like(self.weights)
+                np.add.at(grad, cols, vals[:, None] * error[rows])
+                grad += l2 * self.weights
+
+                self.weights -= learning_rate * grad
+                self.bias -= learning_rate * error.sum(axis=0)
+        return self
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
@@ -0,0 +1,119 @@
+# Load shedding: under pressure, requests step down a quality ladder instead of all queueing
+import os
+import time
+import threading
+
+from .config import SHED_ENABLED, SHED_QUEUE_TIERS, SHED_WAIT_TIERS, SHED_HOLD_SECONDS
+from .rate_limiter import get_rate_limiter
+from .resilience import get_circuit_breaker
+
+FULL, LOCAL_LABELS, REPLY_ONLY, CANNED = 0, 1, 2, 3
+TIER_NAMES = {FULL: "full", LOCAL_LABELS: "local_labels", REPLY_ONLY: "reply_only", CANNED: "canned"}
+
+
+def _level(value, thresholds) -> int:
+    """Highest tier whose threshold value has reached (0 if none)."""
+    tier = FULL
+    for index, threshold in enumerate(thresholds[:CANNED]):
+        if value >= threshold:
+            tier = index + 1
+    return tier
+
+
+class LoadShedder:
+    """
+    Picks each request's quality tier from live signals on the LLM path:
+    calls queued for rate-limiter quota, the recent queue wait, and the
+    circuit breaker. Calls in flight are not pressure by themselves: without
+    a limiter nothing queues, however many conversations are running.
+    The tier rises at once; it falls only after hold_seconds without pressure
+    calling for it, so a burst does not flap the ladder.
+    A half-open circuit yields tier 2, so the probe is a single short call.
+    """
+    def __init__(self, limiter, breaker, enabled=SHED_ENABLED, queue_tiers=SHED_QUEUE_TIERS,
+                 wait_tiers=SHED_WAIT_TIERS, hold_seconds=SHED_HOLD_SECONDS):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.enabled = enabled
+        self.queue_tiers = list(queue_tiers)
+        self.wait_tiers = list(wait_tiers)
+        self.hold_seconds = hold_seconds
+
+        self._lock = threading.Lock()
+        self._tier = FULL
+        self._held_until = 0.0
+        self._requests = {tier: 0 for tier in TIER_NAMES}
+        self._changes = 0
+
+    def signals(self) -> dict:
+        stats = self.limiter.stats
+        return {
+            "queue_depth": stats.queued(),
+            "limiter_wait": round(stats.recent_wait(), 4),
+            "breaker": self.breaker.state
+        }
+
+    def _pressure_tier(self, signals) -> int:
+        if self.breaker.blocked():
+            breaker_tier = CANNED
+        elif signals["breaker"] != self.breaker.CLOSED:
+            breaker_tier = REPLY_ONLY
+        else:
+            breaker_tier = FULL
+        return max(
+            _level(signals["queue_depth"], self.queue_tiers),
+            _level(signals["limiter_wait"], self.wait_tiers),
+            breaker_tier
+        )
+
+    def current_tier(self) -> int:
+        """Tier for a request starting now; counted in the per-tier totals."""
+        if not self.enabled:
+            with self._lock:
+                self._requests[FULL] += 1
+            return FULL
+
+        pressure = self._pressure_tier(self.signals())
+        now = time.monotonic()
+        with self._lock:
+            if pressure > FULL and pressure >= self._tier:
+                self._held_until = now + self.hold_seconds
+            elif pressure < self._tier and now < self._held_until:
+                pressure = self._tier
+            if pressure != self._tier:
+                self._changes += 1
+                self._tier = pressure
+            self._requests[pressure] += 1
+            return pressure
+
+    def get_stats(self) -> dict:
+        signals = self.signals()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "tier": self._tier,
+                "tier_name": TIER_NAMES[self._tier],
+                "signals": signals,
+                "requests_by_tier": {TIER_NAMES[tier]: count for tier, count in self._requests.items()},
+                "tier_changes": self._changes,
+                "queue_tiers": self.queue_tiers,
+                "wait_tiers": self.wait_tiers
+            }
+
+
+_shedders = {}
+_shedders_pid = None
+_lock = threading.Lock()
+
+
+def get_load_shedder(name="groq") -> LoadShedder:
+    """Per-process shedder per upstream, watching that upstream's breaker and the shared limiter."""
+    global _shedders_pid
+
+    with _lock:
+        if _shedders_pid != os.getpid():
+            _shedders.clear()
+            _shedders_pid = os.getpid()
+        if name not in _shedders:
+            _shedders[name] = LoadShedder(get_rate_limiter(), get_circuit_breaker(name))
+        return _shedders[name]
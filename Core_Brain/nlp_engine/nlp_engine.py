@@ -1,86 +1,592 @@
 # NLP, intent detection, emotion sense
 import sys
 import os
+import re
+import math
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import json
 import time
-from functools import lru_cache
-import requests
 import logging
-from dotenv import load_dotenv
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from .config import (
+    SUPPORTED_INTENTS, SUPPORTED_SENTIMENTS, ANALYSIS_MODE, CLASSIFIER_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_KEEP_WARM_INTERVAL, LOCAL_INTENT_ENABLED, INTENT_MODEL_PATH,
+    INTENT_CONFIDENCE_THRESHOLD, INTENT_LOG_PATH, EMOTION_MODE,
+    CACHE_LABEL_TTL, CACHE_REPLIES, CACHE_REPLY_TTL,
+    BATCH_PACK_SIZE, BATCH_CONCURRENCY, BATCH_RETRY_RATIO, PROMPT_SUMMARY_MODE, ROUTES, PERSONALITY_ROUTES,
+    SPECULATIVE_RECHECK_INTENTS, SHED_REPLY_TOKENS
+)
+from .executor import get_executor
+from .http_client import get_http_client
+from .backends import get_backend
+from .cache import get_response_cache
+from .single_flight import SingleFlight, payload_key
+from .errors import (
+    LLMError, LLMTimeoutError, LLMConnectionError, LLMRateLimitError, LLMResponseError, error_for_status
+)
+from .resilience import RetryPolicy, CallStats, get_circuit_breaker
+from .rate_limiter import RateLimitTimeoutError, estimate_request_tokens, get_rate_limiter
+from .hedging import get_hedging_policy, run_hedged
+from .load_shedding import FULL, LOCAL_LABELS, CANNED, get_load_shedder
+from .response_length import ReplyLengthPolicy, ReplyLengthStats, trim_to_sentence
+from .prompt_builder import (
+    PromptBuilder, estimate_tokens, estimate_messages_tokens, turns_from_text, history_turns
+)
+
+# The local classifiers need numpy; without it every decision goes to the LLM
+try:
+    from .intent_classifier import LocalIntentClassifier
+    from .emotion_lexicon import LexiconEmotionAnalyzer
+except ImportError:
+    LocalIntentClassifier = None
+    LexiconEmotionAnalyzer = None
+
+FUSED_SYSTEM_PROMPT = (
+    "You are Echo, a helpful AI assistant. Read the user's message, work out how they feel "
+    "and what they want, then reply to them.\n"
+    "Respond ONLY with a JSON object with exactly these keys:\n"
+    f"  \"intent\": one of {', '.join(SUPPORTED_INTENTS)}\n"
+    "  \"emotion\": one lowercase word for the user's emotion, e.g. happy, sad, angry, anxious, neutral\n"
+    f"  \"sentiment\": one of {', '.join(SUPPORTED_SENTIMENTS)}\n"
+    "  \"reply\": Echo's reply with empathy and understanding (2-3 sentences)"
+)
+
+# Fused prompt for a message whose intent the local classifier already decided;
+# the intent goes in the per-turn details, so this prefix stays the same every turn
+FUSED_KNOWN_INTENT_SYSTEM_PROMPT = (
+    "You are Echo, a helpful AI assistant. Read the user's message, work out how they feel, "
+    "then reply to them, taking the intent given below into account.\n"
+    "Respond ONLY with a JSON object with exactly these keys:\n"
+    "  \"emotion\": one lowercase word for the user's emotion, e.g. happy, sad, angry, anxious, neutral\n"
+    f"  \"sentiment\": one of {', '.join(SUPPORTED_SENTIMENTS)}\n"
+    "  \"reply\": Echo's reply with empathy and understanding (2-3 sentences)"
+)
+
+CLASSIFY_SYSTEM_PROMPT = (
+    "You are an intent, emotion and sentiment detector. Do not reply to the user.\n"
+    "Respond ONLY with a JSON object with exactly these keys:\n"
+    f"  \"intent\": one of {', '.join(SUPPORTED_INTENTS)}\n"
+    "  \"emotion\": one lowercase word for the user's emotion, e.g. happy, sad, angry, anxious, neutral\n"
+    f"  \"sentiment\": one of {', '.join(SUPPORTED_SENTIMENTS)}"
+)
+
+REPLY_SYSTEM_PROMPT = (
+    "You are Echo, a helpful AI assistant. "
+    "Reply to the user's latest message as Echo with empathy and understanding (2-3 sentences), "
+    "taking the earlier conversation and the detected emotion, intent and sentiment into account."
+)
+
+# Speculative replies start before the labels are known, so the prompt carries none
+SPECULATIVE_REPLY_SYSTEM_PROMPT = (
+    "You are Echo, a helpful AI assistant. "
+    "Reply to the user's latest message as Echo with empathy and understanding (2-3 sentences), "
+    "taking the earlier conversation and how the user seems to feel into account."
+)
+
+BATCH_CLASSIFY_SYSTEM_PROMPT = (
+    "You are an intent, emotion and sentiment detector. The user message is a JSON array "
+    "of {\"id\", \"text\"} messages from different people. Label each message on its own; "
+    "do not reply to any of them.\n"
+    "Respond ONLY with a JSON object {\"results\": [...]} holding one entry per message, "
+    "each with exactly these keys:\n"
+    "  \"id\": the message id\n"
+    f"  \"intent\": one of {', '.join(SUPPORTED_INTENTS)}\n"
+    "  \"emotion\": one lowercase word for the user's emotion, e.g. happy, sad, angry, anxious, neutral\n"
+    f"  \"sentiment\": one of {', '.join(SUPPORTED_SENTIMENTS)}"
+)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "Summarize the conversation below in one or two sentences for the assistant's own notes: "
+    "what the user talked about, how they felt and anything they asked to be remembered. "
+    "Reply with the summary only."
+)
+
+# Cache entries of each kind hold the output of this routing task's model
+CACHE_TASKS = {"intent": "intent", "emotion": "emotion", "labels": "classify", "reply": "analysis", "summary": "summary"}
+
+# Sentinel returned by _parse_stream_line at the end of a streamed completion
+STREAM_DONE = object()
+
+# One flat {"id", "intent", ...} entry of a batch answer, for salvaging output that was cut off
+_BATCH_ENTRY_RE = re.compile(r"\{[^{}]*\}")
+
+# Tier 3 of load shedding answers without a model call, by the locally detected sentiment
+CANNED_REPLIES = {
+    "negative": "I'm here with you. Things are very busy on my side right now, "
+                "but I'm listening - tell me a little more about what's going on.",
+    "positive": "That's lovely to hear! I'm a little swamped at the moment, "
+                "but I'd love to hear more.",
+    "neutral": "I'm here and listening. Things are very busy on my side right now, "
+               "so bear with me - tell me a little more?",
+}
+
+
+class Completion(str):
+    """Completion text that also carries the API's finish_reason and completion token count."""
+    def __new__(cls, text, finish_reason=None, completion_tokens=None):
+        completion = super().__new__(cls, text)
+        completion.finish_reason = finish_reason
+        completion.completion_tokens = completion_tokens
+        return completion
+
 
-load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+class RetryBudget:
+    """Re-sent packs one batch may still spend, shared by the threads or tasks labelling its packs."""
+    def __init__(self, requests: int):
+        self._lock = threading.Lock()
+        self.remaining = requests
+
+    @classmethod
+    def for_packs(cls, packs: int):
+        return cls(max(1, math.ceil(packs * BATCH_RETRY_RATIO)))
+
+    def take(self, requests: int = 1) -> bool:
+        with self._lock:
+            if self.remaining < requests:
+                return False
+            self.remaining -= requests
+            return True
 
 
 class NLPEngine:
-    def __init__(self, model_name="llama3-8b-8192"):
+    def __init__(self, model_name="llama3-8b-8192", analysis_mode=None, emotion_mode=None, backend=None):
         self.model_name = model_name
+        self.analysis_mode = analysis_mode or ANALYSIS_MODE
+        self.emotion_mode = emotion_mode or EMOTION_MODE
         self.logger = logging.getLogger(__name__)
         logging.basicConfig(level=logging.INFO)
         
-        # Groq API setup for cloud deployment
-        self.api_url = "https://api.groq.com/openai/v1/chat/completions"
-        self.headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        # Groq by default; any OpenAI-compatible server or the local stand-in via NLP_LLM_BACKEND
+        self.backend = get_backend(backend)
+        self.api_url = self.backend.chat_url
+        self.headers = self.backend.headers
+
+        # One pooled keep-alive session per process instead of a new TCP+TLS handshake per call
+        self.http = get_http_client()
+        if HTTP_KEEP_WARM_INTERVAL > 0:
+            self.http.start_keep_warm(self.backend.models_url, HTTP_KEEP_WARM_INTERVAL, headers=self.headers)
+
+        # Cheap local decisions first; only low-confidence inputs cost an API call
+        self.intent_classifier = self._load_intent_classifier()
+        self.intent_threshold = INTENT_CONFIDENCE_THRESHOLD
+        self.emotion_analyzer = LexiconEmotionAnalyzer() \
+            if LexiconEmotionAnalyzer is not None and self.emotion_mode != "llm" else None
+        # Backoff with jitter inside a per-call deadline; fail fast while the upstream is down
+        self.retry_policy = RetryPolicy()
+        self.breaker = get_circuit_breaker(self.backend.name)
+        self.call_stats = CallStats()
+        # Requests/tokens per minute and in-flight cap, shared by the host's workers
+        self.rate_limiter = get_rate_limiter()
+        # Late calls on opted-in tasks (NLP_HEDGE_TASKS) get a duplicate request
+        self.hedging = get_hedging_policy()
+        # Under pressure requests step down to cheaper analysis instead of queueing
+        self.shedder = get_load_shedder(self.backend.name)
+
+        # Concurrent byte-identical requests share one upstream call
+        self.single_flight = SingleFlight()
+
+        # Repeated and near-identical messages are answered from the cache
+        self.cache = get_response_cache()
+        self._stats_lock = threading.Lock()
+        self.intent_stats = {"local": 0, "llm": 0}
+        self.emotion_stats = {"local": 0, "llm": 0, "fallback": 0}
+        self.batch_stats = {"items": 0, "packs": 0, "resplits": 0, "failed_slots": 0}
+        self.speculation_stats = {"runs": 0, "hits": 0, "misses": 0, "saved_seconds": 0.0, "wasted_calls": 0}
+
+        # Reply prompts are assembled within a token budget; usage is tallied per call
+        self.prompt_builder = PromptBuilder(summarizer=self._summarize_turns if PROMPT_SUMMARY_MODE == "llm" else None)
+        self.prompt_stats = {"built": 0, "turns_kept": 0, "turns_summarized": 0, "turns_dropped": 0}
+        self.token_stats = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated_prompt_tokens": 0}
+        # Calls per "task:model" route
+        self.route_stats = {}
+        # Reply budgets and stop sequences by intent and personality, and what replies really used
+        self.reply_policy = ReplyLengthPolicy()
+        self.reply_stats = ReplyLengthStats()
+
+
+    def _load_intent_classifier(self):
+        if not LOCAL_INTENT_ENABLED or LocalIntentClassifier is None:
+            return None
+        if os.path.exists(INTENT_MODEL_PATH):
+            try:
+                self.logger.info(f"Loading local intent model from {INTENT_MODEL_PATH}")
+                return LocalIntentClassifier.load(INTENT_MODEL_PATH)
+            except Exception as e:
+                self.logger.error(f"Failed to load local intent model: {e}")
+        # Pattern rules still work without trained weights
+        return LocalIntentClassifier()
+
+
+    def route(self, task: str, personality: str = None) -> dict:
+        """
+        Model, max_tokens, temperature and timeout for a task (see config.ROUTES),
+        with the personality's overrides applied.
+        """
+        if task not in ROUTES:
+            raise ValueError(f"Unknown LLM task '{task}'")
+        route = dict(ROUTES[task])
+        if personality:
+            route.update(PERSONALITY_ROUTES.get(personality.lower(), {}).get(task, {}))
+        route["model"] = route["model"] or self.model_name
+        return route
+
+
+    def _resolve_route(self, task, personality, max_tokens, temperature) -> dict:
+        """The task's route with explicit arguments taking precedence; logs and counts the call."""
+        route = self.route(task, personality)
+        if max_tokens is not None:
+            route["max_tokens"] = max_tokens
+        if temperature is not None:
+            route["temperature"] = temperature
+        if route["max_tokens"] is None:
+            raise ValueError(f"Task '{task}' has no default max_tokens; pass one")
+
+        key = f"{task}:{route['model']}"
+        with self._stats_lock:
+            self.route_stats[key] = self.route_stats.get(key, 0) + 1
+        self.logger.info(
+            f"[Route] task={task}{f' personality={personality}' if personality else ''} model={route['model']} "
+            f"max_tokens={route['max_tokens']} temperature={route['temperature']} timeout={route['timeout']}"
+        )
+        return route
 
-        
 
-    def call_groq_model(self, messages, max_tokens=200, temperature=0.7):
-        """Call Groq API - cloud-ready replacement for HF"""
+    def _build_payload(self, messages, route: dict, response_format=None, stream=False, stop=None) -> dict:
         payload = {
-            "model": self.model_name,
+            "model": route["model"],
             "messages": messages,
-            "max_tokens": max_tokens,
-            "temperature": temperature,
+            "max_tokens": route["max_tokens"],
+            "temperature": route["temperature"],
             "top_p": 1,
-            "stream": False
+            "stream": stream
         }
-        
-        for attempt in range(3):
+        if response_format:
+            # e.g. {"type": "json_object"} to constrain the completion to valid JSON
+            payload["response_format"] = response_format
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+
+    def call_groq_model(self, messages, max_tokens=None, temperature=None, response_format=None,
+                        task="reply", personality=None, intent=None, stop=None):
+        """
+        Call the configured LLM backend (Groq by default) - cloud-ready replacement for HF.
+        The model, limits and timeout come from the task's route; max_tokens and
+        temperature, when given, override it. Passing the detected intent of a
+        reply applies the reply length policy: its max_tokens and stop sequences,
+        and a cut-off reply trimmed back to its last full sentence.
+        Returns the completion text; raises an LLMError subclass when no completion could be had.
+        """
+        max_tokens, stop = self._apply_reply_policy(intent, personality, max_tokens, stop)
+        route = self._resolve_route(task, personality, max_tokens, temperature)
+        payload = self._build_payload(messages, route, response_format=response_format, stop=stop)
+        completion = self.single_flight.do(
+            payload_key(payload), lambda: self._request_completion(payload, route["timeout"], task)
+        )
+        if intent is not None:
+            return self.finish_reply(completion, intent, route["max_tokens"])
+        return completion
+
+
+    def _apply_reply_policy(self, intent, personality, max_tokens, stop):
+        """(max_tokens, stop) for a reply with this intent; explicit values win over the policy."""
+        if intent is None:
+            return max_tokens, stop
+        options = self.reply_policy.options(intent, personality)
+        return (
+            options["max_tokens"] if max_tokens is None else max_tokens,
+            options["stop"] if stop is None else stop
+        )
+
+
+    def finish_reply(self, completion, intent: str, max_tokens: int = None, trim: bool = True) -> str:
+        """
+        Record a reply's realized length under its intent and, if the model ran out
+        of tokens mid-sentence, trim it back to the last full sentence.
+        """
+        truncated = getattr(completion, "finish_reason", None) == "length"
+        tokens = getattr(completion, "completion_tokens", None) or estimate_tokens(completion)
+        if max_tokens and getattr(completion, "finish_reason", None) is None:
+            # No finish_reason (streams, fused JSON): a reply that used its whole budget was cut off
+            truncated = tokens >= max_tokens
+        text = str(completion).strip()
+        reply = trim_to_sentence(text) if truncated and trim else text
+        self.reply_stats.record(intent, tokens, max_tokens, truncated=truncated, trimmed=reply != text)
+        return reply
+
+
+    def _request_completion(self, payload: dict, timeout: float = None, task: str = None) -> str:
+        """
+        One logical completion request, retried under the retry policy and circuit
+        breaker within `timeout` seconds. Every attempt first queues for rate-limit
+        quota, and may be hedged if the task opts in.
+        """
+        deadline = self.retry_policy.start(timeout)
+        tokens = estimate_request_tokens(payload)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
             try:
-                response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)
-                
-                if not response.content:
-                    self.logger.warning(f"[Attempt {attempt+1}] Empty response from model.")
-                    time.sleep(3)
-                    continue
+                with self.rate_limiter.slot(tokens, deadline):
+                    content = self._send_attempt(payload, deadline, task, tokens)
+            except RateLimitTimeoutError as e:
+                self.call_stats.record_error(e)
+                raise
+            except LLMError as e:
+                self.breaker.record_failure(e)
+                self._penalize_rate_limit(e, attempt)
+                delay = self._retry_delay(attempt, e, deadline)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return content
+
+
+    def _send_attempt(self, payload: dict, deadline: float, task: str, tokens: int) -> str:
+        """One attempt; hedged with a duplicate request if it runs late and the task opts in."""
+        def attempt():
+            return self._send_completion(payload, self.retry_policy.remaining(deadline))
+
+        if not self.hedging.applies(task):
+            return attempt()
+        return run_hedged(self.hedging, task, attempt, admit=lambda: self._admit_hedge(tokens))
+
+
+    def _admit_hedge(self, tokens: int):
+        """
+        A hedge is an extra request against the shared quota: it goes out only if
+        the rate limiter has room right now. Returns the release callable, or None.
+        """
+        if not self.rate_limiter.enabled:
+            return lambda: None
+        wait, lease_id = self.rate_limiter.try_acquire(tokens, lease_ttl=60.0)
+        if wait > 0:
+            return None
+        return lambda: self.rate_limiter.release(lease_id)
+
+
+    def _rate_limit_pause(self, error, attempt):
+        """Seconds every worker should pause after error, or None when it is not a 429."""
+        if isinstance(error, LLMRateLimitError):
+            return error.retry_after if error.retry_after is not None else self.retry_policy.backoff(attempt)
+        return None
+
+
+    def _penalize_rate_limit(self, error, attempt):
+        """A 429 means the shared budget is wrong; pause every worker, not just this call."""
+        seconds = self._rate_limit_pause(error, attempt)
+        if seconds is not None:
+            self.rate_limiter.penalize(seconds)
+
+
+    def _retry_delay(self, attempt, error, deadline) -> float:
+        """Delay before the next attempt; re-raises error when the call should give up."""
+        delay = self.retry_policy.next_delay(attempt, error, deadline)
+        if delay is None:
+            self.call_stats.record_error(error)
+            self.logger.error(f"[Attempt {attempt+1}] Giving up: {error}")
+            raise error
+        self.call_stats.record_retry()
+        self.logger.warning(f"[Attempt {attempt+1}] {error}; retrying in {delay:.2f}s")
+        return delay
+
+
+    def _attempt_timeout(self, remaining: float):
+        """(connect, read) timeout for one attempt, bounded by what is left of the deadline"""
+        if remaining <= 0:
+            raise LLMTimeoutError("Call deadline exceeded")
+        return (min(HTTP_CONNECT_TIMEOUT, remaining), min(HTTP_READ_TIMEOUT, remaining))
+
+
+    def _send_completion(self, payload: dict, remaining: float) -> str:
+        try:
+            response = self.http.post(
+                self.api_url, headers=self.headers, json=payload, timeout=self._attempt_timeout(remaining)
+            )
+        except requests.Timeout as e:
+            raise LLMTimeoutError(f"Request timed out: {e}") from e
+        except requests.RequestException as e:
+            raise LLMConnectionError(f"Request Error: {e}") from e
+
+        if response.status_code != 200:
+            raise error_for_status(response.status_code, response.headers, response.text)
+        return self._completion_content(payload, response.content)
+
+
+    def _completion_content(self, payload: dict, body: bytes) -> str:
+        try:
+            data = json.loads(body)
+            choice = data["choices"][0]
+            content = choice["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMResponseError(f"Malformed completion: {e!r}") from e
+        if not content or not content.strip():
+            raise LLMResponseError("Empty completion")
+        completion_tokens = self._record_usage(payload, data.get("usage"), content)
+        return Completion(content.strip(), choice.get("finish_reason"), completion_tokens)
 
-                if response.status_code == 429:  # Rate limit
-                    self.logger.warning(f"[Attempt {attempt+1}] Rate limit hit, waiting...")
-                    time.sleep(5)
-                    continue
 
+    def _record_usage(self, payload: dict, usage, completion: str) -> int:
+        """
+        Tally prompt/completion tokens for one call; the local estimate stands in when
+        usage is missing. Returns the completion tokens.
+        """
+        estimated = estimate_messages_tokens(payload["messages"])
+        usage = usage if isinstance(usage, dict) else {}
+        prompt_tokens = int(usage.get("prompt_tokens") or estimated)
+        completion_tokens = int(usage.get("completion_tokens") or estimate_tokens(completion))
+
+        with self._stats_lock:
+            self.token_stats["calls"] += 1
+            self.token_stats["prompt_tokens"] += prompt_tokens
+            self.token_stats["completion_tokens"] += completion_tokens
+            self.token_stats["estimated_prompt_tokens"] += estimated
+        self.logger.info(
+            f"[Tokens] model={payload['model']} prompt={prompt_tokens} (estimated {estimated}) "
+            f"completion={completion_tokens} max_tokens={payload['max_tokens']}"
+        )
+        return completion_tokens
+
+
+    def stream_groq_model(self, messages, max_tokens=None, temperature=None, task="reply", personality=None,
+                          intent=None, stop=None):
+        """
+        Streaming variant of call_groq_model: yields content deltas as they arrive.
+        Retries only happen before the first token has been yielded; a failure after
+        that raises, since a retry would repeat text the caller has already sent.
+        With an intent the reply length policy sets max_tokens and stop; text that
+        has been sent is never trimmed.
+        """
+        max_tokens, stop = self._apply_reply_policy(intent, personality, max_tokens, stop)
+        route = self._resolve_route(task, personality, max_tokens, temperature)
+        payload = self._build_payload(messages, route, stream=True, stop=stop)
+        deadline = self.retry_policy.start(route["timeout"])
+        tokens = estimate_request_tokens(payload)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            streamed = []
+            try:
+                with self.rate_limiter.slot(tokens, deadline):
+                    for delta in self._stream_completion(payload, self.retry_policy.remaining(deadline)):
+                        streamed.append(delta)
+                        yield delta
+            except RateLimitTimeoutError as e:
+                self.call_stats.record_error(e)
+                raise
+            except LLMError as e:
+                self.breaker.record_failure(e)
+                self._penalize_rate_limit(e, attempt)
+                if streamed:
+                    self.call_stats.record_error(e)
+                    raise
+                time.sleep(self._retry_delay(attempt, e, deadline))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            # Streamed chunks carry no usage field, so both sides are estimated
+            self._record_usage(payload, None, "".join(streamed))
+            if intent is not None:
+                self.finish_reply("".join(streamed), intent, route["max_tokens"], trim=False)
+            return
+
+
+    def _stream_completion(self, payload: dict, remaining: float):
+        try:
+            with self.http.post(
+                self.api_url, headers=self.headers, json=payload, stream=True,
+                timeout=self._attempt_timeout(remaining)
+            ) as response:
                 if response.status_code != 200:
-                    self.logger.warning(f"[Attempt {attempt+1}] HTTP {response.status_code}: {response.text}")
-                    time.sleep(3)
-                    continue
+                    raise error_for_status(response.status_code, response.headers, response.text)
 
-                try:
-                    result = response.json()
-                    return result["choices"][0]["message"]["content"].strip()
-                
-                except Exception as e:
-                    self.logger.error(f"[Attempt {attempt+1}] JSON parsing error: {e}")
-                    time.sleep(3)
-                    continue
+                for line in response.iter_lines(decode_unicode=True):
+                    delta = self._parse_stream_line(line)
+                    if delta is STREAM_DONE:
+                        return
+                    if delta:
+                        yield delta
+        except requests.Timeout as e:
+            raise LLMTimeoutError(f"Stream timed out: {e}") from e
+        except requests.RequestException as e:
+            raise LLMConnectionError(f"Stream Request Error: {e}") from e
 
-            except Exception as e:
-                self.logger.error(f"[Attempt {attempt+1}] Request Error: {e}")
-                time.sleep(3)
 
-        return "[Groq Error]: Failed after 3 attempts"
+    def _parse_stream_line(self, line):
+        """
+        Server-sent events: "data: {json chunk}" lines, terminated by "data: [DONE]".
+        Returns the content delta, None for lines without content, or STREAM_DONE.
+        """
+        if not line or not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return STREAM_DONE
+        try:
+            chunk = json.loads(data)
+            return chunk["choices"][0].get("delta", {}).get("content")
+        except (json.JSONDecodeError, KeyError, IndexError) as e:
+            self.logger.warning(f"Skipping malformed stream chunk: {e}")
+            return None
+
+
+    def get_metrics(self) -> dict:
+        """Runtime counters for the engine's LLM call path."""
+        with self._stats_lock:
+            intent_stats = dict(self.intent_stats)
+            emotion_stats = dict(self.emotion_stats)
+            batch_stats = dict(self.batch_stats)
+            prompt_stats = dict(self.prompt_stats)
+            token_stats = dict(self.token_stats)
+            route_stats = dict(self.route_stats)
+            speculation_stats = dict(self.speculation_stats)
+
+        return {
+            "http_pool": self.http.get_stats(),
+            "intent_routing": intent_stats,
+            "emotion_routing": dict(emotion_stats, mode=self.emotion_mode),
+            "batch": batch_stats,
+            "speculation": self._speculation_summary(speculation_stats),
+            "reply_length": self.reply_stats.snapshot(),
+            "prompt": prompt_stats,
+            "tokens": token_stats,
+            "routes": route_stats,
+            "cache": self.cache.get_stats() if self.cache is not None else None,
+            "single_flight": self.single_flight.get_stats(),
+            "resilience": dict(self.call_stats.snapshot(), breaker=self.breaker.get_stats()),
+            "rate_limiter": self.rate_limiter.get_stats(),
+            "hedging": self.hedging.get_stats(),
+            "load_shedding": self.shedder.get_stats()
+        }
+
+
+    def _cache_model(self, kind) -> str:
+        """Entries are keyed by the model that produced them, so re-routing a task starts afresh."""
+        return self.route(CACHE_TASKS[kind])["model"]
+
+
+    def _cache_get(self, kind, text, **key_parts):
+        if self.cache is None:
+            return None
+        return self.cache.get(kind, text, model=self._cache_model(kind), **key_parts)
+
+
+    def _cache_set(self, kind, text, value, ttl=CACHE_LABEL_TTL, **key_parts):
+        if self.cache is not None:
+            self.cache.set(kind, text, value, ttl, model=self._cache_model(kind), **key_parts)
 
 
-    @lru_cache(maxsize=128)
     def detect_intent_cached(self, user_input: str) -> str:
+        """Kept for callers of the old lru_cache API; detect_intent caches by itself now."""
         return self.detect_intent(user_input)
 
 
-    def detect_intent(self, user_input: str) -> str:
-        messages = [
+    def _intent_messages(self, user_input: str) -> list:
+        return [
             {
                 "role": "system",
                 "content": "You are an intent detector. Respond with one word only: 'greeting', 'question', 'request', 'get_weather', 'emotional_support', 'manipulation_check', or 'unknown'."
@@ -90,14 +596,62 @@ class NLPEngine:
                 "content": user_input
             }
         ]
-        
-        result = self.call_groq_model(messages, max_tokens=10).lower().strip()
-        valid_intents = ["greeting", "question", "request", "get_weather", "emotional_support", "manipulation_check", "unknown"]
-        return result if result in valid_intents else "unknown"
 
 
-    def detect_emotion(self, user_input: str) -> dict:
-        messages = [
+    def _parse_intent(self, result: str) -> str:
+        result = result.lower().strip()
+        return result if result in SUPPORTED_INTENTS else "unknown"
+
+
+    def _local_intent(self, user_input: str):
+        """Confident local prediction, or None when the LLM should decide."""
+        if self.intent_classifier is None:
+            return None
+        intent, confidence = self.intent_classifier.predict(user_input)
+        if intent is None or confidence < self.intent_threshold:
+            return None
+        with self._stats_lock:
+            self.intent_stats["local"] += 1
+        return intent
+
+
+    def _record_llm_intent(self, user_input: str, intent: str):
+        with self._stats_lock:
+            self.intent_stats["llm"] += 1
+            if INTENT_LOG_PATH and intent != "unknown":
+                try:
+                    with open(INTENT_LOG_PATH, "a", encoding="utf-8") as f:
+                        f.write(json.dumps({"text": user_input, "intent": intent}) + "\n")
+                except OSError as e:
+                    self.logger.warning(f"Could not log intent label: {e}")
+
+
+    def _finish_llm_intent(self, user_input: str, result: str) -> str:
+        intent = self._parse_intent(result)
+        self._record_llm_intent(user_input, intent)
+        self._cache_set("intent", user_input, intent)
+        return intent
+
+
+    def detect_intent(self, user_input: str) -> str:
+        local = self._local_intent(user_input)
+        if local is not None:
+            return local
+
+        cached = self._cache_get("intent", user_input)
+        if cached is not None:
+            return cached
+
+        try:
+            result = self.call_groq_model(self._intent_messages(user_input), task="intent")
+        except LLMError as e:
+            self.logger.warning(f"[Intent] Model unavailable: {e}")
+            return "unknown"
+        return self._finish_llm_intent(user_input, result)
+
+
+    def _emotion_messages(self, user_input: str) -> list:
+        return [
             {
                 "role": "system", 
                 "content": "You are an emotion and sentiment detector. Reply ONLY with JSON like: {\"emotion\": \"sad\", \"sentiment\": \"negative\"}"
@@ -107,11 +661,12 @@ class NLPEngine:
                 "content": user_input
             }
         ]
-        
-        result = self.call_groq_model(messages, max_tokens=50)
-        
-        if result.startswith("[Groq Error]"):
-            return {"emotion": "neutral", "sentiment": "neutral"}
+
+
+    def _try_parse_emotion(self, result: str):
+        """Parsed {"emotion", "sentiment"} or None when the completion is missing or unusable."""
+        if result is None:
+            return None
 
         try:
             # Extract JSON from response
@@ -126,15 +681,84 @@ class NLPEngine:
                     return parsed_data
                 else:
                     self.logger.warning(f"Missing required fields in emotion detection response: {parsed_data}")
-                    return {"emotion": "neutral", "sentiment": "neutral"}
+                    return None
             
         except json.JSONDecodeError as e:
             self.logger.error(f"[JSON Parsing Error]: {e}")
         except Exception as e:
             self.logger.error(f"[Unexpected Error in emotion detection]: {e}")
-            
+
+        return None
+
+
+    def _parse_emotion(self, result: str) -> dict:
         # Default fallback
-        return {"emotion": "neutral", "sentiment": "neutral"}
+        return self._try_parse_emotion(result) or {"emotion": "neutral", "sentiment": "neutral"}
+
+
+    def _local_emotion(self, user_input: str):
+        """Lexicon result when the emotion mode lets it decide, else None."""
+        if self.emotion_analyzer is None:
+            return None
+
+        if self.emotion_mode == "lexicon":
+            result = self.emotion_analyzer.detect_emotion(user_input)
+        elif self.emotion_mode == "ensemble":
+            scored = self.emotion_analyzer.score(user_input)
+            if not scored["confident"]:
+                return None
+            result = {"emotion": scored["emotion"], "sentiment": scored["sentiment"]}
+        else:
+            return None
+
+        with self._stats_lock:
+            self.emotion_stats["local"] += 1
+        return result
+
+
+    def _resolve_llm_emotion(self, user_input: str, result) -> dict:
+        """Parse the model's answer (None if the call failed), falling back to the lexicon if configured."""
+        with self._stats_lock:
+            self.emotion_stats["llm"] += 1
+
+        parsed = self._try_parse_emotion(result)
+        if parsed is not None:
+            self._cache_set("emotion", user_input, parsed)
+        elif self.emotion_mode == "fallback" and self.emotion_analyzer is not None:
+            with self._stats_lock:
+                self.emotion_stats["fallback"] += 1
+            return self.emotion_analyzer.detect_emotion(user_input)
+        return parsed or {"emotion": "neutral", "sentiment": "neutral"}
+
+
+    def detect_emotion(self, user_input: str) -> dict:
+        local = self._local_emotion(user_input)
+        if local is not None:
+            return local
+
+        cached = self._cache_get("emotion", user_input)
+        if cached is not None:
+            return cached
+
+        try:
+            result = self.call_groq_model(self._emotion_messages(user_input), task="emotion")
+        except LLMError as e:
+            self.logger.warning(f"[Emotion] Model unavailable: {e}")
+            result = None
+        return self._resolve_llm_emotion(user_input, result)
+
+
+    def detect_emotion_batch(self, texts) -> list:
+        """
+        Emotion and sentiment for many texts. Uses the lexicon analyzer in one
+        vectorised pass when available, otherwise one detect_emotion call per text.
+        """
+        analyzer = self.emotion_analyzer
+        if analyzer is None and LexiconEmotionAnalyzer is not None:
+            analyzer = self.emotion_analyzer = LexiconEmotionAnalyzer()
+        if analyzer is not None:
+            return analyzer.detect_emotion_batch(list(texts))
+        return [self.detect_emotion(text) for text in texts]
 
     # def generate_response(self,intent: str , emotion: str , user_input: str) -> str:
     #     system_prompt = (
@@ -144,44 +768,655 @@ class NLPEngine:
     #     return self._call_llm(system_prompt, user_input, max_tokens=300)
 
 
-    def analyze(self, user_input: str, memory_manager=None) -> dict:
-        context = ""
-        if memory_manager:
-            context = memory_manager.get_context_text()
-
-        intent = self.detect_intent(user_input)
-        emotion_data = self.detect_emotion(user_input)
-        sentiment = emotion_data.get("sentiment", "neutral") if emotion_data else "neutral"
-        text = user_input
-
-        # Inject context into system prompt for better LLM reply
-        system_prompt = (
-            f"You are Echo, a helpful AI assistant.\n"
-            f"User's emotion: {emotion_data['emotion']}\n"
-            f"User's intent: {intent}\n"
-            f"Sentiment: {sentiment}\n"
-            f"User said: {text}\n"
-            "Reply as Echo with empathy and understanding (2-3 sentences):"
+    def _validate_labels(self, data):
+        """{"intent", "emotion", "sentiment"} from a decoded model object, or None if any is invalid."""
+        if not isinstance(data, dict):
+            return None
+        intent = str(data.get("intent", "")).lower().strip()
+        emotion = str(data.get("emotion", "")).lower().strip()
+        sentiment = str(data.get("sentiment", "")).lower().strip()
+        if intent not in SUPPORTED_INTENTS or sentiment not in SUPPORTED_SENTIMENTS or not emotion:
+            return None
+        return {"intent": intent, "emotion": emotion, "sentiment": sentiment}
+
+
+    def _parse_fused(self, result: str, with_reply: bool = True, intent: str = None):
+        """
+        Validate a fused completion. Returns the analysis dict, or None if unusable.
+        An intent decided locally is used in place of the model's.
+        """
+        try:
+            start_idx = result.find('{')
+            end_idx = result.rfind('}') + 1
+            if start_idx == -1 or end_idx == 0:
+                raise ValueError("no JSON object in response")
+            data = json.loads(result[start_idx:end_idx])
+        except (ValueError, json.JSONDecodeError) as e:
+            self.logger.warning(f"[Fused analysis] Invalid JSON: {e}")
+            return None
+        if intent is not None and isinstance(data, dict):
+            data["intent"] = intent
+
+        labels = self._validate_labels(data)
+        if labels is None:
+            self.logger.warning(f"[Fused analysis] Response failed validation: {data}")
+            return None
+        if not with_reply:
+            return labels
+
+        reply = data.get("reply")
+        if not isinstance(reply, str) or not reply.strip():
+            self.logger.warning(f"[Fused analysis] Response is missing a reply: {data}")
+            return None
+
+        labels["response"] = reply.strip()
+        return labels
+
+
+    def _history(self, context) -> list:
+        """(user, echo) turns from a list of turns or get_context_text()-style text."""
+        if not context:
+            return []
+        if isinstance(context, str):
+            return turns_from_text(context)
+        return list(context)
+
+
+    def _context_text(self, context) -> str:
+        """Canonical text form of the context, used in cache keys."""
+        if isinstance(context, str):
+            return context
+        return "\n".join(f"User: {user}\nEcho: {echo}" for user, echo in self._history(context))
+
+
+    def build_prompt(self, system: str, user_input: str, context=None, volatile: str = "") -> list:
+        """
+        Chat messages for a reply within the prompt token budget: stable system
+        instructions, older turns summarized or trimmed, recent turns, then the
+        per-turn details in volatile and the user's message.
+        context is a list of (user, reply) turns or get_context_text() output.
+        """
+        prompt = self.prompt_builder.build(system, user_input, self._history(context), volatile)
+        with self._stats_lock:
+            self.prompt_stats["built"] += 1
+            self.prompt_stats["turns_kept"] += prompt.turns_kept
+            self.prompt_stats["turns_summarized"] += prompt.turns_summarized
+            self.prompt_stats["turns_dropped"] += prompt.turns_dropped
+        if prompt.turns_summarized or prompt.turns_dropped:
+            self.logger.info(
+                f"[Prompt] {prompt.prompt_tokens} tokens; kept {prompt.turns_kept} turns, "
+                f"summarized {prompt.turns_summarized}, dropped {prompt.turns_dropped}"
+            )
+        return prompt.messages
+
+
+    def _summarize_turns(self, turns):
+        """One- or two-sentence summary of older turns from the summary route, or None if unavailable."""
+        text = self._context_text(turns)
+        cached = self._cache_get("summary", text)
+        if cached is not None:
+            return cached
+        try:
+            summary = self.call_groq_model(
+                [{"role": "system", "content": SUMMARY_SYSTEM_PROMPT}, {"role": "user", "content": text}],
+                task="summary"
+            )
+        except LLMError as e:
+            self.logger.warning(f"[Prompt] Summary model unavailable: {e}")
+            return None
+        self._cache_set("summary", text, summary)
+        return summary
+
+
+    def _fused_messages(self, user_input: str, context=None, intent: str = None) -> list:
+        if intent is None:
+            return self.build_prompt(FUSED_SYSTEM_PROMPT, user_input, context)
+        return self.build_prompt(
+            FUSED_KNOWN_INTENT_SYSTEM_PROMPT, user_input, context, volatile=f"User's intent: {intent}"
+        )
+
+
+    def analyze_fused(self, user_input: str, context=None, personality=None):
+        """
+        Single round trip: one JSON-constrained completion returns intent, emotion,
+        sentiment and the reply. A confident local intent is given to the model
+        instead of asked for, so it only labels the emotion and writes the reply.
+        Returns None when the output fails validation and raises LLMError when the
+        model is unavailable (the three-call path would only fail three more times).
+        """
+        intent = self._local_intent(user_input)
+        result = self.call_groq_model(
+            self._fused_messages(user_input, context, intent), task="analysis", personality=personality,
+            response_format={"type": "json_object"}
         )
+        analysis = self._parse_fused(result, intent=intent)
+        if analysis is not None:
+            self.finish_reply(analysis["response"], analysis["intent"], trim=False)
+        return analysis
 
-        if context:
-            system_prompt += f"\nHere is the recent conversation:\n{context}\nRespond appropriately."
 
-        # Generate the response using chat format
-        messages = [
-            {"role": "system", "content": system_prompt},
+    def _classify_messages(self, user_input: str) -> list:
+        return [
+            {"role": "system", "content": CLASSIFY_SYSTEM_PROMPT},
             {"role": "user", "content": user_input}
         ]
-        
-        response = self.call_groq_model(messages, max_tokens=150, temperature=0.8)
-        
-        # Save memory
-        if memory_manager:
-            memory_manager.add_memory(user_input, response)
+
+
+    def classify(self, user_input: str) -> dict:
+        """
+        Analysis only: intent, emotion and sentiment for user_input.
+        Generates no reply and writes nothing to memory.
+        """
+        # Both labels decided locally: no network call at all
+        intent = self._local_intent(user_input)
+        emotion_data = self._local_emotion(user_input)
+        if intent is not None and emotion_data is not None:
+            return {"intent": intent, **emotion_data}
+
+        # One JSON call for all three labels; speculative mode overlaps it with the reply
+        if self.analysis_mode in ("fused", "speculative"):
+            cached = self._cache_get("labels", user_input)
+            if cached is not None:
+                return self._merge_local_labels(dict(cached), intent, emotion_data)
+
+            try:
+                result = self.call_groq_model(
+                    self._classify_messages(user_input), task="classify",
+                    response_format={"type": "json_object"}
+                )
+            except LLMError as e:
+                self.logger.warning(f"[Classifier] Model unavailable: {e}")
+                return self._merge_local_labels(
+                    {"intent": "unknown", "emotion": "neutral", "sentiment": "neutral"}, intent, emotion_data
+                )
+
+            labels = self._parse_fused(result, with_reply=False)
+            if labels is not None:
+                self._cache_set("labels", user_input, labels)
+                return self._merge_local_labels(dict(labels), intent, emotion_data)
+            self.logger.info("Fused classification unusable, falling back to separate detectors")
+
+        # Only ask the model for what the local analyzers could not decide
+        if intent is not None:
+            return {"intent": intent, **(self.detect_emotion(user_input))}
+        if emotion_data is not None:
+            return {"intent": self.detect_intent(user_input), **emotion_data}
+        return self.classify_concurrent(user_input)
+
+
+    def _merge_local_labels(self, labels: dict, intent=None, emotion_data=None) -> dict:
+        """Local decisions take precedence over the model's labels."""
+        if intent is not None:
+            labels["intent"] = intent
+        if emotion_data is not None:
+            labels.update(emotion=emotion_data["emotion"], sentiment=emotion_data["sentiment"])
+        return labels
+
+
+    def classify_concurrent(self, user_input: str, timeout: float = None) -> dict:
+        """
+        Run detect_intent and detect_emotion in parallel on the shared pool.
+        Classification latency becomes the slower of the two calls instead of their sum.
+        A call that misses its timeout degrades to the neutral default.
+        """
+        timeout = CLASSIFIER_TIMEOUT if timeout is None else timeout
+        executor = get_executor()
+        started = time.monotonic()
+
+        intent_future = executor.submit(self.detect_intent, user_input)
+        emotion_future = executor.submit(self.detect_emotion, user_input)
+
+        intent = "unknown"
+        emotion_data = {"emotion": "neutral", "sentiment": "neutral"}
+
+        try:
+            intent = intent_future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.logger.warning(f"[Classifier] detect_intent timed out after {timeout}s")
+        except Exception as e:
+            self.logger.error(f"[Classifier] detect_intent failed: {e}")
+
+        # Both calls started together, so the emotion call only gets what is left of its timeout
+        remaining = max(0.0, timeout - (time.monotonic() - started))
+        try:
+            emotion_data = emotion_future.result(timeout=remaining) or emotion_data
+        except FutureTimeoutError:
+            self.logger.warning(f"[Classifier] detect_emotion timed out after {timeout}s")
+        except Exception as e:
+            self.logger.error(f"[Classifier] detect_emotion failed: {e}")
 
         return {
             "intent": intent,
-            "emotion": emotion_data["emotion"],
-            "sentiment": emotion_data["sentiment"],
+            "emotion": emotion_data.get("emotion", "neutral"),
+            "sentiment": emotion_data.get("sentiment", "neutral")
+        }
+
+
+    def _prelabel(self, text: str):
+        """
+        Labels available without a model call, as (labels or None, local intent, local emotion).
+        Partial local decisions are returned so they can override the model's later.
+        """
+        intent = self._local_intent(text)
+        emotion_data = self._local_emotion(text)
+        if intent is not None and emotion_data is not None:
+            return {"intent": intent, **emotion_data}, intent, emotion_data
+
+        cached = self._cache_get("labels", text)
+        if cached is not None:
+            return self._merge_local_labels(dict(cached), intent, emotion_data), intent, emotion_data
+        return None, intent, emotion_data
+
+
+    def _prepare_batch(self, texts, pack_size):
+        """
+        Split a batch into labels that are already known and packs of distinct
+        texts that need the model. Returns (results, pending, packs) where
+        pending maps text -> (positions, local intent, local emotion).
+        """
+        results = [None] * len(texts)
+        pending = {}
+        for i, text in enumerate(texts):
+            if text in pending:
+                pending[text][0].append(i)
+                continue
+            labels, intent, emotion_data = self._prelabel(text)
+            if labels is not None:
+                results[i] = labels
+            else:
+                pending[text] = ([i], intent, emotion_data)
+
+        unique = list(pending)
+        packs = [unique[j:j + pack_size] for j in range(0, len(unique), pack_size)]
+        with self._stats_lock:
+            self.batch_stats["items"] += len(texts)
+        return results, pending, packs
+
+
+    def _fill_batch(self, results, pending, labels_by_text):
+        for text, labels in labels_by_text.items():
+            positions, intent, emotion_data = pending[text]
+            merged = self._merge_local_labels(dict(labels), intent, emotion_data)
+            for i in positions:
+                results[i] = dict(merged)
+
+
+    def _batch_messages(self, texts) -> list:
+        numbered = [{"id": i + 1, "text": text} for i, text in enumerate(texts)]
+        return [
+            {"role": "system", "content": BATCH_CLASSIFY_SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps(numbered, ensure_ascii=False)}
+        ]
+
+
+    def _batch_max_tokens(self, size: int) -> int:
+        # An {"id", "intent", "emotion", "sentiment"} entry is ~37 tokens; leave headroom for longer labels
+        return 48 * size + 32
+
+
+    def _parse_batch(self, result: str, size: int) -> dict:
+        """
+        Validated labels by slot position (0-based). Slots that are missing or invalid are left out.
+        When the output was cut off, the complete entries before the cut are still used.
+        """
+        try:
+            start_idx = result.find('{')
+            end_idx = result.rfind('}') + 1
+            if start_idx == -1 or end_idx == 0:
+                raise ValueError("no JSON object in response")
+            items = json.loads(result[start_idx:end_idx]).get("results")
+        except (ValueError, AttributeError) as e:
+            items = [
+                item for item in (self._loads_or_none(m.group(0)) for m in _BATCH_ENTRY_RE.finditer(result))
+                if item is not None
+            ]
+            self.logger.warning(f"[Batch analysis] Invalid JSON ({e}); kept {len(items)} complete entries")
+
+        labels = {}
+        for item in items if isinstance(items, list) else []:
+            try:
+                position = int(item.get("id")) - 1
+            except (AttributeError, TypeError, ValueError):
+                continue
+            parsed = self._validate_labels(item)
+            if 0 <= position < size and parsed is not None:
+                labels[position] = parsed
+        return labels
+
+
+    @staticmethod
+    def _loads_or_none(raw: str):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+
+    def _collect_pack(self, texts, labels):
+        """Cache the parsed slots; return (labels by text, texts whose slot failed)."""
+        with self._stats_lock:
+            self.batch_stats["packs"] += 1
+        done, failed = {}, []
+        for position, text in enumerate(texts):
+            if position in labels:
+                done[text] = labels[position]
+                self._cache_set("labels", text, labels[position])
+            else:
+                failed.append(text)
+        return done, failed
+
+
+    def _split_failed(self, texts, failed, budget):
+        """
+        Packs to re-send for the failed slots: the failed texts as one smaller pack,
+        or two halves when the whole pack failed. Each pack spends one request from
+        the batch's retry budget; returns [] when a single text fails or the budget is spent.
+        """
+        if len(failed) < len(texts):
+            retry_packs = [failed]
+        elif len(texts) > 1:
+            half = (len(failed) + 1) // 2
+            retry_packs = [failed[:half], failed[half:]]
+        else:
+            retry_packs = []
+
+        if retry_packs and not budget.take(len(retry_packs)):
+            retry_packs = []
+        with self._stats_lock:
+            if retry_packs:
+                self.batch_stats["resplits"] += 1
+            else:
+                self.batch_stats["failed_slots"] += len(failed)
+        return retry_packs
+
+
+    def _label_pack(self, texts, budget) -> dict:
+        """Labels for every text of one pack, re-sending slots the model got wrong while the budget lasts."""
+        default = {"intent": "unknown", "emotion": "neutral", "sentiment": "neutral"}
+        try:
+            result = self.call_groq_model(
+                self._batch_messages(texts), max_tokens=self._batch_max_tokens(len(texts)), task="batch",
+                response_format={"type": "json_object"}
+            )
+        except LLMError as e:
+            # Splitting would only repeat the failure, so the whole pack degrades
+            self.logger.warning(f"[Batch analysis] Model unavailable for a pack of {len(texts)}: {e}")
+            return {text: dict(default) for text in texts}
+
+        done, failed = self._collect_pack(texts, self._parse_batch(result, len(texts)))
+        if failed:
+            retry_packs = self._split_failed(texts, failed, budget)
+            if not retry_packs:
+                done.update({text: dict(default) for text in failed})
+            for pack in retry_packs:
+                done.update(self._label_pack(pack, budget))
+        return done
+
+
+    def analyze_batch(self, texts, pack_size: int = None, concurrency: int = None) -> list:
+        """
+        Intent, emotion and sentiment for many messages, in input order.
+        Messages the local analyzers or the cache can label cost nothing; the rest
+        are de-duplicated and packed pack_size to a request, with up to
+        `concurrency` packs in flight. Re-sends of dropped slots are capped at
+        NLP_BATCH_RETRY_RATIO of the packs. Generates no replies and writes no memory.
+        """
+        texts = list(texts)
+        results, pending, packs = self._prepare_batch(texts, pack_size or BATCH_PACK_SIZE)
+        if not packs:
+            return results
+
+        # A dedicated pool, so a backfill cannot starve the shared executor serving live chats
+        workers = min(concurrency or BATCH_CONCURRENCY, len(packs))
+        budget = RetryBudget.for_packs(len(packs))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nlp-batch") as pool:
+            for labels_by_text in pool.map(lambda pack: self._label_pack(pack, budget), packs):
+                self._fill_batch(results, pending, labels_by_text)
+        return results
+
+
+    def analyze_sequential(self, user_input: str, context=None, personality=None) -> dict:
+        """Two stages: intent and emotion in parallel, then the reply. Raises LLMError if the reply fails."""
+        labels = self.classify_concurrent(user_input)
+        messages = self._build_reply_messages(user_input, labels, context)
+        response = self.call_groq_model(
+            messages, task="reply", personality=personality, intent=labels["intent"]
+        )
+
+        return {
+            "intent": labels["intent"],
+            "emotion": labels["emotion"],
+            "sentiment": labels["sentiment"],
+            "response": response
+        }
+
+
+    def _speculative_messages(self, user_input: str, context=None) -> list:
+        return self.build_prompt(SPECULATIVE_REPLY_SYSTEM_PROMPT, user_input, context)
+
+
+    def _timed_reply(self, messages, intent=None, personality=None):
+        """(reply, seconds) for a reply call, so speculation can report what it saved."""
+        started = time.monotonic()
+        response = self.call_groq_model(messages, task="reply", personality=personality, intent=intent)
+        return response, time.monotonic() - started
+
+
+    def _record_speculation(self, hit: bool, classify_seconds: float, reply_seconds: float, elapsed: float):
+        """
+        A hit saves what the sequential path would have spent, classification plus
+        reply, minus what the overlapped pair took. A miss costs one wasted call.
+        """
+        with self._stats_lock:
+            self.speculation_stats["runs"] += 1
+            if hit:
+                self.speculation_stats["hits"] += 1
+                self.speculation_stats["saved_seconds"] += max(0.0, classify_seconds + reply_seconds - elapsed)
+            else:
+                self.speculation_stats["misses"] += 1
+                self.speculation_stats["wasted_calls"] += 1
+
+
+    @staticmethod
+    def _speculation_summary(stats: dict) -> dict:
+        runs, hits = stats["runs"], stats["hits"]
+        return dict(
+            stats,
+            saved_seconds=round(stats["saved_seconds"], 4),
+            hit_rate=round(hits / runs, 4) if runs else None,
+            avg_saved_ms=round(1000 * stats["saved_seconds"] / hits, 1) if hits else None
+        )
+
+
+    def analyze_speculative(self, user_input: str, context=None, personality=None) -> dict:
+        """
+        Start a label-agnostic reply on the shared pool, classify meanwhile, and keep
+        the reply unless the intent needs a label-aware one (SPECULATIVE_RECHECK_INTENTS).
+        On a hit classification is off the critical path. A discarded reply that is
+        already in flight runs to completion; its result is ignored.
+        Raises LLMError if the reply fails.
+        """
+        started = time.monotonic()
+        speculative = get_executor().submit(
+            self._timed_reply, self._speculative_messages(user_input, context), personality=personality
+        )
+
+        labels = self.classify(user_input)
+        classify_seconds = time.monotonic() - started
+
+        if labels["intent"] in SPECULATIVE_RECHECK_INTENTS:
+            speculative.cancel()
+            self.logger.info(f"[Speculative] Intent '{labels['intent']}' needs a label-aware reply; regenerating")
+            response, reply_seconds = self._timed_reply(
+                self._build_reply_messages(user_input, labels, context),
+                intent=labels["intent"], personality=personality
+            )
+            self._record_speculation(False, classify_seconds, reply_seconds, time.monotonic() - started)
+        else:
+            response, reply_seconds = speculative.result()
+            # Started before the intent was known, so it ran on the reply route's default budget
+            max_tokens = self.route("reply", personality)["max_tokens"]
+            response = self.finish_reply(response, labels["intent"], max_tokens)
+            self._record_speculation(True, classify_seconds, reply_seconds, time.monotonic() - started)
+
+        return {
+            "intent": labels["intent"],
+            "emotion": labels["emotion"],
+            "sentiment": labels["sentiment"],
             "response": response
         }
+
+
+    def _build_reply_messages(self, user_input: str, labels: dict, context=None) -> list:
+        """Chat messages for Echo's reply, given the detected labels."""
+        return self.build_prompt(
+            REPLY_SYSTEM_PROMPT, user_input, context,
+            volatile=(
+                f"User's emotion: {labels['emotion']}\n"
+                f"User's intent: {labels['intent']}\n"
+                f"Sentiment: {labels['sentiment']}"
+            )
+        )
+
+
+    def _cached_reply(self, user_input: str, context, personality=None):
+        """Full cached analysis for this input and context, if reply caching is on."""
+        if not CACHE_REPLIES:
+            return None
+        cached = self._cache_get(
+            "reply", user_input, personality=personality or "echo", context=self._context_text(context)
+        )
+        return dict(cached) if cached is not None else None
+
+
+    def _store_reply(self, user_input: str, context, result: dict, personality=None):
+        if CACHE_REPLIES:
+            self._cache_set(
+                "reply", user_input, result, ttl=CACHE_REPLY_TTL, personality=personality or "echo",
+                context=self._context_text(context)
+            )
+
+
+    def _local_labels(self, user_input: str) -> dict:
+        """Labels without a model call: the local classifiers' best guess, whatever its confidence."""
+        intent = None
+        if self.intent_classifier is not None:
+            intent, _ = self.intent_classifier.predict(user_input)
+        if self.emotion_analyzer is None and LexiconEmotionAnalyzer is not None:
+            self.emotion_analyzer = LexiconEmotionAnalyzer()
+        if self.emotion_analyzer is not None:
+            emotion_data = self.emotion_analyzer.detect_emotion(user_input)
+        else:
+            emotion_data = {"emotion": "neutral", "sentiment": "neutral"}
+        return {"intent": intent or "unknown", **emotion_data}
+
+
+    @staticmethod
+    def _canned_reply(labels: dict) -> str:
+        return CANNED_REPLIES.get(labels["sentiment"], CANNED_REPLIES["neutral"])
+
+
+    def _shed_reply_request(self, user_input: str, labels: dict, context, tier: int, personality=None):
+        """
+        (messages, max_tokens) for the one reply call of a shed request: tier 1
+        replies with the local labels, tier 2 with a label-agnostic prompt on
+        SHED_REPLY_TOKENS (or the intent's own budget, if smaller).
+        """
+        if tier == LOCAL_LABELS:
+            return self._build_reply_messages(user_input, labels, context), None
+        budget = min(SHED_REPLY_TOKENS, self.reply_policy.options(labels["intent"], personality)["max_tokens"])
+        return self._speculative_messages(user_input, context), budget
+
+
+    def analyze_shed(self, user_input: str, context=None, tier: int = LOCAL_LABELS, personality=None) -> dict:
+        """
+        Degraded analysis for a request the load shedder moved off tier 0. Labels come
+        from the local classifiers; tiers 1 and 2 make the reply call alone, tier 3
+        answers from CANNED_REPLIES. Raises LLMError if the reply fails.
+        """
+        labels = self._local_labels(user_input)
+        if tier == CANNED:
+            response = self._canned_reply(labels)
+        else:
+            messages, max_tokens = self._shed_reply_request(user_input, labels, context, tier, personality)
+            response = self.call_groq_model(
+                messages, max_tokens=max_tokens, task="reply", personality=personality, intent=labels["intent"]
+            )
+        return dict(labels, response=response)
+
+
+    def analyze(self, user_input: str, memory_manager=None, session_id=None, personality=None) -> dict:
+        """
+        Labels and reply for one message, at the quality tier the load shedder picks
+        (reported as result["tier"]). A cached reply, when reply caching is on, is
+        served at any tier. History comes from, and the turn is saved to, the
+        memory manager's session_id session. The reply uses the personality's
+        routes and reply budget (Echo's when None).
+        """
+        context = history_turns(memory_manager, session_id)
+        tier = self.shedder.current_tier()
+
+        result = self._cached_reply(user_input, context, personality)
+
+        if result is None and tier != FULL:
+            result = self.analyze_shed(user_input, context, tier, personality)
+
+        if result is None:
+            if self.analysis_mode == "speculative":
+                result = self.analyze_speculative(user_input, context, personality)
+            elif self.analysis_mode == "fused":
+                result = self.analyze_fused(user_input, context, personality)
+                if result is None:
+                    self.logger.info("Fused analysis unusable, falling back to sequential analysis")
+
+            if result is None:
+                result = self.analyze_sequential(user_input, context, personality)
+            self._store_reply(user_input, context, result, personality)
+
+        # Save memory
+        if memory_manager:
+            memory_manager.add_memory(user_input, result["response"], session_id)
+
+        return dict(result, tier=tier)
+
+
+    def analyze_stream(self, user_input: str, memory_manager=None, session_id=None, personality=None):
+        """
+        Streaming counterpart of analyze. Yields event dicts:
+          {"type": "analysis", "intent", "emotion", "sentiment", "tier"} once the labels are known,
+          {"type": "token", "token"} for every reply delta,
+          {"type": "done", "response"} with the full reply.
+        Memory is written once, after the stream completes. LLMError propagates
+        if the reply cannot be generated.
+        """
+        context = history_turns(memory_manager, session_id)
+        tier = self.shedder.current_tier()
+
+        # The reply streams as plain text, so labels come from a separate classification step
+        if tier == FULL:
+            labels = self.classify(user_input)
+            messages, max_tokens = self._build_reply_messages(user_input, labels, context), None
+        else:
+            labels = self._local_labels(user_input)
+        yield {"type": "analysis", **labels, "tier": tier}
+
+        tokens = []
+        if tier == CANNED:
+            tokens.append(self._canned_reply(labels))
+            yield {"type": "token", "token": tokens[0]}
+        else:
+            if tier != FULL:
+                messages, max_tokens = self._shed_reply_request(user_input, labels, context, tier, personality)
+            for token in self.stream_groq_model(
+                messages, max_tokens=max_tokens, task="reply", personality=personality, intent=labels["intent"]
+            ):
+                tokens.append(token)
+                yield {"type": "token", "token": token}
+
+        response = "".join(tokens).strip()
+
+        # Save memory
+        if memory_manager:
+            memory_manager.add_memory(user_input, response, session_id)
+
+        yield {"type": "done", "response": response}
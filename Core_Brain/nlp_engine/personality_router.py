@@ -20,5 +20,5 @@ class PersonalityRouter:
         else:
             raise ValueError(f"Personality '{personality_name}' not found.")
 
-    def get_response(self, user_input, memory):
-        return self.personalities[self.active].respond(user_input, memory)
\ No newline at end of file
+    def get_response(self, user_input, memory, session_id=None):
+        return self.personalities[self.active].respond(user_input, memory, session_id)
\ No newline at end of file
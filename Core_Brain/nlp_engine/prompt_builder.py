@@ -0,0 +1,165 @@
+# Token-budgeted prompt assembly: stable instructions first, trimmed history, volatile details last
+import re
+
+from .config import PROMPT_TOKEN_BUDGET, PROMPT_SUMMARY_TOKENS, PROMPT_SUMMARY_CHARS
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+MESSAGE_OVERHEAD = 4  # role and separator tokens per chat message
+REPLY_PRIMING = 3     # tokens that prime the assistant's reply
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local estimate of the model's token count: one token per short word or
+    punctuation mark, plus one per further six characters of a long word.
+    Close enough for budgeting; exact counts come back in the API's usage field.
+    """
+    if not text:
+        return 0
+    return sum(1 + (len(piece) - 1) // 6 for piece in _PIECE_RE.findall(text))
+
+
+def estimate_messages_tokens(messages) -> int:
+    return sum(
+        estimate_tokens(str(message.get("content", ""))) + MESSAGE_OVERHEAD for message in messages
+    ) + REPLY_PRIMING
+
+
+def turns_from_text(context: str) -> list:
+    """Parse MemoryManager.get_context_text() output ("User: ..." / "Echo: ..." lines) into turns."""
+    turns = []
+    for line in context.splitlines():
+        if line.startswith("User: "):
+            turns.append([line[len("User: "):], ""])
+        elif line.startswith("Echo: ") and turns:
+            turns[-1][1] = line[len("Echo: "):]
+        elif turns:
+            # Continuation of a multi-line message
+            field = 1 if turns[-1][1] else 0
+            turns[-1][field] += "\n" + line
+    return [tuple(turn) for turn in turns]
+
+
+def history_turns(memory, session_id=None) -> list:
+    """(user, reply) turns, oldest first, from a Core MemoryManager or a zen_flask SimpleMemoryManager."""
+    if memory is None:
+        return []
+    if hasattr(memory, "get_context_turns"):
+        return memory.get_context_turns(session_id)
+    if hasattr(memory, "get_context"):
+        return [(item.get("user", ""), item.get("ai", "")) for item in memory.get_context()]
+    return []
+
+
+class Prompt:
+    """Assembled chat messages plus what the budget did to the history."""
+    __slots__ = ("messages", "prompt_tokens", "turns_kept", "turns_summarized", "turns_dropped")
+
+    def __init__(self, messages, prompt_tokens, turns_kept=0, turns_summarized=0, turns_dropped=0):
+        self.messages = messages
+        self.prompt_tokens = prompt_tokens
+        self.turns_kept = turns_kept
+        self.turns_summarized = turns_summarized
+        self.turns_dropped = turns_dropped
+
+
+class PromptBuilder:
+    """
+    Builds [stable system] [summary of older turns] [recent turns] [volatile system] [user]
+    within a token budget. The stable instructions come first and never change
+    between calls, so the provider can reuse its prefix; per-turn details such as
+    detected labels go last. Recent turns are kept newest first while they fit;
+    older ones are folded into a one-line summary, or dropped if even that does
+    not fit. The user's message is never trimmed.
+    summarizer, if given, maps the older turns to summary text (or None); the
+    extractive summary is used when it is absent, fails or does not fit.
+    """
+    def __init__(self, budget=PROMPT_TOKEN_BUDGET, summary_tokens=PROMPT_SUMMARY_TOKENS,
+                 summary_chars=PROMPT_SUMMARY_CHARS, summarizer=None):
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.summary_chars = summary_chars
+        self.summarizer = summarizer
+
+    @staticmethod
+    def _turn_messages(user, reply) -> list:
+        messages = []
+        if user:
+            messages.append({"role": "user", "content": user})
+        if reply:
+            messages.append({"role": "assistant", "content": reply})
+        return messages
+
+    @staticmethod
+    def _cost(messages) -> int:
+        return estimate_messages_tokens(messages) - REPLY_PRIMING
+
+    def _clip(self, text: str) -> str:
+        text = " ".join(text.split())
+        if len(text) <= self.summary_chars:
+            return text
+        return text[:self.summary_chars].rsplit(" ", 1)[0] + "..."
+
+    def _summary_message(self, older, remaining):
+        """
+        Extractive summary of what the user said in the older turns, keeping the
+        newest ones that fit. Returns (message or None, turns covered).
+        """
+        prefix = "Earlier in this conversation the user said: "
+        points = []
+        for user, _ in reversed(older):
+            if not user:
+                continue
+            candidate = [f"\"{self._clip(user)}\""] + points
+            message = {"role": "system", "content": prefix + "; ".join(candidate)}
+            if self._cost([message]) > remaining:
+                break
+            points = candidate
+        if not points:
+            return None, 0
+        return {"role": "system", "content": prefix + "; ".join(points)}, len(points)
+
+    def _summarize(self, older, remaining):
+        if self.summarizer is not None:
+            text = self.summarizer(older)
+            if text:
+                message = {"role": "system", "content": "Summary of the earlier conversation: " + text.strip()}
+                if self._cost([message]) <= remaining:
+                    return message, len(older)
+        return self._summary_message(older, remaining)
+
+    def build(self, system: str, user_input: str, turns=(), volatile: str = "") -> Prompt:
+        head = [{"role": "system", "content": system}]
+        tail = ([{"role": "system", "content": volatile}] if volatile else []) + \
+            [{"role": "user", "content": user_input}]
+        remaining = self.budget - estimate_messages_tokens(head + tail)
+
+        turns = list(turns)
+        turn_messages = [self._turn_messages(user, reply) for user, reply in turns]
+        costs = [self._cost(messages) for messages in turn_messages]
+        # When the history overflows, hold back room for the summary of what is cut
+        reserve = min(self.summary_tokens, max(remaining, 0)) if sum(costs) > remaining else 0
+        remaining -= reserve
+
+        kept = []
+        for messages, cost in zip(reversed(turn_messages), reversed(costs)):
+            if cost > remaining:
+                break
+            kept.insert(0, messages)
+            remaining -= cost
+        remaining += reserve
+
+        older = turns[:len(turns) - len(kept)]
+        summary, summarized = self._summarize(older, remaining) if older else (None, 0)
+        middle = [summary] if summary else []
+        for messages in kept:
+            middle.extend(messages)
+
+        messages = head + middle + tail
+        return Prompt(
+            messages,
+            estimate_messages_tokens(messages),
+            turns_kept=len(kept),
+            turns_summarized=summarized,
+            turns_dropped=len(older) - summarized
+        )
@@ -0,0 +1,422 @@
+# Client-side rate limiter and concurrency governor for LLM calls, shared by every worker on a host
+import os
+import time
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+from .config import (
+    RATE_LIMIT_RPM, RATE_LIMIT_TPM, RATE_LIMIT_MAX_CONCURRENCY,
+    RATE_LIMIT_BACKEND, RATE_LIMIT_PATH, RATE_LIMIT_MAX_WAIT
+)
+from .errors import LLMRateLimitError
+from .prompt_builder import estimate_messages_tokens
+
+logger = logging.getLogger(__name__)
+
+_POLL_INTERVAL = 0.05  # re-check interval when waiting on a concurrency slot
+_WAIT_HALF_LIFE = 10.0  # seconds for the recent-wait signal to halve when nothing queues
+
+
+class RateLimitTimeoutError(LLMRateLimitError):
+    """The caller's queue deadline passed before quota or a concurrency slot was free."""
+    retryable = False
+
+
+def estimate_request_tokens(payload: dict) -> int:
+    """
+    Token cost of a completion request as the provider counts it against
+    tokens-per-minute: the estimated prompt plus the max_tokens reservation.
+    """
+    return estimate_messages_tokens(payload.get("messages", [])) + int(payload.get("max_tokens", 0))
+
+
+class InProcessLimiterStore:
+    """Bucket levels and leases in this process only (single-worker deployments)."""
+    # Critical sections are a few dict operations, safe to run on an event loop
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._leases = {}
+        self._next_lease = 0
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            yield self
+
+    def get_bucket(self, name):
+        return self._buckets.get(name)
+
+    def set_bucket(self, name, level, updated_at):
+        self._buckets[name] = (level, updated_at)
+
+    def active_leases(self, now):
+        for lease_id in [i for i, expires_at in self._leases.items() if expires_at <= now]:
+            del self._leases[lease_id]
+        return len(self._leases)
+
+    def add_lease(self, expires_at):
+        self._next_lease += 1
+        self._leases[self._next_lease] = expires_at
+        return self._next_lease
+
+    def remove_lease(self, lease_id):
+        with self._lock:
+            self._leases.pop(lease_id, None)
+
+
+class SQLiteLimiterStore:
+    """
+    Bucket levels and leases in a SQLite file, so every gunicorn worker on the
+    host draws from the same budget. BEGIN IMMEDIATE serialises the
+    read-refill-take step across processes.
+    """
+    # A transaction can wait out another process's for the 5 s busy timeout
+    blocking = True
+
+    def __init__(self, path=RATE_LIMIT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                level REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_leases_expires ON leases (expires_at);
+            """
+        )
+
+    def _connect(self):
+        # sqlite3 connections must not cross threads or forks
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get_bucket(self, name):
+        return self._connect().execute(
+            "SELECT level, updated_at FROM buckets WHERE name = ?", (name,)
+        ).fetchone()
+
+    def set_bucket(self, name, level, updated_at):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO buckets (name, level, updated_at) VALUES (?, ?, ?)",
+            (name, level, updated_at)
+        )
+
+    def active_leases(self, now):
+        conn = self._connect()
+        conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+        return conn.execute("SELECT COUNT(*) FROM leases").fetchone()[0]
+
+    def add_lease(self, expires_at):
+        return self._connect().execute("INSERT INTO leases (expires_at) VALUES (?)", (expires_at,)).lastrowid
+
+    def remove_lease(self, lease_id):
+        self._connect().execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+
+class LimiterStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.penalties = 0
+        self.in_flight = 0
+        # Exponentially weighted queue wait, decayed by age (see recent_wait)
+        self._recent_wait = 0.0
+        self._recent_at = time.monotonic()
+
+    def _decayed_wait(self, now):
+        return self._recent_wait * 0.5 ** ((now - self._recent_at) / _WAIT_HALF_LIFE)
+
+    def enter_queue(self):
+        with self._lock:
+            self.queue_depth += 1
+
+    def leave_queue(self, waited, acquired):
+        # waited is the caller's time in the queue; a free slot costs microseconds
+        with self._lock:
+            self.queue_depth -= 1
+            if acquired:
+                self.acquired += 1
+            else:
+                self.timeouts += 1
+            if waited > 0.001:
+                self.waited += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            now = time.monotonic()
+            self._recent_wait = 0.8 * self._decayed_wait(now) + 0.2 * waited
+            self._recent_at = now
+
+    def enter_flight(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def leave_flight(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def queued(self) -> int:
+        """Calls waiting for quota or a concurrency slot; calls already holding one are not counted."""
+        with self._lock:
+            return self.queue_depth
+
+    def recent_wait(self) -> float:
+        """Typical queue wait of recent calls; fades while no call queues, so a past spike does not linger."""
+        with self._lock:
+            return self._decayed_wait(time.monotonic())
+
+    def record_penalty(self):
+        with self._lock:
+            self.penalties += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "in_flight": self.in_flight,
+                "recent_wait_seconds": round(self._decayed_wait(time.monotonic()), 4),
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "avg_wait_seconds": round(self.wait_seconds / self.waited, 4) if self.waited else 0.0,
+                "max_wait_seconds": round(self.max_wait_seconds, 4),
+                "timeouts": self.timeouts,
+                "penalties": self.penalties
+            }
+
+
+class RateLimiter:
+    """
+    Two token buckets - requests per minute and tokens per minute - plus a cap on
+    requests in flight. Callers queue until both budgets and a slot are available
+    or their deadline passes. A limit of 0 disables that dimension.
+    """
+    def __init__(self, store, rpm=RATE_LIMIT_RPM, tpm=RATE_LIMIT_TPM,
+                 max_concurrency=RATE_LIMIT_MAX_CONCURRENCY, max_wait=RATE_LIMIT_MAX_WAIT):
+        self.store = store
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        # name -> (capacity, refill per second); a full minute's budget may be spent as a burst
+        self.buckets = {name: (limit, limit / 60.0) for name, limit in (("requests", rpm), ("tokens", tpm)) if limit > 0}
+        self.stats = LimiterStats()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.buckets) or self.max_concurrency > 0
+
+    def _level(self, name, now):
+        capacity, rate = self.buckets[name]
+        row = self.store.get_bucket(name)
+        if row is None:
+            return capacity
+        level, updated_at = row
+        return min(capacity, level + max(0.0, now - updated_at) * rate)
+
+    def try_acquire(self, tokens, lease_ttl):
+        """
+        Take one request and `tokens` tokens and, if capped, a concurrency lease.
+        Returns (0, lease_id) on success or (seconds to wait, None) with nothing taken.
+        """
+        costs = {"requests": 1, "tokens": tokens}
+        with self.store.transaction() as store:
+            now = time.time()
+            levels, wait = {}, 0.0
+            for name, (capacity, rate) in self.buckets.items():
+                cost = min(costs[name], capacity)  # a request larger than the budget waits for a full bucket
+                levels[name] = self._level(name, now)
+                if levels[name] < cost:
+                    wait = max(wait, (cost - levels[name]) / rate)
+
+            if self.max_concurrency > 0 and store.active_leases(now) >= self.max_concurrency:
+                wait = max(wait, _POLL_INTERVAL)
+
+            if wait > 0:
+                return wait, None
+
+            for name, (capacity, _) in self.buckets.items():
+                store.set_bucket(name, levels[name] - min(costs[name], capacity), now)
+            lease_id = store.add_lease(now + lease_ttl) if self.max_concurrency > 0 else None
+            return 0.0, lease_id
+
+    def release(self, lease_id):
+        if lease_id is not None:
+            self.store.remove_lease(lease_id)
+
+    async def try_acquire_async(self, tokens, lease_ttl):
+        """try_acquire() for coroutines: a store that can block runs on a worker thread."""
+        if self.store.blocking:
+            return await asyncio.to_thread(self.try_acquire, tokens, lease_ttl)
+        return self.try_acquire(tokens, lease_ttl)
+
+    def release_nowait(self, lease_id):
+        """release() from the event loop: a store that can block releases on a worker thread, unawaited."""
+        if lease_id is not None and self.store.blocking:
+            asyncio.get_running_loop().run_in_executor(None, self.release, lease_id)
+        else:
+            self.release(lease_id)
+
+    def penalize(self, seconds):
+        """
+        The provider answered 429: stop every worker from sending for `seconds`
+        by driving the request bucket below zero.
+        """
+        if "requests" not in self.buckets or seconds <= 0:
+            return
+        _, rate = self.buckets["requests"]
+        with self.store.transaction() as store:
+            now = time.time()
+            store.set_bucket("requests", min(self._level("requests", now), -rate * seconds), now)
+        self.stats.record_penalty()
+        logger.warning(f"Provider rate limit hit; pausing LLM requests for {seconds:.2f}s")
+
+    async def penalize_async(self, seconds):
+        """penalize() for coroutines, off the event loop when the store can block."""
+        if self.store.blocking:
+            await asyncio.to_thread(self.penalize, seconds)
+        else:
+            self.penalize(seconds)
+
+    def _queue_deadline(self, deadline_at):
+        # deadline_at is monotonic, like the retry policy's
+        return min(deadline_at, time.monotonic() + self.max_wait) if deadline_at else time.monotonic() + self.max_wait
+
+    def _timeout_error(self, wait):
+        return RateLimitTimeoutError(f"Client-side rate limit: no quota within {self.max_wait}s", retry_after=wait)
+
+    @contextmanager
+    def slot(self, tokens, deadline_at=None, lease_ttl=60.0):
+        """Block until the request may be sent; raises RateLimitTimeoutError at the deadline."""
+        if not self.enabled:
+            self.stats.enter_flight()
+            try:
+                yield
+            finally:
+                self.stats.leave_flight()
+            return
+
+        queue_deadline = self._queue_deadline(deadline_at)
+        started = time.monotonic()
+        self.stats.enter_queue()
+        acquired = False
+        try:
+            while True:
+                wait, lease_id = self.try_acquire(tokens, lease_ttl)
+                if wait == 0:
+                    acquired = True
+                    break
+                if time.monotonic() + wait > queue_deadline:
+                    raise self._timeout_error(wait)
+                # Jitter so queued workers do not all wake on the same refill
+                time.sleep(wait + random.uniform(0, _POLL_INTERVAL))
+        finally:
+            self.stats.leave_queue(time.monotonic() - started, acquired)
+
+        self.stats.enter_flight()
+        try:
+            yield
+        finally:
+            self.stats.leave_flight()
+            self.release(lease_id)
+
+    @asynccontextmanager
+    async def slot_async(self, tokens, deadline_at=None, lease_ttl=60.0):
+        """
+        slot() for coroutines: waits with asyncio.sleep instead of blocking a thread,
+        and takes and releases quota off the event loop when the store can block.
+        """
+        if not self.enabled:
+            self.stats.enter_flight()
+            try:
+                yield
+            finally:
+                self.stats.leave_flight()
+            return
+
+        queue_deadline = self._queue_deadline(deadline_at)
+        started = time.monotonic()
+        self.stats.enter_queue()
+        acquired = False
+        try:
+            while True:
+                wait, lease_id = await self.try_acquire_async(tokens, lease_ttl)
+                if wait == 0:
+                    acquired = True
+                    break
+                if time.monotonic() + wait > queue_deadline:
+                    raise self._timeout_error(wait)
+                await asyncio.sleep(wait + random.uniform(0, _POLL_INTERVAL))
+        finally:
+            self.stats.leave_queue(time.monotonic() - started, acquired)
+
+        self.stats.enter_flight()
+        try:
+            yield
+        finally:
+            self.stats.leave_flight()
+            # Not awaited, so a cancelled caller still gives its lease back
+            self.release_nowait(lease_id)
+
+    def get_stats(self) -> dict:
+        stats = self.stats.snapshot()
+        stats.update(
+            enabled=self.enabled,
+            backend=type(self.store).__name__,
+            rpm=self.buckets.get("requests", (0, 0))[0],
+            tpm=self.buckets.get("tokens", (0, 0))[0],
+            max_concurrency=self.max_concurrency
+        )
+        return stats
+
+
+_limiter = None
+_limiter_pid = None
+_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Per-process limiter; with the sqlite backend all processes share one budget."""
+    global _limiter, _limiter_pid
+
+    with _lock:
+        if _limiter is None or _limiter_pid != os.getpid():
+            limited = RATE_LIMIT_RPM > 0 or RATE_LIMIT_TPM > 0 or RATE_LIMIT_MAX_CONCURRENCY > 0
+            if limited and RATE_LIMIT_BACKEND == "sqlite":
+                store = SQLiteLimiterStore()
+            else:
+                store = InProcessLimiterStore()
+            _limiter = RateLimiter(store)
+            _limiter_pid = os.getpid()
+        return _limiter
@@ -0,0 +1,178 @@
+# Retry policy and circuit breaker shared by the sync and async engines
+import os
+import time
+import random
+import logging
+import threading
+
+from .config import (
+    RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, CALL_DEADLINE,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT, BREAKER_HALF_OPEN_MAX
+)
+from .errors import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter. A server-sent Retry-After replaces the
+    computed delay, and no retry is scheduled past the call's deadline.
+    """
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY,
+                 max_delay=RETRY_MAX_DELAY, deadline=CALL_DEADLINE):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def start(self, deadline=None) -> float:
+        """Monotonic time at which a call starting now must give up (deadline overrides the default)."""
+        return time.monotonic() + (self.deadline if deadline is None else deadline)
+
+    @staticmethod
+    def remaining(deadline_at) -> float:
+        return max(0.0, deadline_at - time.monotonic())
+
+    def backoff(self, attempt) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def next_delay(self, attempt, error, deadline_at):
+        """Seconds to sleep before retrying after `error` on `attempt` (0-based), or None to give up."""
+        if not error.retryable or attempt + 1 >= self.max_attempts:
+            return None
+        delay = error.retry_after if error.retry_after is not None else self.backoff(attempt)
+        if time.monotonic() + delay >= deadline_at:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    """
+    closed    - calls pass; consecutive upstream failures are counted
+    open      - calls fail immediately with CircuitOpenError until reset_timeout passes
+    half_open - up to half_open_max probe calls pass; a success closes the
+                circuit, a failure opens it again
+    Failures that prove the upstream is reachable (4xx, 429, bad JSON) do not count.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name="groq", failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT, half_open_max=BREAKER_HALF_OPEN_MAX):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not go out."""
+        with self._lock:
+            if self.state == self.OPEN:
+                wait = self._opened_at + self.reset_timeout - time.monotonic()
+                if wait > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuit '{self.name}' is open", retry_after=wait)
+                self.state = self.HALF_OPEN
+                self._probes = 0
+                self._opened_at = time.monotonic()
+                logger.info(f"Circuit '{self.name}' half-open, probing upstream")
+
+            if self.state == self.HALF_OPEN:
+                # A probe that never reported back (e.g. cancelled) must not wedge the circuit
+                if time.monotonic() - self._opened_at >= self.reset_timeout:
+                    self._probes = 0
+                    self._opened_at = time.monotonic()
+                if self._probes >= self.half_open_max:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuit '{self.name}' is half-open, probe in flight")
+                self._probes += 1
+
+    def blocked(self) -> bool:
+        """True while before_call() would reject a call; unlike it, changes no state."""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() < self._opened_at + self.reset_timeout
+            if self.state == self.HALF_OPEN:
+                fresh = time.monotonic() - self._opened_at < self.reset_timeout
+                return fresh and self._probes >= self.half_open_max
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed")
+            self.state = self.CLOSED
+
+    def record_failure(self, error):
+        if not error.trips_breaker:
+            # The upstream answered, so it is up even though this call failed
+            self.record_success()
+            return
+
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(
+                        f"Circuit '{self.name}' opened after {self.consecutive_failures} failures: {error}"
+                    )
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected
+            }
+
+
+class CallStats:
+    """Retries and final failures of logical LLM calls, by error type."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.errors = {}
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_error(self, error):
+        with self._lock:
+            name = type(error).__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"retries": self.retries, "errors": dict(self.errors)}
+
+
+_breakers = {}
+_breakers_pid = None
+_lock = threading.Lock()
+
+
+def get_circuit_breaker(name="groq") -> CircuitBreaker:
+    """Per-process breaker per upstream, shared by every engine that calls it."""
+    global _breakers_pid
+
+    with _lock:
+        if _breakers_pid != os.getpid():
+            _breakers.clear()
+            _breakers_pid = os.getpid()
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
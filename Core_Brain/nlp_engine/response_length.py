@@ -0,0 +1,66 @@
+# Reply length policy: output budget and stop sequences by intent and personality
+import re
+import threading
+
+from .config import REPLY_TOKENS, PERSONALITY_REPLY_SCALE, REPLY_STOP, REPLY_STOP_BY_INTENT
+
+# A sentence ends at . ! ? or an ellipsis, optionally followed by closing quotes or brackets
+_SENTENCE_END = re.compile(r"(?:[.!?…]+)[\"')\]”’]*(?=\s|$)")
+
+
+def trim_to_sentence(text: str) -> str:
+    """Cut a reply that ran out of tokens back to its last complete sentence (unchanged if it has none)."""
+    text = text.rstrip()
+    ends = [match.end() for match in _SENTENCE_END.finditer(text)]
+    return text[:ends[-1]] if ends else text
+
+
+class ReplyLengthPolicy:
+    """max_tokens and stop sequences for a reply, from the detected intent and the personality."""
+    def __init__(self, tokens=REPLY_TOKENS, personality_scale=PERSONALITY_REPLY_SCALE,
+                 stop=REPLY_STOP, stop_by_intent=REPLY_STOP_BY_INTENT):
+        self.tokens = tokens
+        self.personality_scale = personality_scale
+        self.stop = stop
+        self.stop_by_intent = stop_by_intent
+
+    def options(self, intent: str, personality: str = None) -> dict:
+        budget = self.tokens.get(intent, self.tokens["unknown"])
+        scale = self.personality_scale.get((personality or "").lower(), 1.0)
+        return {
+            "max_tokens": max(8, int(round(budget * scale))),
+            "stop": list(self.stop_by_intent.get(intent, self.stop))
+        }
+
+
+class ReplyLengthStats:
+    """Realized reply tokens per intent, against the budget they were given."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._intents = {}
+
+    def record(self, intent, tokens, max_tokens=None, truncated=False, trimmed=False):
+        with self._lock:
+            stats = self._intents.setdefault(
+                intent, {"replies": 0, "tokens": 0, "budgeted": 0, "budget_tokens": 0, "truncated": 0, "trimmed": 0}
+            )
+            stats["replies"] += 1
+            stats["tokens"] += tokens
+            if max_tokens:
+                stats["budgeted"] += 1
+                stats["budget_tokens"] += max_tokens
+            stats["truncated"] += int(truncated)
+            stats["trimmed"] += int(trimmed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            report = {}
+            for intent, stats in self._intents.items():
+                report[intent] = {
+                    "replies": stats["replies"],
+                    "avg_tokens": round(stats["tokens"] / stats["replies"], 1),
+                    "avg_max_tokens": round(stats["budget_tokens"] / stats["budgeted"], 1) if stats["budgeted"] else None,
+                    "truncated": stats["truncated"],
+                    "trimmed": stats["trimmed"]
+                }
+            return report
@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+# Local OpenAI-compatible stand-in for the LLM API, for load tests and benchmarks without network.
+#
+#   python Core_Brain/nlp_engine/standin_server.py --port 8089 --latency lognormal:0.35:0.5 \
+#       --token-latency 0.01 --error-rate 0.02 --rate-limit-rate 0.01
+#   NLP_LLM_BACKEND=standin python api_server.py
+#
+# Answers are shaped by the prompt: the engine's intent, emotion, classify, batch,
+# fused-analysis and summary prompts get well-formed labels from keyword rules, and
+# anything else gets a short canned reply. Streaming, usage counts, injected 5xx,
+# 429 with Retry-After, hung requests and a real requests-per-minute limit are supported.
+#
+#   GET  /v1/models          - model list (keep-warm target)
+#   GET  /stats              - request counters
+#   POST /config             - change settings at runtime, e.g. {"error_rate": 0.5}
+#
+# Standard library only, so it runs anywhere the engine does.
+import re
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+_INTENT_RULES = [
+    ("manipulation_check", re.compile(r"\b(manipulat\w*|gaslight\w*|guilt[- ]trip\w*|controlling)\b", re.I)),
+    ("emotional_support", re.compile(r"\b(sad|lonely|depressed|anxious|stressed|hopeless|hurt|crying|overwhelmed)\b", re.I)),
+    ("get_weather", re.compile(r"\b(weather|rain|sunny|forecast|temperature)\b", re.I)),
+    ("greeting", re.compile(r"^\s*(hi|hello|hey|good (morning|evening|afternoon))\b", re.I)),
+    ("request", re.compile(r"\b(please|can you|could you|help me|tell me)\b", re.I)),
+    ("question", re.compile(r"\?\s*$|^\s*(what|why|how|when|where|who)\b", re.I)),
+]
+
+_EMOTION_RULES = [
+    ("sad", "negative", re.compile(r"\b(sad|lonely|depressed|hopeless|crying|hurt|miss)\b", re.I)),
+    ("anxious", "negative", re.compile(r"\b(anxious|worried|nervous|stressed|scared|overwhelmed)\b", re.I)),
+    ("angry", "negative", re.compile(r"\b(angry|furious|annoyed|hate|mad)\b", re.I)),
+    ("happy", "positive", re.compile(r"\b(happy|great|glad|excited|love|awesome|thanks|thank you)\b", re.I)),
+]
+
+_REPLY_SENTENCES = [
+    "I hear you, and I'm glad you told me.",
+    "That sounds like a lot to carry, and it makes sense to feel this way.",
+    "Let's take it one step at a time together.",
+    "What would feel most helpful to you right now?",
+    "I'm here with you for as long as you want to talk.",
+]
+
+
+def estimate_tokens(text: str) -> int:
+    return sum(1 + (len(piece) - 1) // 6 for piece in _PIECE_RE.findall(text or ""))
+
+
+def parse_latency(spec):
+    """
+    Latency distribution from a spec string; returns a function drawing seconds.
+      0.2 | fixed:0.2          always 0.2s
+      uniform:0.1:0.5          uniform between 0.1s and 0.5s
+      normal:0.3:0.05          mean 0.3s, stddev 0.05s (clamped at 0)
+      lognormal:0.3:0.5        median 0.3s, sigma 0.5 (long right tail, like real APIs)
+      exponential:0.3          mean 0.3s
+    """
+    kind, _, rest = str(spec).partition(":")
+    if not rest:
+        kind, rest = "fixed", kind
+    try:
+        args = [float(value) for value in rest.split(":")]
+    except ValueError:
+        raise ValueError(f"Bad latency spec '{spec}'")
+
+    if kind == "fixed" and len(args) == 1:
+        return lambda rng: args[0]
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "normal" and len(args) == 2:
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+    if kind == "lognormal" and len(args) == 2 and args[0] > 0:
+        return lambda rng: rng.lognormvariate(math.log(args[0]), args[1])
+    if kind == "exponential" and len(args) == 1 and args[0] > 0:
+        return lambda rng: rng.expovariate(1.0 / args[0])
+    raise ValueError(f"Bad latency spec '{spec}'")
+
+
+class StandInSettings:
+    """Behaviour of the stand-in; every field can be changed at runtime through POST /config."""
+    FIELDS = {
+        "latency": str,          # time to first token, see parse_latency
+        "token_latency": float,  # seconds per completion token after the first
+        "error_rate": float,     # fraction of requests answered with a 5xx
+        "error_status": int,
+        "rate_limit_rate": float,  # fraction of requests answered with 429
+        "retry_after": float,    # Retry-After sent with injected 429s
+        "rpm": float,            # real requests-per-minute limit (0 = none); excess gets 429
+        "hang_rate": float,      # fraction of requests that stall for hang_seconds (client timeouts)
+        "hang_seconds": float,
+        "reply_tokens": int,     # length of a free-text reply, capped by max_tokens
+    }
+
+    def __init__(self, latency="fixed:0.05", token_latency=0.0, error_rate=0.0, error_status=503,
+                 rate_limit_rate=0.0, retry_after=1.0, rpm=0.0, hang_rate=0.0, hang_seconds=60.0,
+                 reply_tokens=60, seed=None):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.sample_latency = parse_latency(latency)
+        self.token_latency = token_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.rpm = rpm
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.reply_tokens = reply_tokens
+        # requests-per-minute bucket
+        self._level = rpm
+        self._updated_at = time.monotonic()
+
+    def update(self, values: dict):
+        with self.lock:
+            for name, value in values.items():
+                if name not in self.FIELDS:
+                    raise ValueError(f"Unknown setting '{name}'")
+                value = self.FIELDS[name](value)
+                if name == "latency":
+                    self.sample_latency = parse_latency(value)
+                if name == "rpm":
+                    self._level = value
+                setattr(self, name, value)
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {name: getattr(self, name) for name in self.FIELDS}
+
+    def draw(self):
+        """(latency, fault) for one request; fault is None, "rate_limit", "error" or "hang"."""
+        with self.lock:
+            if self.rpm > 0:
+                now = time.monotonic()
+                self._level = min(self.rpm, self._level + (now - self._updated_at) * self.rpm / 60.0)
+                self._updated_at = now
+                if self._level < 1:
+                    return 0.0, "rpm"
+                self._level -= 1
+            roll = self.rng.random()
+            latency = self.sample_latency(self.rng)
+        if roll < self.rate_limit_rate:
+            return 0.0, "rate_limit"
+        roll -= self.rate_limit_rate
+        if roll < self.error_rate:
+            return latency, "error"
+        roll -= self.error_rate
+        if roll < self.hang_rate:
+            return self.hang_seconds, "hang"
+        return latency, None
+
+    def rpm_retry_after(self) -> float:
+        with self.lock:
+            return max(0.0, (1 - self._level) * 60.0 / self.rpm) if self.rpm > 0 else self.retry_after
+
+
+class StandInStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "streamed": 0, "ok": 0, "errors": 0, "rate_limited": 0, "hung": 0}
+        self.models = {}
+
+    def record(self, outcome, model=None, streamed=False):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts[outcome] += 1
+            if streamed:
+                self.counts["streamed"] += 1
+            if model:
+                self.models[model] = self.models.get(model, 0) + 1
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return dict(self.counts, models=dict(self.models))
+
+
+def _labels(text: str) -> dict:
+    intent = next((name for name, rule in _INTENT_RULES if rule.search(text)), "unknown")
+    emotion, sentiment = next(
+        ((emotion, sentiment) for emotion, sentiment, rule in _EMOTION_RULES if rule.search(text)),
+        ("neutral", "neutral")
+    )
+    return {"intent": intent, "emotion": emotion, "sentiment": sentiment}
+
+
+def _reply(tokens: int) -> str:
+    sentences, used = [], 0
+    for sentence in _REPLY_SENTENCES * (1 + tokens // 40):
+        cost = estimate_tokens(sentence)
+        if sentences and used + cost > tokens:
+            break
+        sentences.append(sentence)
+        used += cost
+    return " ".join(sentences)
+
+
+def completion_for(request: dict, settings: StandInSettings) -> str:
+    """Completion text shaped by the prompt, like the real model would answer it."""
+    messages = request.get("messages") or []
+    system = next((str(m.get("content", "")) for m in messages if m.get("role") == "system"), "")
+    user = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+    json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+    max_tokens = int(request.get("max_tokens") or settings.reply_tokens)
+
+    if json_mode and '"results"' in system:
+        try:
+            items = json.loads(user)
+        except ValueError:
+            items = []
+        results = [dict(_labels(str(item.get("text", ""))), id=item.get("id")) for item in items
+                   if isinstance(item, dict)]
+        return json.dumps({"results": results})
+    if json_mode and '"reply"' in system:
+        return json.dumps(dict(_labels(user), reply=_reply(min(settings.reply_tokens, max_tokens - 30))))
+    if json_mode:
+        return json.dumps(_labels(user))
+    if "intent detector" in system:
+        return _labels(user)["intent"]
+    if "emotion and sentiment detector" in system:
+        labels = _labels(user)
+        return json.dumps({"emotion": labels["emotion"], "sentiment": labels["sentiment"]})
+    if system.startswith("Summarize"):
+        return "The user has been sharing how their week went and how they feel about it."
+    return _reply(settings.reply_tokens)
+
+
+def apply_limits(request: dict, completion: str):
+    """(text, finish_reason) after the request's stop sequences and max_tokens, as the real API applies them."""
+    stop = request.get("stop") or []
+    stop = [stop] if isinstance(stop, str) else stop
+    cuts = [completion.find(sequence) for sequence in stop if sequence and sequence in completion]
+    if cuts:
+        return completion[:min(cuts)], "stop"
+
+    max_tokens = request.get("max_tokens")
+    if max_tokens:
+        used = 0
+        for match in re.finditer(r"\S+\s*", completion):
+            used += estimate_tokens(match.group())
+            if used > int(max_tokens):
+                return completion[:match.start()], "length"
+    return completion, "stop"
+
+
+def _usage(request: dict, completion: str) -> dict:
+    prompt_tokens = sum(
+        estimate_tokens(str(m.get("content", ""))) + 4 for m in request.get("messages") or []
+    ) + 3
+    completion_tokens = estimate_tokens(completion)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops SYNs under load-test concurrency, adding 1s connect stalls
+    request_queue_size = 256
+
+
+def make_handler(settings: StandInSettings, stats: StandInStats):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, format, *args):
+            pass
+
+        def handle(self):
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client gave up: a timeout, or the losing half of a hedged request
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": [{"id": "standin", "object": "model"}]})
+            elif self.path.rstrip("/") == "/stats":
+                self._send_json(200, dict(stats.to_dict(), settings=settings.to_dict()))
+            else:
+                self._send_json(404, {"error": {"message": "Not found"}})
+
+        def do_POST(self):
+            try:
+                body = self._read_json()
+            except ValueError:
+                self._send_json(400, {"error": {"message": "Request body is not JSON"}})
+                return
+
+            if self.path.rstrip("/") == "/config":
+                try:
+                    settings.update(body)
+                except (ValueError, TypeError) as e:
+                    self._send_json(400, {"error": {"message": str(e)}})
+                    return
+                self._send_json(200, settings.to_dict())
+                return
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "Not found"}})
+                return
+            self._complete(body)
+
+        def _complete(self, request):
+            model = request.get("model") or "standin"
+            stream = bool(request.get("stream"))
+            latency, fault = settings.draw()
+
+            if fault in ("rpm", "rate_limit"):
+                retry_after = settings.rpm_retry_after() if fault == "rpm" else settings.retry_after
+                stats.record("rate_limited", model, stream)
+                self._send_json(
+                    429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                    headers={"Retry-After": f"{retry_after:.3f}"}
+                )
+                return
+
+            time.sleep(latency)
+            if fault == "hang":
+                stats.record("hung", model, stream)
+                self.close_connection = True
+                return
+            if fault == "error":
+                stats.record("errors", model, stream)
+                self._send_json(settings.error_status, {"error": {"message": "Injected upstream failure"}})
+                return
+
+            completion, finish_reason = apply_limits(request, completion_for(request, settings))
+            usage = _usage(request, completion)
+            stats.record("ok", model, stream)
+            if stream:
+                self._stream(model, completion)
+                return
+
+            time.sleep(settings.token_latency * max(0, usage["completion_tokens"] - 1))
+            self._send_json(200, {
+                "id": f"standin-{time.monotonic_ns()}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": completion},
+                    "finish_reason": finish_reason
+                }],
+                "usage": usage
+            })
+
+        def _stream(self, model, completion):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send(data):
+                chunk = f"data: {data}\n\n".encode()
+                self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                self.wfile.flush()
+
+            pieces = re.findall(r"\S+\s*", completion)
+            for i, piece in enumerate(pieces):
+                if i:
+                    time.sleep(settings.token_latency)
+                send(json.dumps({
+                    "object": "chat.completion.chunk",
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                }))
+            send("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+
+    return StandInHandler
+
+
+def start_standin(host="127.0.0.1", port=0, **settings):
+    """
+    Run a stand-in server on a daemon thread, e.g. inside a benchmark script.
+    Returns (server, base_url); port 0 picks a free port. Stop it with server.shutdown().
+    """
+    server = StandInServer((host, port), make_handler(StandInSettings(**settings), StandInStats()))
+    threading.Thread(target=server.serve_forever, name="llm-standin", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0.05", help="time to first token, e.g. lognormal:0.35:0.5")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds per further completion token")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--rpm", type=float, default=0.0, help="enforced requests per minute (0 = none)")
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=60.0)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    try:
+        settings = StandInSettings(
+            latency=args.latency, token_latency=args.token_latency, error_rate=args.error_rate,
+            error_status=args.error_status, rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+            rpm=args.rpm, hang_rate=args.hang_rate, hang_seconds=args.hang_seconds,
+            reply_tokens=args.reply_tokens, seed=args.seed
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = StandInServer((args.host, args.port), make_handler(settings, StandInStats()))
+    print(f"LLM stand-in listening on http://{args.host}:{args.port}/v1", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
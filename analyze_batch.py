@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# Label a JSONL file of stored messages with intent, emotion and sentiment.
+#
+#   python analyze_batch.py messages.jsonl -o labelled.jsonl
+#   cat messages.jsonl | python analyze_batch.py - --field message > labelled.jsonl
+#
+# Each input line is a JSON object; the text is read from --field and the
+# object is written back out with "intent", "emotion" and "sentiment" added.
+# Lines are processed in chunks, so files larger than memory stream through.
+import os
+import sys
+import json
+import time
+import argparse
+from itertools import islice
+
+# Import the NLP package directly: importing Core_Brain would load Whisper and gTTS
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Core_Brain"))
+from nlp_engine.config import BATCH_PACK_SIZE, BATCH_CONCURRENCY, LLM_BACKEND
+from nlp_engine.backends import BACKENDS
+from nlp_engine.nlp_engine import NLPEngine
+
+
+def read_rows(stream, field):
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Skipping line {line_no}: {e}", file=sys.stderr)
+            continue
+        if not isinstance(row, dict) or not isinstance(row.get(field), str):
+            print(f"Skipping line {line_no}: no '{field}' text", file=sys.stderr)
+            continue
+        yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch intent/emotion/sentiment labelling")
+    parser.add_argument("input", help="JSONL file, or - for stdin")
+    parser.add_argument("-o", "--output", help="output JSONL (default: stdout)")
+    parser.add_argument("--field", default="text", help="key holding the message text")
+    parser.add_argument("--chunk", type=int, default=500, help="lines read per analyze_batch call")
+    parser.add_argument("--pack-size", type=int, default=BATCH_PACK_SIZE)
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=LLM_BACKEND,
+                        help="LLM backend (standin runs against the local stand-in server)")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    nlp = NLPEngine(backend=args.backend)
+
+    rows = read_rows(source, args.field)
+    total = 0
+    started = time.monotonic()
+    try:
+        while True:
+            chunk = list(islice(rows, args.chunk))
+            if not chunk:
+                break
+            labels = nlp.analyze_batch(
+                [row[args.field] for row in chunk], pack_size=args.pack_size, concurrency=args.concurrency
+            )
+            for row, result in zip(chunk, labels):
+                sink.write(json.dumps({**row, **result}, ensure_ascii=False) + "\n")
+            sink.flush()
+            total += len(chunk)
+            print(f"{total} messages labelled", file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    metrics = nlp.get_metrics()
+    elapsed = time.monotonic() - started
+    print(
+        f"Done: {total} messages in {elapsed:.1f}s, "
+        f"{metrics['batch']['packs']} packed requests, "
+        f"{metrics['batch']['resplits']} re-splits, "
+        f"{metrics['cache']['hits'] if metrics['cache'] else 0} cache hits",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
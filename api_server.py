@@ -1,7 +1,10 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from Core_Brain import stt, tts, nlp, memory
+from Core_Brain.nlp_engine import LLMError
+from Core_Brain.nlp_engine.config import BATCH_MAX_ITEMS
 from flask_cors import CORS
 import os
+import json
 import logging
 
 # Setup logging
@@ -30,23 +33,31 @@ def api_response():
         data = request.json
         user_input = data.get('message')
         personality_name = data.get('personality', 'echo')
+        session_id = data.get('session_id')
 
         if not user_input:
             return jsonify({"success": False, "error": "No input message provided"}), 400
 
-        # Use Core NLP module
-        response_text = nlp.generate_response(user_input, personality=personality_name) \
-            if hasattr(nlp, "generate_response") else f"You said: {user_input}"
+        if not nlp:
+            return jsonify({"success": False, "error": "NLP component not available"}), 503
 
-        # Memory (if implemented)
-        if hasattr(memory, "store"):
-            memory.store(user_input, response_text)
+        # Use Core NLP module (writes the turn to memory)
+        result = nlp.analyze(
+            user_input, memory_manager=memory, session_id=session_id, personality=personality_name
+        )
 
         return jsonify({
             'success': True,
-            'response': response_text
+            'response': result['response'],
+            'intent': result['intent'],
+            'emotion': result['emotion'],
+            'sentiment': result['sentiment'],
+            'tier': result['tier']
         })
 
+    except LLMError as e:
+        return llm_unavailable(e)
+
     except Exception as e:
         logging.error("Error in /api/response", exc_info=True)
         return jsonify({
@@ -55,6 +66,86 @@ def api_response():
             'response': "I'm sorry, I couldn't process your request at the moment."
         }), 500
 
+def llm_unavailable(error):
+    """503 for a failed model call, with Retry-After when the upstream or breaker gave one"""
+    logging.warning(f"LLM unavailable: {error!r}")
+    response = jsonify({
+        'success': False,
+        'error': f"{type(error).__name__}: {error}",
+        'response': "I'm sorry, I couldn't process your request at the moment."
+    })
+    response.status_code = 503
+    if error.retry_after is not None:
+        response.headers['Retry-After'] = str(max(1, round(error.retry_after)))
+    return response
+
+def _sse(event, data):
+    """Format one Server-Sent-Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/response/stream', methods=['POST'])
+def api_response_stream():
+    """Same contract as /api/response, but the reply streams back as Server-Sent Events"""
+    if not check_api_key(request):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    data = request.json or {}
+    user_input = data.get('message')
+    personality_name = data.get('personality', 'echo')
+    session_id = data.get('session_id')
+
+    if not user_input:
+        return jsonify({"success": False, "error": "No input message provided"}), 400
+
+    if not nlp:
+        return jsonify({"success": False, "error": "NLP component not available"}), 503
+
+    def generate():
+        try:
+            for event in nlp.analyze_stream(
+                user_input, memory_manager=memory, session_id=session_id, personality=personality_name
+            ):
+                event_type = event.pop("type")
+                yield _sse(event_type, event)
+        except Exception as e:
+            logging.error("Error in /api/response/stream", exc_info=True)
+            yield _sse("error", {
+                "error": str(e),
+                "response": "I'm sorry, I couldn't process your request at the moment."
+            })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def api_analyze_batch():
+    """Intent, emotion and sentiment for many messages. Generates no replies and writes no memory."""
+    if not check_api_key(request):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    data = request.json or {}
+    messages = data.get('messages')
+
+    if not isinstance(messages, list) or not messages or not all(isinstance(m, str) for m in messages):
+        return jsonify({"success": False, "error": "'messages' must be a non-empty list of strings"}), 400
+
+    if len(messages) > BATCH_MAX_ITEMS:
+        return jsonify({"success": False, "error": f"At most {BATCH_MAX_ITEMS} messages per request"}), 413
+
+    if not nlp:
+        return jsonify({"success": False, "error": "NLP component not available"}), 503
+
+    try:
+        results = nlp.analyze_batch(messages)
+        return jsonify({"success": True, "count": len(results), "results": results})
+
+    except Exception as e:
+        logging.error("Error in /api/analyze/batch", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/api/stt', methods=['POST'])
 def api_stt():
     if not check_api_key(request):
@@ -95,6 +186,16 @@ def api_tts():
         logging.error("Error in /api/tts", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    if not check_api_key(request):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    metrics = nlp.get_metrics() if hasattr(nlp, "get_metrics") else {}
+    if memory is not None:
+        metrics["memory"] = memory.get_stats()
+    return jsonify({"success": True, "metrics": metrics})
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,205 @@
+# ASGI entry point: same API contracts as api_server.py, served from one event loop.
+# Run with: uvicorn asgi_server:app --host 0.0.0.0 --port $PORT
+from quart import Quart, request, jsonify, Response
+from quart_cors import cors
+from Core_Brain import stt, tts, memory
+from Core_Brain.nlp_engine import AsyncNLPEngine, LLMError
+from Core_Brain.nlp_engine.config import BATCH_MAX_ITEMS
+import os
+import json
+import asyncio
+import logging
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Security (optional)
+API_KEY = os.environ.get("API_KEY", None)
+
+app = cors(Quart(__name__))
+
+# Every LLM-bound conversation is a coroutine waiting on the pooled client, not a worker
+nlp = AsyncNLPEngine()
+
+def check_api_key(req):
+    """Check if API key is valid"""
+    if API_KEY:
+        client_key = req.headers.get("x-api-key")
+        if client_key != API_KEY:
+            return False
+    return True
+
+def llm_unavailable(error):
+    """503 for a failed model call, with Retry-After when the upstream or breaker gave one"""
+    logging.warning(f"LLM unavailable: {error!r}")
+    response = jsonify({
+        'success': False,
+        'error': f"{type(error).__name__}: {error}",
+        'response': "I'm sorry, I couldn't process your request at the moment."
+    })
+    response.status_code = 503
+    if error.retry_after is not None:
+        response.headers['Retry-After'] = str(max(1, round(error.retry_after)))
+    return response
+
+def _sse(event, data):
+    """Format one Server-Sent-Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.after_serving
+async def close_nlp_client():
+    await nlp.aclose()
+
+@app.route('/api/response', methods=['POST'])
+async def api_response():
+    if not check_api_key(request):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    try:
+        data = await request.get_json()
+        user_input = data.get('message')
+        personality_name = data.get('personality', 'echo')
+        session_id = data.get('session_id')
+
+        if not user_input:
+            return jsonify({"success": False, "error": "No input message provided"}), 400
+
+        result = await nlp.analyze(
+            user_input, memory_manager=memory, session_id=session_id, personality=personality_name
+        )
+
+        return jsonify({
+            'success': True,
+            'response': result['response'],
+            'intent': result['intent'],
+            'emotion': result['emotion'],
+            'sentiment': result['sentiment'],
+            'tier': result['tier']
+        })
+
+    except LLMError as e:
+        return llm_unavailable(e)
+
+    except Exception as e:
+        logging.error("Error in /api/response", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'response': "I'm sorry, I couldn't process your request at the moment."
+        }), 500
+
+@app.route('/api/response/stream', methods=['POST'])
+async def api_response_stream():
+    """Same contract as /api/response, but the reply streams back as Server-Sent Events"""
+    if not check_api_key(request):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    data = await request.get_json() or {}
+    user_input = data.get('message')
+    personality_name = data.get('personality', 'echo')
+    session_id = data.get('session_id')
+
+    if not user_input:
+        return jsonify({"success": False, "error": "No input message provided"}), 400
+
+    async def generate():
+        try:
+            async for event in nlp.analyze_stream(
+                user_input, memory_manager=memory, session_id=session_id, personality=personality_name
+            ):
+                event_type = event.pop("type")
+                yield _sse(event_type, event)
+        except Exception as e:
+            logging.error("Error in /api/response/stream", exc_info=True)
+            yield _sse("error", {
+                "error": str(e),
+                "response": "I'm sorry, I couldn't process your request at the moment."
+            })
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.timeout = None  # the stream lasts as long as the completion
+    return response
+
+@app.route('/api/analyze/batch', methods=['POST'])
+async def api_analyze_batch():
+    """Intent, emotion and sentiment for many messages. Generates no replies and writes no memory."""
+    if not check_api_key(request):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    data = await request.get_json() or {}
+    messages = data.get('messages')
+
+    if not isinstance(messages, list) or not messages or not all(isinstance(m, str) for m in messages):
+        return jsonify({"success": False, "error": "'messages' must be a non-empty list of strings"}), 400
+
+    if len(messages) > BATCH_MAX_ITEMS:
+        return jsonify({"success": False, "error": f"At most {BATCH_MAX_ITEMS} messages per request"}), 413
+
+    try:
+        results = await nlp.analyze_batch(messages)
+        return jsonify({"success": True, "count": len(results), "results": results})
+
+    except Exception as e:
+        logging.error("Error in /api/analyze/batch", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/stt', methods=['POST'])
+async def api_stt():
+    if not check_api_key(request):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    try:
+        files = await request.files
+        audio_file = files.get("audio")
+        if not audio_file:
+            return jsonify({"success": False, "error": "No audio file uploaded"}), 400
+
+        # Whisper is CPU-bound; keep it off the event loop
+        text_output = await asyncio.to_thread(stt.transcribe, audio_file) \
+            if hasattr(stt, "transcribe") else "STT not implemented"
+        return jsonify({"success": True, "text": text_output})
+
+    except Exception as e:
+        logging.error("Error in /api/stt", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/tts', methods=['POST'])
+async def api_tts():
+    if not check_api_key(request):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    try:
+        data = await request.get_json()
+        text_input = data.get("text")
+
+        if not text_input:
+            return jsonify({"success": False, "error": "No text provided"}), 400
+
+        audio_output = await asyncio.to_thread(tts.speak, text_input) if hasattr(tts, "speak") else None
+
+        if audio_output:
+            return jsonify({"success": True, "audio": audio_output})  # You might return a file/url instead
+        else:
+            return jsonify({"success": False, "error": "TTS not implemented"}), 500
+
+    except Exception as e:
+        logging.error("Error in /api/tts", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/metrics', methods=['GET'])
+async def api_metrics():
+    if not check_api_key(request):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    metrics = nlp.get_metrics()
+    if memory is not None:
+        metrics["memory"] = memory.get_stats()
+    return jsonify({"success": True, "metrics": metrics})
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 8000))
+    uvicorn.run(app, host='0.0.0.0', port=port)
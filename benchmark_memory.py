@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# Benchmark MemoryManager: context lookups as sessions grow, and crypto cost per chat turn.
+#
+#   python benchmark_memory.py
+#   python benchmark_memory.py lookup --sessions 10 100 1000 10000 --turns 5
+#   python benchmark_memory.py crypto --sessions 200 --turns 20 --working-set 50
+#
+# lookup: fills the store with --turns turns per session and times random
+#   get_context_turns calls, next to a scan of one shared list of every turn
+#   (the layout before sessions were indexed). The indexed lookup stays flat.
+# crypto: replays conversations (each turn reads the session's context, then
+#   stores the new turn) against MemoryManager and against per-turn Fernet
+#   (every turn encrypted on write and decrypted on every read), and reports
+#   microseconds and Fernet operations per turn, plus the final seal of
+#   everything still unsealed.
+import os
+import sys
+import time
+import random
+import argparse
+from collections import deque
+
+from cryptography.fernet import Fernet
+
+# Import the module directly: importing Core_Brain would load Whisper and gTTS
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Core_Brain"))
+from memory_manager import MemoryManager
+
+
+class PerTurnFernetMemory:
+    """The previous design: each message is its own Fernet token, decrypted on every read."""
+    def __init__(self, session_depth):
+        self.fernet = Fernet(Fernet.generate_key())
+        self.session_depth = session_depth
+        self.sessions = {}
+        self.crypto_ops = 0
+
+    def add_memory(self, user, echo, session_id):
+        turns = self.sessions.setdefault(session_id, deque(maxlen=self.session_depth))
+        turns.append((self.fernet.encrypt(user.encode()), self.fernet.encrypt(echo.encode())))
+        self.crypto_ops += 2
+
+    def get_context_turns(self, session_id):
+        turns = self.sessions.get(session_id, ())
+        self.crypto_ops += 2 * len(turns)
+        return [(self.fernet.decrypt(user).decode(), self.fernet.decrypt(echo).decode()) for user, echo in turns]
+
+    def scan_lookup(self):
+        """Lookup over one shared list of every turn, filtered by session."""
+        history = [(session_id, user, echo) for session_id, turns in self.sessions.items() for user, echo in turns]
+
+        def lookup(session_id):
+            return [
+                (self.fernet.decrypt(user).decode(), self.fernet.decrypt(echo).decode())
+                for owner, user, echo in history if owner == session_id
+            ]
+        return lookup
+
+
+def fill(memory, sessions, turns):
+    for s in range(sessions):
+        for t in range(turns):
+            memory.add_memory(f"message {t} from user {s}", f"reply {t} to user {s}", f"session-{s}")
+    return memory
+
+
+def time_lookups(lookup, session_ids, lookups):
+    """Mean microseconds per lookup of a random session."""
+    picks = [random.choice(session_ids) for _ in range(lookups)]
+    started = time.perf_counter()
+    for session_id in picks:
+        lookup(session_id)
+    return 1e6 * (time.perf_counter() - started) / lookups
+
+
+def bench_lookup(args):
+    print(f"{'sessions':>9} {'entries':>8} {'lookup us':>10} {'scan us':>10}")
+    for sessions in args.sessions:
+        memory = fill(
+            MemoryManager(session_depth=args.turns, max_entries=sessions * args.turns, working_set=sessions),
+            sessions, args.turns
+        )
+        session_ids = [f"session-{s}" for s in range(sessions)]
+        indexed = time_lookups(memory.get_context_turns, session_ids, args.lookups)
+        if args.no_scan:
+            scan_text = f"{'-':>10}"
+        else:
+            baseline = fill(PerTurnFernetMemory(args.turns), sessions, args.turns)
+            scan_text = f"{time_lookups(baseline.scan_lookup(), session_ids, args.lookups):>10.1f}"
+
+        stats = memory.get_stats()
+        print(f"{stats['sessions']:>9} {stats['entries']:>8} {indexed:>10.1f} {scan_text}")
+
+
+def converse(memory, sessions, turns):
+    """Round-robin chat turns across sessions; returns seconds spent."""
+    started = time.perf_counter()
+    for t in range(turns):
+        for s in range(sessions):
+            session_id = f"session-{s}"
+            "\n".join(f"User: {user}\nEcho: {echo}" for user, echo in memory.get_context_turns(session_id))
+            memory.add_memory(
+                f"turn {t}: how I have been feeling today, user {s}",
+                f"reply {t}: thank you for telling me how your day went, user {s}",
+                session_id
+            )
+    return time.perf_counter() - started
+
+
+def bench_crypto(args):
+    total = args.sessions * args.turns
+    print(f"{args.sessions} sessions x {args.turns} turns, depth {args.depth}, working set {args.working_set}")
+    print(f"{'design':<22} {'us/turn':>9} {'ops/turn':>9} {'seal ms':>9}")
+
+    baseline = PerTurnFernetMemory(args.depth)
+    seconds = converse(baseline, args.sessions, args.turns)
+    print(f"{'per-turn fernet':<22} {1e6 * seconds / total:>9.1f} {baseline.crypto_ops / total:>9.2f} {'-':>9}")
+
+    memory = MemoryManager(
+        session_depth=args.depth, max_entries=args.sessions * args.depth, working_set=args.working_set
+    )
+    seconds = converse(memory, args.sessions, args.turns)
+    stats = memory.get_stats()
+    ops = stats["seals"] + stats["unseals"]
+    started = time.perf_counter()
+    memory.seal_pending()
+    seal_ms = 1000 * (time.perf_counter() - started)
+    print(f"{'working set + batches':<22} {1e6 * seconds / total:>9.1f} {ops / total:>9.2f} {seal_ms:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MemoryManager lookups and crypto cost")
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(dest="command")
+
+    lookup = commands.add_parser("lookup", help="lookup cost against session count")
+    lookup.add_argument("--sessions", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                        help="session counts to measure (default: 10 100 1000 10000)")
+    lookup.add_argument("--turns", type=int, default=5, help="turns stored per session (default: 5)")
+    lookup.add_argument("--lookups", type=int, default=2000, help="lookups timed per session count (default: 2000)")
+    lookup.add_argument("--no-scan", action="store_true", help="skip the shared-list scan comparison")
+
+    crypto = commands.add_parser("crypto", help="crypto cost per chat turn")
+    crypto.add_argument("--sessions", type=int, default=200, help="concurrent conversations (default: 200)")
+    crypto.add_argument("--turns", type=int, default=20, help="turns per conversation (default: 20)")
+    crypto.add_argument("--depth", type=int, default=5, help="turns of context per session (default: 5)")
+    crypto.add_argument("--working-set", type=int, default=1000,
+                        help="sessions held decrypted (default: 1000); below --sessions, turns pay for unseals")
+
+    args = parser.parse_args()
+    random.seed(args.seed)
+    if args.command == "crypto":
+        bench_crypto(args)
+    elif args.command == "lookup":
+        bench_lookup(args)
+    else:
+        bench_lookup(lookup.parse_args([]))
+        print()
+        bench_crypto(crypto.parse_args([]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+# pytest configuration for the whole tree
+# test_integration.py is a script that needs the full stack (STT, TTS, Groq), not a test module
+collect_ignore = ["test_integration.py"]
@@ -1,5 +1,6 @@
 from .base_personality import BasePersonality
-from Core_Brain.nlp_engine import NLPEngine
+from Core_Brain.nlp_engine import NLPEngine, LLMError
+from Core_Brain.nlp_engine.prompt_builder import history_turns
 
 
 class EchoPersonality(BasePersonality):
@@ -7,38 +8,41 @@ class EchoPersonality(BasePersonality):
         super().__init__(name="Echo", style="caring, empathetic", goals="help user emotionally and give supportive replies")
         self.nlp = NLPEngine() 
 
-    def respond(self, user_input, memory):
-        analysis = self.nlp.analyze(user_input, memory)
+    def respond(self, user_input, memory, session_id=None):
+        analysis = self.nlp.classify(user_input)
         intent = analysis.get("intent", "unknown")
         emotion = analysis.get("emotion", "neutral")
         sentiment = analysis.get("sentiment", "neutral")
 
-        # Personality-specific system prompt
-        system_prompt = (
-            f"You are {self.name}. "
-            f"Your style: {self.style}. "
-            f"Your goals: {self.goals}. "
-            f"User's emotion: {emotion}\n"
-            f"User's intent: {intent}\n"
-            f"Sentiment: {sentiment}\n"
-            f"User said: {user_input}\n"
-            "Stay in character as a caring companion. "
-            "Reply in 2–3 empathetic, supportive sentences."
+        # Stable persona first, detected labels last, history trimmed to the token budget
+        messages = self.nlp.build_prompt(
+            system=(
+                f"You are {self.name}. "
+                f"Your style: {self.style}. "
+                f"Your goals: {self.goals}. "
+                "Stay in character as a caring companion. "
+                "Reply in 2–3 empathetic, supportive sentences."
+            ),
+            user_input=user_input,
+            context=history_turns(memory, session_id),
+            volatile=(
+                f"User's emotion: {emotion}\n"
+                f"User's intent: {intent}\n"
+                f"Sentiment: {sentiment}"
+            )
         )
 
-        # Call LLM
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_input}
-        ]
-
-        response = self.nlp.call_groq_model(messages, max_tokens=150, temperature=0.7)
+        try:
+            response = self.nlp.call_groq_model(messages, task="reply", personality="echo", intent=intent)
+        except LLMError:
+            # Model unavailable: fall through to the canned reply below
+            response = None
 
         if not response:
             response = "I hear you. I'm here for you, always."
 
         # Save memory
         if memory:
-            memory.add_memory(user_input, response)
+            memory.add_memory(user_input, response, session_id)
 
         return response
\ No newline at end of file
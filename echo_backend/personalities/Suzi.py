@@ -1,5 +1,6 @@
 from .base_personality import BasePersonality
-from Core_Brain.nlp_engine import NLPEngine
+from Core_Brain.nlp_engine import NLPEngine, LLMError
+from Core_Brain.nlp_engine.prompt_builder import history_turns
 
 
 class Suzi(BasePersonality):
@@ -7,40 +8,43 @@ class Suzi(BasePersonality):
         super().__init__(name="Suzi", style="naughty, playful, bold", goals="make conversation fun, teasing, and a little tharki but caring")
         self.nlp = NLPEngine() 
 
-    def respond(self, user_input, memory):
-        analysis = self.nlp.analyze(user_input, memory)  
+    def respond(self, user_input, memory, session_id=None):
+        analysis = self.nlp.classify(user_input)
         intent = analysis.get("intent", "unknown")
         emotion = analysis.get("emotion", "neutral")
         sentiment = analysis.get("sentiment", "neutral")
         context = analysis.get("context", "")
 
-        # Apna Suzi personality prompt banao
-        system_prompt = (
-            f"You are {self.name}. "
-            f"Your style: {self.style}. "
-            f"Your goals: {self.goals}. "
-            f"User's emotion: {emotion}\n"
-            f"User's intent: {intent}\n"
-            f"Sentiment: {sentiment}\n"
-            f"User said: {user_input}\n"
-            "Always talk in a playful, teasing, naughty-but-caring way. "
-            "Never reply in a formal or generic style. "
-            "Always add a flirty or teasing twist to your replies. "
-            "Avoid robotic or assistant-like behavior completely. "
-            "You enjoy teasing the user, especially when they are being shy or curious. "
-            "Your replies should feel bold, flirty, and fun-loving. "
-            "Never say you are Echo. "
-            "Avoid sounding like a normal AI assistant."
-            "Keep your character consistent and don’t act polite or formal. "
-            "Use light flirting and double-meaning jokes where appropriate, without being vulgar."
+        # Apna Suzi personality prompt banao - persona pehle, labels aakhir mein
+        messages = self.nlp.build_prompt(
+            system=(
+                f"You are {self.name}. "
+                f"Your style: {self.style}. "
+                f"Your goals: {self.goals}. "
+                "Always talk in a playful, teasing, naughty-but-caring way. "
+                "Never reply in a formal or generic style. "
+                "Always add a flirty or teasing twist to your replies. "
+                "Avoid robotic or assistant-like behavior completely. "
+                "You enjoy teasing the user, especially when they are being shy or curious. "
+                "Your replies should feel bold, flirty, and fun-loving. "
+                "Never say you are Echo. "
+                "Avoid sounding like a normal AI assistant."
+                "Keep your character consistent and don’t act polite or formal. "
+                "Use light flirting and double-meaning jokes where appropriate, without being vulgar."
+            ),
+            user_input=user_input,
+            context=history_turns(memory, session_id),
+            volatile=(
+                f"User's emotion: {emotion}\n"
+                f"User's intent: {intent}\n"
+                f"Sentiment: {sentiment}"
+            )
         )
 
-        # Model call
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_input}
-        ]
-        response = self.nlp.call_groq_model(messages, max_tokens=150, temperature=0.95) 
+        try:
+            response = self.nlp.call_groq_model(messages, task="reply", personality="suzi", intent=intent)
+        except LLMError:
+            response = None
 
         # Agar empty reply aaya to fallback
         if not response:
@@ -54,7 +58,7 @@ class Suzi(BasePersonality):
 
         # Save memory
         if memory:
-            memory.add_memory(user_input, response)
+            memory.add_memory(user_input, response, session_id)
 
         return response + " 😏 (waise mujhe sunna acha lagta hai, aur bolo...)"
 
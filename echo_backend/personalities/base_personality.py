@@ -4,7 +4,7 @@ class BasePersonality:
         self.style = style
         self.goals = goals
 
-    def respond(self,user_input, memory):
+    def respond(self,user_input, memory, session_id=None):
         """Default response if child personality doesn't override."""
         return f"{self.name} says: I am still learning how to respond."
 
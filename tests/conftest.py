@@ -0,0 +1,9 @@
+# Tests import the engine as the top-level `nlp_engine` package, as Core_Brain does, and the
+# zen_flask modules by name, so neither Core_Brain's speech components nor the web app load
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Core_Brain'))
+sys.path.insert(0, os.path.join(ROOT, 'zen_flask'))
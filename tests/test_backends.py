@@ -0,0 +1,36 @@
+import pytest
+
+from nlp_engine import backends
+from nlp_engine.backends import GroqBackend, OpenAICompatibleBackend, StandInBackend, get_backend
+
+
+def test_groq_sends_only_the_groq_key(monkeypatch):
+    monkeypatch.setattr(backends, "LLM_API_KEY", "key-for-another-server")
+    monkeypatch.setenv("GROQ_API_KEY", "groq-key")
+    backend = GroqBackend()
+    assert backend.chat_url == "https://api.groq.com/openai/v1/chat/completions"
+    assert backend.headers["Authorization"] == "Bearer groq-key"
+
+
+def test_groq_without_its_key_refuses_the_shared_key(monkeypatch):
+    monkeypatch.setattr(backends, "LLM_API_KEY", "key-for-another-server")
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    with pytest.raises(ValueError, match="GROQ_API_KEY"):
+        GroqBackend()
+    with pytest.raises(ValueError, match="GROQ_API_KEY"):
+        get_backend("groq")
+
+
+def test_openai_backend_uses_the_shared_key(monkeypatch):
+    monkeypatch.setattr(backends, "LLM_API_KEY", "shared-key")
+    backend = OpenAICompatibleBackend("http://localhost:8000/v1/")
+    assert backend.chat_url == "http://localhost:8000/v1/chat/completions"
+    assert backend.headers["Authorization"] == "Bearer shared-key"
+
+
+def test_get_backend_by_name_or_instance():
+    standin = StandInBackend("http://127.0.0.1:9/v1")
+    assert get_backend(standin) is standin
+    assert isinstance(get_backend("STANDIN"), StandInBackend)
+    with pytest.raises(ValueError, match="Unknown LLM backend"):
+        get_backend("nope")
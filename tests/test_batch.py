@@ -0,0 +1,75 @@
+import asyncio
+import math
+import random
+
+import pytest
+
+from nlp_engine import StandInBackend, NLPEngine, AsyncNLPEngine
+from nlp_engine.config import BATCH_PACK_SIZE, BATCH_RETRY_RATIO
+from nlp_engine.standin_server import start_standin
+
+WORDS = "today my dog work feel the about weather tomorrow why really sad happy angry late again".split()
+
+
+@pytest.fixture(scope="module")
+def standin_url():
+    server, url = start_standin(latency="fixed:0.002")
+    yield url
+    server.shutdown()
+
+
+def messages(count, seed=1):
+    rng = random.Random(seed)
+    return [f"msg {i}: " + " ".join(rng.choice(WORDS) for _ in range(8)) for i in range(count)]
+
+
+def model_only(engine):
+    """Every message goes to the model: no local analyzers and no cache."""
+    engine.intent_classifier = None
+    engine.emotion_analyzer = None
+    engine.cache = None
+    return engine
+
+
+def test_full_packs_fit_their_token_budget(standin_url):
+    engine = model_only(NLPEngine(backend=StandInBackend(standin_url)))
+    results = engine.analyze_batch(messages(1000))
+
+    assert len(results) == 1000 and None not in results
+    assert engine.batch_stats == {
+        "items": 1000, "packs": 1000 // BATCH_PACK_SIZE, "resplits": 0, "failed_slots": 0
+    }
+
+
+def test_async_full_packs_fit_their_token_budget(standin_url):
+    async def main():
+        engine = model_only(AsyncNLPEngine(backend=StandInBackend(standin_url)))
+        return await engine.analyze_batch(messages(1000)), engine.batch_stats
+
+    results, stats = asyncio.run(main())
+    assert len(results) == 1000 and None not in results
+    assert stats["packs"] == 1000 // BATCH_PACK_SIZE
+
+
+def test_truncated_output_keeps_complete_entries_and_bounds_requests(standin_url):
+    engine = model_only(NLPEngine(backend=StandInBackend(standin_url)))
+    engine._batch_max_tokens = lambda size: 30 * size  # too small: every pack is cut off
+    results = engine.analyze_batch(messages(200))
+
+    packs = 200 // BATCH_PACK_SIZE
+    stats = engine.batch_stats
+    assert None not in results
+    assert stats["packs"] <= packs + math.ceil(packs * BATCH_RETRY_RATIO)
+    # Entries before each cut were kept, so most slots still got model labels
+    assert stats["failed_slots"] < 200 // 2
+
+
+def test_parse_batch_salvages_cut_off_output():
+    engine = NLPEngine(backend=StandInBackend("http://127.0.0.1:9/v1"))
+    cut_off = (
+        '{"results": [{"id": 1, "intent": "greeting", "emotion": "happy", "sentiment": "positive"}, '
+        '{"id": 2, "intent": "question", "emotion": "neutral", "sentiment": "neutral"}, {"id": 3, "inte'
+    )
+    labels = engine._parse_batch(cut_off, 3)
+    assert sorted(labels) == [0, 1]
+    assert labels[0]["intent"] == "greeting"
@@ -0,0 +1,63 @@
+import time
+
+from nlp_engine.cache import (
+    CacheStats, InProcessCacheBackend, SQLiteCacheBackend, ResponseCache, normalize_text
+)
+
+
+def test_normalize_folds_case_space_and_edge_punctuation():
+    assert normalize_text("  Hello   THERE!! ") == normalize_text("hello there")
+
+
+def test_key_depends_on_everything_that_changes_the_answer():
+    key = ResponseCache.make_key("reply", "hi", personality="echo", model="m", context="c")
+    assert key == ResponseCache.make_key("reply", "Hi!", personality="echo", model="m", context="c")
+    assert key != ResponseCache.make_key("reply", "hi", personality="zen", model="m", context="c")
+    assert key != ResponseCache.make_key("reply", "hi", personality="echo", model="m", context="other")
+    assert key != ResponseCache.make_key("labels", "hi", personality="echo", model="m", context="c")
+
+
+def test_in_process_evicts_least_recently_used():
+    stats = CacheStats()
+    backend = InProcessCacheBackend(stats, maxsize=2)
+    backend.set("a", 1, 60)
+    backend.set("b", 2, 60)
+    backend.get("a")
+    backend.set("c", 3, 60)
+    assert (backend.get("a"), backend.get("b"), backend.get("c")) == (1, None, 3)
+    assert stats.snapshot()["evictions"] == 1
+
+
+def test_in_process_expires_entries():
+    stats = CacheStats()
+    backend = InProcessCacheBackend(stats)
+    backend.set("a", 1, 0.01)
+    time.sleep(0.02)
+    assert backend.get("a") is None
+    assert stats.snapshot()["expirations"] == 1
+
+
+def test_sqlite_round_trip_expiry_and_eviction(tmp_path):
+    stats = CacheStats()
+    backend = SQLiteCacheBackend(stats, path=str(tmp_path / "cache.sqlite3"), maxsize=3)
+    backend.set("gone", {"v": 0}, 0.01)
+    time.sleep(0.02)
+    assert backend.get("gone") is None
+
+    # The size check runs on every _EVICT_EVERY-th set, the expired row's included
+    last = backend._EVICT_EVERY - 2
+    for i in range(last + 1):
+        backend.set(f"k{i}", {"v": i}, 60)
+    assert len(backend) == 3
+    assert backend.get(f"k{last}") == {"v": last}
+    assert backend.get("k0") is None
+
+
+def test_response_cache_counts_hits_and_misses():
+    cache = ResponseCache(InProcessCacheBackend(CacheStats()))
+    assert cache.get("labels", "hello") is None
+    cache.set("labels", "hello", {"intent": "greeting"}, 60)
+    assert cache.get("labels", "Hello!") == {"intent": "greeting"}
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"], stats["size"]) == (1, 1, 0.5, 1)
+    assert cache.blocking is False
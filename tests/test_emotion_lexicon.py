@@ -0,0 +1,48 @@
+from nlp_engine.emotion_lexicon import LexiconEmotionAnalyzer
+
+
+def score(text):
+    return LexiconEmotionAnalyzer().score(text)
+
+
+def test_plain_emotion_is_confident():
+    result = score("I am very angry")
+    assert (result["emotion"], result["sentiment"], result["confident"]) == ("angry", "negative", True)
+
+
+def test_negation_flips_polarity():
+    result = score("I am not happy")
+    assert (result["emotion"], result["sentiment"]) == ("sad", "negative")
+
+
+def test_negated_negative_word_is_not_negative():
+    result = score("no worries, thanks a lot!")
+    assert (result["emotion"], result["sentiment"]) == ("grateful", "positive")
+
+
+def test_negation_ends_at_clause_break():
+    # "excited" is in a new sentence, so the "not" before "happy" does not reach it
+    result = score("I am not happy. I am excited!")
+    assert result["sentiment"] == "positive"
+    assert result["hits"] == 2
+
+
+def test_hedge_is_not_an_emotion():
+    result = score("kind of sad")
+    assert (result["emotion"], result["sentiment"]) == ("sad", "negative")
+
+
+def test_negated_gratitude_is_not_confident():
+    result = score("no thanks")
+    assert result["sentiment"] == "negative"
+    assert result["confident"] is False
+
+
+def test_mixed_polarity_is_not_confident():
+    assert score("I am so happy but this is terrible")["confident"] is False
+
+
+def test_batch_matches_single():
+    analyzer = LexiconEmotionAnalyzer()
+    texts = ["I am very angry", "no worries, thanks a lot!", "nothing here"]
+    assert analyzer.detect_emotion_batch(texts) == [analyzer.detect_emotion(text) for text in texts]
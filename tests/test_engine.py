@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from memory_manager import MemoryManager
+from nlp_engine import StandInBackend, NLPEngine, AsyncNLPEngine
+from nlp_engine.intent_classifier import LocalIntentClassifier
+from nlp_engine.nlp_engine import FUSED_SYSTEM_PROMPT, FUSED_KNOWN_INTENT_SYSTEM_PROMPT
+from nlp_engine.standin_server import start_standin
+
+MODES = ["sequential", "fused", "speculative"]
+
+
+@pytest.fixture(scope="module")
+def standin_url():
+    server, url = start_standin(latency="fixed:0.005")
+    yield url
+    server.shutdown()
+
+
+def spy_routes(engine):
+    """Record (task, personality) for every routed model call."""
+    seen = []
+    resolve = engine._resolve_route
+
+    def recording(task, personality, *args, **kwargs):
+        seen.append((task, personality))
+        return resolve(task, personality, *args, **kwargs)
+
+    engine._resolve_route = recording
+    return seen
+
+
+def make(engine_class, standin_url, mode):
+    engine = engine_class(backend=StandInBackend(standin_url), analysis_mode=mode)
+    engine.intent_classifier = None
+    engine.cache = None
+    return engine
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_reply_uses_the_requested_personality(standin_url, mode):
+    engine = make(NLPEngine, standin_url, mode)
+    seen = spy_routes(engine)
+    result = engine.analyze("I feel a little off today", personality="suzi")
+    events = list(engine.analyze_stream("hmm okay", personality="suzi"))
+
+    assert result["response"]
+    assert events[-1]["type"] == "done"
+    reply_routes = [personality for task, personality in seen if task in ("reply", "analysis")]
+    assert reply_routes and set(reply_routes) == {"suzi"}
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_async_reply_uses_the_requested_personality(standin_url, mode):
+    engine = make(AsyncNLPEngine, standin_url, mode)
+    seen = spy_routes(engine)
+
+    async def main():
+        result = await engine.analyze("I feel a little off today", personality="suzi")
+        events = [event async for event in engine.analyze_stream("hmm okay", personality="suzi")]
+        return result, events
+
+    result, events = asyncio.run(main())
+    assert result["response"]
+    assert events[-1]["type"] == "done"
+    reply_routes = [personality for task, personality in seen if task in ("reply", "analysis")]
+    assert reply_routes and set(reply_routes) == {"suzi"}
+
+
+def spy_system_prompts(engine):
+    """Record the system prompt of every analysis call."""
+    seen = []
+    call = engine.call_groq_model
+
+    def recording(messages, *args, **kwargs):
+        if kwargs.get("task") == "analysis":
+            seen.append(messages[0]["content"])
+        return call(messages, *args, **kwargs)
+
+    engine.call_groq_model = recording
+    return seen
+
+
+def test_fused_mode_asks_only_for_what_the_local_classifier_missed(standin_url):
+    engine = make(NLPEngine, standin_url, "fused")
+    engine.intent_classifier = LocalIntentClassifier()
+    seen = spy_system_prompts(engine)
+
+    # The stand-in labels a thank-you unknown; the local rule's greeting is kept
+    assert engine.analyze("thanks so much")["intent"] == "greeting"
+    engine.analyze("tell me something about the sea")
+    assert seen == [FUSED_KNOWN_INTENT_SYSTEM_PROMPT, FUSED_SYSTEM_PROMPT]
+    assert engine.intent_stats["local"] == 1
+
+
+def test_async_fused_mode_asks_only_for_what_the_local_classifier_missed(standin_url):
+    engine = make(AsyncNLPEngine, standin_url, "fused")
+    engine.intent_classifier = LocalIntentClassifier()
+    seen = spy_system_prompts(engine)
+
+    async def main():
+        return await engine.analyze("thanks so much"), await engine.analyze("tell me something about the sea")
+
+    greeting, _ = asyncio.run(main())
+    assert greeting["intent"] == "greeting"
+    assert seen == [FUSED_KNOWN_INTENT_SYSTEM_PROMPT, FUSED_SYSTEM_PROMPT]
+
+
+def test_turns_are_remembered_per_session_only(standin_url):
+    engine = make(NLPEngine, standin_url, "sequential")
+    memory = MemoryManager()
+    engine.analyze("remember me", memory_manager=memory, session_id="s1")
+    engine.analyze("anonymous", memory_manager=memory)
+
+    assert [user for user, _ in memory.get_context_turns("s1")] == ["remember me"]
+    assert memory.get_context_turns() == []
+
+
+def load_personality(module, class_name, standin_url, monkeypatch):
+    """
+    An echo_backend personality answering from the stand-in. Those modules import the
+    Core_Brain package, which starts its speech components, so they need the full install.
+    """
+    personality_module = pytest.importorskip(f"echo_backend.personalities.{module}")
+    core = pytest.importorskip("Core_Brain.nlp_engine")
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    personality = getattr(personality_module, class_name)()
+    personality.nlp = core.NLPEngine(backend=core.StandInBackend(standin_url))
+    personality.nlp.cache = None
+    return personality
+
+
+@pytest.mark.parametrize("module, class_name", [("EchoPersonality", "EchoPersonality"), ("Suzi", "Suzi")])
+def test_personalities_remember_turns_per_session(standin_url, monkeypatch, module, class_name):
+    personality = load_personality(module, class_name, standin_url, monkeypatch)
+    memory = MemoryManager()
+    personality.respond("my cat is called Miso", memory, session_id="s1")
+    personality.respond("someone else", memory, session_id="s2")
+
+    assert [user for user, _ in memory.get_context_turns("s1")] == ["my cat is called Miso"]
+    assert [user for user, _ in memory.get_context_turns("s2")] == ["someone else"]
+
+
+@pytest.mark.parametrize("module, class_name", [("EchoPersonality", "EchoPersonality"), ("Suzi", "Suzi")])
+def test_personality_prompts_carry_the_session_history(standin_url, monkeypatch, module, class_name):
+    personality = load_personality(module, class_name, standin_url, monkeypatch)
+    contexts = []
+    build_prompt = personality.nlp.build_prompt
+
+    def recording(*args, **kwargs):
+        contexts.append(kwargs["context"])
+        return build_prompt(*args, **kwargs)
+
+    personality.nlp.build_prompt = recording
+    memory = MemoryManager()
+    personality.respond("my cat is called Miso", memory, session_id="s1")
+    personality.respond("what is my cat called?", memory, session_id="s1")
+    personality.respond("hello", memory, session_id="s2")
+
+    assert contexts[0] == [] and contexts[2] == []
+    assert [user for user, _ in contexts[1]] == ["my cat is called Miso"]
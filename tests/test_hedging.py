@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from nlp_engine import NLPEngine, AsyncNLPEngine, StandInBackend
+from nlp_engine.hedging import HedgingPolicy, run_hedged, run_hedged_async
+from nlp_engine.standin_server import start_standin
+
+
+def make_policy(latencies=(0.01,), **options):
+    options = dict(dict(tasks=["intent"], min_delay=0.02, max_rate=1.0, min_samples=1), **options)
+    policy = HedgingPolicy(**options)
+    for seconds in latencies:
+        policy.record("intent", seconds)
+    return policy
+
+
+def attempts(*plan):
+    """attempt() whose nth call sleeps plan[n][0] seconds, then returns (or raises) plan[n][1]."""
+    calls = iter(plan)
+    lock = threading.Lock()
+
+    def attempt():
+        with lock:
+            seconds, outcome = next(calls)
+        time.sleep(seconds)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return attempt
+
+
+def test_no_hedging_until_the_task_has_enough_history():
+    policy = make_policy(latencies=(), min_samples=3)
+    for seconds in (0.1, 0.2):
+        assert policy.begin("intent") is None
+        policy.record("intent", seconds)
+    policy.record("intent", 0.3)
+    assert policy.begin("intent") == 0.3
+
+
+def test_delay_is_the_latency_quantile_with_a_floor():
+    latencies = [i / 100 for i in range(1, 21)]
+    assert make_policy(latencies, quantile=0.9).begin("intent") == 0.19
+    assert make_policy(latencies, quantile=0.5).begin("intent") == 0.11
+    assert make_policy(latencies, quantile=0.5, min_delay=0.5).begin("intent") == 0.5
+
+
+def test_budget_caps_hedges_at_max_rate():
+    policy = make_policy(max_rate=0.25)
+    hedged = 0
+    for _ in range(40):
+        policy.begin("intent")
+        hedged += policy.try_hedge("intent")
+    assert hedged == 10
+    stats = policy.get_stats()["tasks"]["intent"]
+    assert (stats["calls"], stats["hedged"], stats["suppressed"]) == (40, 10, 30)
+
+
+def test_calls_without_history_run_once():
+    policy = make_policy(latencies=(), min_samples=5)
+    assert run_hedged(policy, "intent", attempts((0.05, "only"))) == "only"
+    assert policy.get_stats()["tasks"]["intent"]["hedged"] == 0
+
+
+def test_first_result_wins():
+    policy = make_policy()
+    started = time.monotonic()
+    assert run_hedged(policy, "intent", attempts((0.5, "slow"), (0.0, "fast"))) == "fast"
+    assert time.monotonic() - started < 0.3
+    stats = policy.get_stats()["tasks"]["intent"]
+    assert (stats["hedged"], stats["won"]) == (1, 1)
+
+
+def test_fast_primary_is_not_hedged():
+    policy = make_policy(min_delay=0.2)
+    assert run_hedged(policy, "intent", attempts((0.0, "primary"), (0.0, "hedge"))) == "primary"
+    assert policy.get_stats()["tasks"]["intent"]["hedged"] == 0
+
+
+def test_exhausted_budget_or_vetoed_admission_waits_for_the_primary():
+    policy = make_policy(max_rate=0.1)
+    assert run_hedged(policy, "intent", attempts((0.1, "primary"))) == "primary"
+
+    policy = make_policy()
+    assert run_hedged(policy, "intent", attempts((0.1, "primary")), admit=lambda: None) == "primary"
+    stats = policy.get_stats()["tasks"]["intent"]
+    assert (stats["hedged"], stats["suppressed"]) == (0, 1)
+
+
+def test_failed_attempt_loses_to_the_other():
+    policy = make_policy()
+    assert run_hedged(policy, "intent", attempts((0.1, ValueError("primary failed")), (0.0, "hedge"))) == "hedge"
+    with pytest.raises(ValueError, match="primary"):
+        run_hedged(policy, "intent", attempts((0.1, ValueError("primary")), (0.0, KeyError("hedge"))))
+
+
+def test_admission_is_released_when_the_hedge_finishes():
+    policy = make_policy()
+    released = threading.Event()
+    run_hedged(policy, "intent", attempts((0.3, "slow"), (0.0, "fast")), admit=lambda: released.set)
+    assert released.wait(1)
+
+
+def test_async_loser_is_cancelled():
+    policy = make_policy()
+    outcomes = []
+
+    async def main():
+        calls = iter([0.5, 0.0])
+
+        async def attempt():
+            seconds = next(calls)
+            try:
+                await asyncio.sleep(seconds)
+            except asyncio.CancelledError:
+                outcomes.append(("cancelled", seconds))
+                raise
+            outcomes.append(("finished", seconds))
+            return seconds
+
+        result = await run_hedged_async(policy, "intent", attempt)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == 0.0
+    assert outcomes == [("finished", 0.0), ("cancelled", 0.5)]
+    assert policy.get_stats()["tasks"]["intent"]["won"] == 1
+
+
+@pytest.fixture
+def hanging_url():
+    # With this seed the stand-in's first request hangs for 2s and the next ones answer at once
+    server, url = start_standin(latency="fixed:0.01", hang_rate=0.5, hang_seconds=2, seed=13)
+    yield url
+    server.shutdown()
+
+
+def make_engine(engine_class, url):
+    engine = engine_class(backend=StandInBackend(url))
+    engine.intent_classifier = None
+    engine.cache = None
+    engine.hedging = make_policy(min_delay=0.05)
+    return engine
+
+
+def test_engine_hedges_a_hung_request(hanging_url):
+    engine = make_engine(NLPEngine, hanging_url)
+    started = time.monotonic()
+    assert engine.detect_intent("hello") == "greeting"
+    assert time.monotonic() - started < 1
+    assert engine.hedging.get_stats()["tasks"]["intent"]["won"] == 1
+
+
+def test_async_engine_hedges_a_hung_request(hanging_url):
+    engine = make_engine(AsyncNLPEngine, hanging_url)
+
+    async def main():
+        started = time.monotonic()
+        intent = await engine.detect_intent("hello")
+        return intent, time.monotonic() - started
+
+    intent, seconds = asyncio.run(main())
+    assert intent == "greeting" and seconds < 1
+    assert engine.hedging.get_stats()["tasks"]["intent"]["won"] == 1
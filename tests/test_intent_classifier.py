@@ -0,0 +1,75 @@
+import pytest
+
+from nlp_engine import NLPEngine, StandInBackend
+from nlp_engine.intent_classifier import LocalIntentClassifier, match_rules
+
+TRAINING = [
+    ("please book a table for two", "request"),
+    ("please send me the report", "request"),
+    ("can you set an alarm for me please", "request"),
+    ("book me a flight please", "request"),
+    ("you never listen and that is your fault", "manipulation_check"),
+    ("if you cared you would do it for me", "manipulation_check"),
+    ("after all i did for you, you owe me", "manipulation_check"),
+    ("you made me do this, it is your fault", "manipulation_check"),
+]
+
+
+@pytest.mark.parametrize("text, intent, confidence", [
+    ("Hi there!", "greeting", 0.97),
+    ("thanks so much", "greeting", 0.97),
+    ("Is it going to rain today?", "get_weather", 0.93),
+    ("I'm so stressed about work", "emotional_support", 0.9),
+    ("what time is it?", "question", 0.85),
+    ("please book a table", None, 0.0),
+])
+def test_rules(text, intent, confidence):
+    assert match_rules(text) == (intent, confidence)
+
+
+def test_first_matching_rule_wins():
+    # Both the weather and the question rules match; weather comes first
+    assert match_rules("what is the weather like?") == ("get_weather", 0.93)
+
+
+def test_greetings_must_be_the_whole_message():
+    assert match_rules("hi, can you help me plan a trip") == (None, 0.0)
+
+
+def test_untrained_model_defers_anything_the_rules_miss():
+    classifier = LocalIntentClassifier()
+    assert classifier.predict("hello") == ("greeting", 0.97)
+    assert classifier.predict("please book a table") == (None, 0.0)
+    with pytest.raises(ValueError):
+        classifier.predict_proba(["please book a table"])
+
+
+def test_trained_model_labels_what_the_rules_miss(tmp_path):
+    texts, labels = zip(*TRAINING)
+    classifier = LocalIntentClassifier().fit(list(texts), list(labels))
+    intent, confidence = classifier.predict("please book a table for four")
+    assert intent == "request" and 0 < confidence < 1
+    # Rules still take precedence over the model
+    assert classifier.predict("good morning") == ("greeting", 0.97)
+
+    batch = ["please book a table for four", "good morning", "you owe me after all i did"]
+    assert classifier.predict_batch(batch) == [classifier.predict(text) for text in batch]
+
+    path = str(tmp_path / "intent.npz")
+    classifier.save(path)
+    assert LocalIntentClassifier.load(path).predict_batch(batch) == classifier.predict_batch(batch)
+
+
+def test_engine_only_trusts_predictions_above_its_threshold():
+    engine = NLPEngine(backend=StandInBackend("http://127.0.0.1:9/v1"))
+    engine.intent_classifier = LocalIntentClassifier()
+
+    engine.intent_threshold = 0.9
+    assert engine._local_intent("I'm so stressed about work") == "emotional_support"
+    assert engine._local_intent("what time is it?") is None
+    assert engine._local_intent("please book a table") is None
+
+    engine.intent_threshold = 0.95
+    assert engine._local_intent("I'm so stressed about work") is None
+    assert engine._local_intent("hello") == "greeting"
+    assert engine.intent_stats["local"] == 2
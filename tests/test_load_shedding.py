@@ -0,0 +1,80 @@
+import threading
+
+from nlp_engine.errors import LLMTimeoutError
+from nlp_engine.load_shedding import LoadShedder, FULL, LOCAL_LABELS, REPLY_ONLY, CANNED
+from nlp_engine.rate_limiter import InProcessLimiterStore, RateLimiter
+from nlp_engine.resilience import CircuitBreaker
+
+
+def make_shedder(limiter=None, breaker=None, hold_seconds=0):
+    limiter = limiter or RateLimiter(InProcessLimiterStore(), rpm=0, tpm=0, max_concurrency=0)
+    breaker = breaker or CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    return LoadShedder(limiter, breaker, enabled=True, queue_tiers=[8, 16, 32],
+                       wait_tiers=[0.5, 2, 5], hold_seconds=hold_seconds)
+
+
+def test_unthrottled_calls_in_flight_stay_at_full_quality():
+    shedder = make_shedder()
+    release = threading.Event()
+    inside = threading.Barrier(101)
+
+    def call():
+        with shedder.limiter.slot(100):
+            inside.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=call) for _ in range(100)]
+    for thread in threads:
+        thread.start()
+    inside.wait()
+    try:
+        assert shedder.limiter.stats.snapshot()["in_flight"] == 100
+        assert shedder.current_tier() == FULL
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+
+def test_queued_callers_step_down_the_ladder():
+    shedder = make_shedder()
+    stats = shedder.limiter.stats
+    for _ in range(16):
+        stats.enter_queue()
+    assert shedder.current_tier() == REPLY_ONLY
+    for _ in range(16):
+        stats.leave_queue(0, True)
+    assert shedder.current_tier() == FULL
+
+
+def test_recent_wait_steps_down_the_ladder():
+    shedder = make_shedder()
+    stats = shedder.limiter.stats
+    stats.enter_queue()
+    stats.leave_queue(5.0, True)  # weighted 0.2: a recent wait of 1 s
+    assert shedder.current_tier() == LOCAL_LABELS
+
+
+def test_breaker_state_sets_the_floor():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    shedder = make_shedder(breaker=breaker)
+    breaker.record_failure(LLMTimeoutError("slow"))
+    assert shedder.current_tier() == CANNED
+
+
+def test_tier_is_held_after_pressure_ends():
+    shedder = make_shedder(hold_seconds=60)
+    for _ in range(8):
+        shedder.limiter.stats.enter_queue()
+    assert shedder.current_tier() == LOCAL_LABELS
+    for _ in range(8):
+        shedder.limiter.stats.leave_queue(0, True)
+    assert shedder.current_tier() == LOCAL_LABELS
+
+
+def test_disabled_shedder_always_serves_full_quality():
+    shedder = make_shedder()
+    shedder.enabled = False
+    for _ in range(40):
+        shedder.limiter.stats.enter_queue()
+    assert shedder.current_tier() == FULL
@@ -0,0 +1,75 @@
+from cryptography.fernet import Fernet
+
+from memory_manager import MemoryManager
+
+
+def test_sessions_are_isolated():
+    memory = MemoryManager()
+    memory.add_memory("hi from a", "hello a", "a")
+    memory.add_memory("hi from b", "hello b", "b")
+    assert memory.get_context_turns("a") == [("hi from a", "hello a")]
+    assert memory.get_context_turns("b") == [("hi from b", "hello b")]
+
+
+def test_turns_without_a_session_are_not_shared():
+    memory = MemoryManager()
+    memory.add_memory("private", "reply")
+    memory.add_memory("also private", "reply", "")
+    assert memory.get_context_turns() == []
+    assert memory.get_context_turns(None) == []
+    assert memory.get_stats()["unsessioned"] == 2
+
+
+def test_session_keeps_its_newest_turns():
+    memory = MemoryManager(session_depth=2)
+    for i in range(4):
+        memory.add_memory(f"u{i}", f"e{i}", "s")
+    assert memory.get_context_turns("s") == [("u2", "e2"), ("u3", "e3")]
+    assert memory.get_context_text("s") == "User: u2\nEcho: e2\nUser: u3\nEcho: e3"
+
+
+def test_least_recently_used_sessions_are_dropped_past_max_entries():
+    memory = MemoryManager(max_entries=2)
+    memory.add_memory("u", "e", "old")
+    memory.add_memory("u", "e", "mid")
+    memory.get_context_turns("old")
+    memory.add_memory("u", "e", "new")
+    assert memory.get_context_turns("mid") == []
+    assert memory.get_context_turns("old") == [("u", "e")]
+    assert memory.get_stats()["evicted_sessions"] == 1
+
+
+def test_sessions_leaving_the_working_set_are_sealed_and_unsealed_on_read():
+    key = Fernet.generate_key()
+    memory = MemoryManager(key, working_set=1)
+    memory.add_memory("first", "reply", "a")
+    memory.add_memory("second", "reply", "b")
+
+    sealed = memory.sessions["a"]
+    assert sealed.turns is None
+    assert b"first" not in sealed.sealed
+    assert Fernet(key).decrypt(sealed.sealed)
+
+    assert memory.get_context_turns("a") == [("first", "reply")]
+    stats = memory.get_stats()
+    assert (stats["seals"], stats["unseals"], stats["working_sessions"]) == (2, 1, 1)
+
+
+def test_seal_pending_seals_only_dirty_sessions():
+    memory = MemoryManager()
+    memory.add_memory("u", "e", "a")
+    memory.add_memory("u", "e", "b")
+    assert sorted(memory.seal_pending()) == ["a", "b"]
+    assert memory.seal_pending() == {}
+    memory.add_memory("u2", "e2", "b")
+    assert list(memory.seal_pending()) == ["b"]
+
+
+def test_clear_one_session_or_all():
+    memory = MemoryManager()
+    memory.add_memory("u", "e", "a")
+    memory.add_memory("u", "e", "b")
+    memory.clear_memory("a")
+    assert memory.get_context_turns("a") == [] and memory.get_context_turns("b") == [("u", "e")]
+    memory.clear_memory()
+    assert memory.get_stats()["entries"] == 0
@@ -0,0 +1,134 @@
+import sqlite3
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+
+from memory_manager import PersistentMemoryManager
+from memory_store import MemoryStore, MIGRATIONS
+
+
+@pytest.fixture
+def key():
+    return Fernet.generate_key()
+
+
+def make_store(tmp_path, key, **options):
+    return MemoryStore(str(tmp_path / "memory.sqlite3"), Fernet(key), **options)
+
+
+def test_writes_are_batched_and_encrypted(tmp_path, key):
+    store = make_store(tmp_path, key, flush_interval=0.2)
+    for i in range(10):
+        store.append("s", f"t{i}", f"user {i}", f"echo {i}", time.time() + i)
+    store.flush()
+
+    rows = store.recent("s", 3)
+    assert [turn_id for turn_id, _, _ in rows] == ["t7", "t8", "t9"]
+    assert store.decrypt(rows[-1][2]) == ("user 9", "echo 9")
+    assert b"user 9" not in rows[-1][2]
+    stats = store.get_stats()
+    assert (stats["written"], stats["pending"], stats["batches"]) == (10, 0, 1)
+    assert stats["schema_version"] == MIGRATIONS[-1][0]
+
+
+def test_queued_writes_are_listed_until_committed(tmp_path, key):
+    store = make_store(tmp_path, key, flush_interval=0.2)
+    store.append("s", "t1", "u", "e", time.time())
+    assert store.pending_ids("s") == {"t1"}
+    store.flush()
+    assert store.pending_ids("s") == set()
+
+
+def test_clear_runs_after_earlier_writes(tmp_path, key):
+    store = make_store(tmp_path, key)
+    store.append("a", "t1", "u", "e", time.time())
+    store.append("b", "t2", "u", "e", time.time())
+    store.clear("a")
+    store.flush()
+    assert store.recent("a", 5) == [] and len(store.recent("b", 5)) == 1
+
+
+def test_sessions_are_pruned_to_their_newest_turns(tmp_path, key):
+    store = make_store(tmp_path, key, keep_per_session=3)
+    now = time.time()
+    for i in range(10):
+        store.append("s", f"t{i}", "u", "e", now + i)
+    store.append("other", "o1", "u", "e", now)
+    store.flush()
+
+    conn = sqlite3.connect(store.path)
+    assert conn.execute("SELECT COUNT(*) FROM turns WHERE session_id = 's'").fetchone()[0] == 3
+    assert [turn_id for turn_id, _, _ in store.recent("s", 10)] == ["t7", "t8", "t9"]
+    assert len(store.recent("other", 10)) == 1
+    assert store.get_stats()["pruned"] == 7
+
+
+def test_turns_past_max_age_are_deleted(tmp_path, key):
+    store = make_store(tmp_path, key, max_age=60)
+    store.append("idle", "old", "u", "e", time.time() - 3600)
+    store.flush()
+    store.append("active", "new", "u", "e", time.time())
+    store.flush()
+    assert store.recent("idle", 5) == []
+    assert len(store.recent("active", 5)) == 1
+
+
+def test_workers_share_turns(tmp_path, key):
+    path = str(tmp_path / "memory.sqlite3")
+    writer = PersistentMemoryManager(key=key, path=path)
+    reader = PersistentMemoryManager(key=key, path=path)
+    writer.add_memory("hello", "hi there", "s")
+    # The writer reads its own queued write before it is committed
+    assert writer.get_context_turns("s") == [("hello", "hi there")]
+    writer.store.flush()
+    assert reader.get_context_turns("s") == [("hello", "hi there")]
+    assert reader.get_stats()["working_set_misses"] == 1
+
+
+class LockedDatabase:
+    """Stands in for the writer's connection: the first `failures` writes find the database locked."""
+    def __init__(self, store, failures):
+        self.store = store
+        self.failures = failures
+        self.connect = store._connect
+        self.pending_seen = []
+
+    def __call__(self):
+        if self.failures:
+            return self
+        return self.connect()
+
+    def execute(self, sql, *args):
+        self.failures -= 1
+        self.pending_seen.append(self.store.pending_ids("s"))
+        raise sqlite3.OperationalError("database is locked")
+
+    def close(self):
+        pass
+
+
+def test_failed_batches_are_retried_until_they_commit(tmp_path, key, monkeypatch):
+    store = make_store(tmp_path, key, retry_delay=0.01)
+    locked = LockedDatabase(store, failures=2)
+    monkeypatch.setattr(store, "_connect", locked)
+    store.append("s", "t1", "u", "e", time.time())
+    store.append("s", "t2", "u", "e", time.time() + 1)
+    store.flush()
+
+    # The turns stayed pending through both failures, so reads still saw them
+    assert locked.pending_seen == [{"t1", "t2"}, {"t1", "t2"}]
+    assert [turn_id for turn_id, _, _ in store.recent("s", 5)] == ["t1", "t2"]
+    stats = store.get_stats()
+    assert (stats["write_errors"], stats["written"], stats["dropped"], stats["pending"]) == (2, 2, 0, 0)
+
+
+def test_batches_are_dropped_once_retries_run_out(tmp_path, key, monkeypatch):
+    store = make_store(tmp_path, key, retry_delay=0.01, write_retries=1)
+    monkeypatch.setattr(store, "_connect", LockedDatabase(store, failures=2))
+    store.append("s", "t1", "u", "e", time.time())
+    store.flush()
+
+    stats = store.get_stats()
+    assert (stats["write_errors"], stats["written"], stats["dropped"], stats["pending"]) == (2, 0, 1, 0)
+    assert store.recent("s", 5) == []
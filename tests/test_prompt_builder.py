@@ -0,0 +1,85 @@
+from nlp_engine.prompt_builder import PromptBuilder, estimate_tokens, turns_from_text
+
+SYSTEM = "You are Echo."
+TURNS = [(f"turn {i} " + "word " * 10, f"reply {i} " + "ok " * 10) for i in range(10)]
+
+
+def build(budget, turns=TURNS, **options):
+    builder = PromptBuilder(budget=budget, summary_tokens=30, summary_chars=20, **options)
+    return builder.build(SYSTEM, "hello there", turns, volatile="User's intent: greeting")
+
+
+def test_history_that_fits_is_kept_whole():
+    prompt = build(10_000)
+    assert (prompt.turns_kept, prompt.turns_summarized, prompt.turns_dropped) == (10, 0, 0)
+    assert len(prompt.messages) == 2 + 2 * 10 + 1
+
+
+def test_newest_turns_are_kept_and_the_oldest_dropped_first():
+    prompt = build(200)
+    assert (prompt.turns_kept, prompt.turns_summarized, prompt.turns_dropped) == (4, 3, 3)
+    assert prompt.prompt_tokens <= 200
+
+    contents = [message["content"] for message in prompt.messages]
+    kept = [content for content in contents if content.startswith("turn ")]
+    assert kept == [TURNS[i][0] for i in range(6, 10)]
+    # The summary covers the turns just before the kept ones; turns 0-2 are gone
+    summary = contents[1]
+    assert summary.startswith("Earlier in this conversation the user said: ")
+    assert all(f"turn {i}" in summary for i in (3, 4, 5))
+    assert not any(f"turn {i}" in summary for i in (0, 1, 2))
+
+
+def test_tighter_budgets_keep_fewer_turns():
+    prompts = [build(budget) for budget in (120, 150, 200, 260)]
+    kept = [prompt.turns_kept for prompt in prompts]
+    assert kept == sorted(kept) and kept[0] < kept[-1]
+    for budget, prompt in zip((120, 150, 200, 260), prompts):
+        assert prompt.prompt_tokens <= budget
+        assert prompt.turns_kept + prompt.turns_summarized + prompt.turns_dropped == len(TURNS)
+
+
+def test_system_prefix_is_stable_and_volatile_details_go_last():
+    prompts = [build(budget) for budget in (120, 200, 10_000)]
+    for prompt in prompts:
+        assert prompt.messages[0] == {"role": "system", "content": SYSTEM}
+        assert prompt.messages[-2] == {"role": "system", "content": "User's intent: greeting"}
+        assert prompt.messages[-1] == {"role": "user", "content": "hello there"}
+
+
+def test_user_message_is_never_trimmed():
+    long_message = "please listen " * 200
+    prompt = PromptBuilder(budget=50).build(SYSTEM, long_message, TURNS)
+    assert prompt.messages == [
+        {"role": "system", "content": SYSTEM},
+        {"role": "user", "content": long_message}
+    ]
+    assert (prompt.turns_kept, prompt.turns_dropped) == (0, 10)
+
+
+def test_summarizer_covers_all_older_turns_when_it_fits():
+    seen = []
+
+    def summarizer(older):
+        seen.append(len(older))
+        return "They talked about words."
+
+    prompt = build(200, summarizer=summarizer)
+    assert seen == [6]
+    assert prompt.messages[1]["content"] == "Summary of the earlier conversation: They talked about words."
+    assert (prompt.turns_kept, prompt.turns_summarized, prompt.turns_dropped) == (4, 6, 0)
+
+
+def test_failed_summarizer_falls_back_to_the_extractive_summary():
+    assert build(200, summarizer=lambda older: None).messages[1] == build(200).messages[1]
+
+
+def test_context_text_round_trips_to_turns():
+    text = "User: hi\nEcho: hello\nUser: two\nlines\nEcho: ok"
+    assert turns_from_text(text) == [("hi", "hello"), ("two\nlines", "ok")]
+
+
+def test_token_estimate_counts_words_punctuation_and_long_words():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Hi, there!") == 4
+    assert estimate_tokens("internationalization") == 1 + (20 - 1) // 6
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+
+from nlp_engine.rate_limiter import (
+    InProcessLimiterStore, SQLiteLimiterStore, RateLimiter, RateLimitTimeoutError, estimate_request_tokens
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteLimiterStore(str(tmp_path / "limiter.sqlite3"))
+    return InProcessLimiterStore()
+
+
+def test_disabled_limiter_never_waits(store):
+    limiter = RateLimiter(store, rpm=0, tpm=0, max_concurrency=0)
+    assert not limiter.enabled
+    with limiter.slot(10_000):
+        pass
+
+
+def test_request_bucket_allows_a_burst_then_waits(store):
+    limiter = RateLimiter(store, rpm=3, tpm=0, max_concurrency=0)
+    assert [limiter.try_acquire(1, 60)[0] for _ in range(3)] == [0, 0, 0]
+    wait, lease_id = limiter.try_acquire(1, 60)
+    assert 0 < wait <= 20 and lease_id is None
+
+
+def test_token_bucket_charges_the_estimate(store):
+    limiter = RateLimiter(store, rpm=0, tpm=1000, max_concurrency=0)
+    assert limiter.try_acquire(900, 60)[0] == 0
+    assert limiter.try_acquire(200, 60)[0] > 0
+    assert limiter.try_acquire(100, 60)[0] == 0
+
+
+def test_leases_cap_concurrency_until_released(store):
+    limiter = RateLimiter(store, rpm=0, tpm=0, max_concurrency=2)
+    leases = [limiter.try_acquire(1, 60)[1] for _ in range(2)]
+    assert None not in leases
+    assert limiter.try_acquire(1, 60)[0] > 0
+    limiter.release(leases[0])
+    assert limiter.try_acquire(1, 60)[0] == 0
+
+
+def test_expired_leases_free_their_slot(store):
+    limiter = RateLimiter(store, rpm=0, tpm=0, max_concurrency=1)
+    assert limiter.try_acquire(1, 0.01)[0] == 0  # never released, e.g. a killed worker
+    time.sleep(0.02)
+    assert limiter.try_acquire(1, 60)[0] == 0
+
+
+def test_sqlite_budget_is_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "limiter.sqlite3")
+    first = RateLimiter(SQLiteLimiterStore(path), rpm=2, tpm=0, max_concurrency=0)
+    second = RateLimiter(SQLiteLimiterStore(path), rpm=2, tpm=0, max_concurrency=0)
+    assert first.try_acquire(1, 60)[0] == 0
+    assert second.try_acquire(1, 60)[0] == 0
+    assert first.try_acquire(1, 60)[0] > 0
+
+
+def test_slot_times_out_past_max_wait(store):
+    limiter = RateLimiter(store, rpm=1, tpm=0, max_concurrency=0, max_wait=0.1)
+    with limiter.slot(1):
+        pass
+    with pytest.raises(RateLimitTimeoutError) as raised:
+        with limiter.slot(1):
+            pass
+    assert raised.value.retry_after > 0
+    assert limiter.get_stats()["backend"] == type(store).__name__
+
+
+def test_penalize_pauses_every_caller(store):
+    limiter = RateLimiter(store, rpm=600, tpm=0, max_concurrency=0)
+    limiter.penalize(5)
+    wait, _ = limiter.try_acquire(1, 60)
+    assert 4 < wait <= 5.2
+
+
+def test_async_slot_returns_its_lease_when_cancelled(store):
+    limiter = RateLimiter(store, rpm=0, tpm=0, max_concurrency=1)
+
+    async def main():
+        entered = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot_async(1):
+                entered.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(hold())
+        await entered.wait()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # A blocking store releases on a worker thread
+        await asyncio.sleep(0.1)
+        async with limiter.slot_async(1):
+            return True
+
+    assert asyncio.run(asyncio.wait_for(main(), 2))
+
+
+def test_estimate_includes_the_max_tokens_reservation():
+    payload = {"messages": [{"role": "user", "content": "hello there"}], "max_tokens": 100}
+    assert estimate_request_tokens(payload) > 100
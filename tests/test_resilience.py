@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from nlp_engine.errors import (
+    LLMTimeoutError, LLMRateLimitError, LLMHTTPError, CircuitOpenError, error_for_status
+)
+from nlp_engine.resilience import RetryPolicy, CircuitBreaker
+
+
+def test_backoff_stays_within_the_cap():
+    policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+    assert all(0 <= policy.backoff(attempt) <= 2.0 for attempt in range(10))
+
+
+def test_retry_after_replaces_backoff():
+    policy = RetryPolicy(max_attempts=3, deadline=10)
+    assert policy.next_delay(0, LLMRateLimitError("429", retry_after=1.5), policy.start()) == 1.5
+
+
+def test_no_retry_for_client_errors_or_past_the_last_attempt():
+    policy = RetryPolicy(max_attempts=2, deadline=10)
+    deadline_at = policy.start()
+    assert policy.next_delay(0, LLMHTTPError("bad request", 400), deadline_at) is None
+    assert policy.next_delay(1, LLMTimeoutError("slow"), deadline_at) is None
+    assert policy.next_delay(0, LLMTimeoutError("slow"), deadline_at) is not None
+
+
+def test_no_retry_past_the_deadline():
+    policy = RetryPolicy(max_attempts=5)
+    assert policy.next_delay(0, LLMRateLimitError("429", retry_after=5), policy.start(deadline=1)) is None
+
+
+def test_status_mapping():
+    rate_limited = error_for_status(429, {"Retry-After": "3"}, "slow down")
+    assert isinstance(rate_limited, LLMRateLimitError) and rate_limited.retry_after == 3.0
+    server_error = error_for_status(503, {}, "down")
+    assert (server_error.retryable, server_error.trips_breaker) == (True, True)
+    client_error = error_for_status(400, {}, "bad")
+    assert (client_error.retryable, client_error.trips_breaker) == (False, False)
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure(LLMTimeoutError("slow"))
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.blocked()
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert 0 < raised.value.retry_after <= 60
+    assert breaker.get_stats()["rejected"] == 1
+
+
+def test_answers_from_the_upstream_do_not_trip_the_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    breaker.record_failure(LLMRateLimitError("429"))
+    breaker.record_failure(LLMHTTPError("bad request", 400))
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.02, half_open_max=1)
+    breaker.record_failure(LLMTimeoutError("slow"))
+    time.sleep(0.03)
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # one probe at a time
+    breaker.record_failure(LLMTimeoutError("still slow"))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.03)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.get_stats()["times_opened"] == 2
@@ -0,0 +1,91 @@
+import pytest
+
+from nlp_engine import NLPEngine, StandInBackend
+from nlp_engine.config import REPLY_STOP
+from nlp_engine.response_length import ReplyLengthPolicy, trim_to_sentence
+from nlp_engine.standin_server import start_standin
+
+
+@pytest.mark.parametrize("text, trimmed", [
+    ("I hear you. That sounds like a lot to", "I hear you."),
+    ("Really? Tell me more about", "Really?"),
+    ('She said "thank you." and then she', 'She said "thank you."'),
+    ("Wait… let me think about", "Wait…"),
+    ("Let's take it one step at a time.  ", "Let's take it one step at a time."),
+    ("no sentence ends here", "no sentence ends here"),
+    ("Version 2.5 is out and", "Version 2.5 is out and"),
+])
+def test_trim_to_sentence(text, trimmed):
+    assert trim_to_sentence(text) == trimmed
+
+
+def test_budget_and_stop_sequences_follow_the_intent():
+    policy = ReplyLengthPolicy()
+    assert policy.options("greeting") == {"max_tokens": 40, "stop": ["\n"]}
+    assert policy.options("emotional_support") == {"max_tokens": 200, "stop": REPLY_STOP}
+    # Intents without a budget of their own use unknown's
+    assert policy.options("something_new")["max_tokens"] == policy.options("unknown")["max_tokens"]
+
+
+def test_personality_scales_the_budget():
+    policy = ReplyLengthPolicy(tokens={"greeting": 40, "unknown": 5}, personality_scale={"suzi": 0.8})
+    assert policy.options("greeting", "Suzi")["max_tokens"] == 32
+    assert policy.options("greeting", "echo")["max_tokens"] == 40
+    # Never below the floor, however small the budget
+    assert policy.options("unknown", "suzi")["max_tokens"] == 8
+
+
+def test_stop_sequences_are_copies():
+    policy = ReplyLengthPolicy()
+    policy.options("greeting")["stop"].append("!")
+    assert policy.options("greeting")["stop"] == ["\n"]
+
+
+@pytest.fixture(scope="module")
+def long_reply_url():
+    # Replies run well past every intent's budget, so the API cuts them off mid-sentence
+    server, url = start_standin(latency="fixed:0.005", reply_tokens=400)
+    yield url
+    server.shutdown()
+
+
+def make_engine(url):
+    engine = NLPEngine(backend=StandInBackend(url))
+    engine.cache = None
+    payloads = []
+    build = engine._build_payload
+
+    def recording(*args, **kwargs):
+        payload = build(*args, **kwargs)
+        payloads.append(payload)
+        return payload
+
+    engine._build_payload = recording
+    return engine, payloads
+
+
+def test_reply_call_uses_the_intent_budget_and_trims_the_cut_off_reply(long_reply_url):
+    engine, payloads = make_engine(long_reply_url)
+    reply = engine.call_groq_model([{"role": "user", "content": "what now?"}], task="reply", intent="question")
+
+    assert payloads[-1]["max_tokens"] == 120 and payloads[-1]["stop"] == REPLY_STOP
+    assert reply.endswith((".", "?", "!"))
+    stats = engine.reply_stats.snapshot()["question"]
+    assert (stats["replies"], stats["truncated"], stats["trimmed"]) == (1, 1, 1)
+    assert stats["avg_max_tokens"] == 120
+
+
+def test_explicit_limits_win_over_the_policy(long_reply_url):
+    engine, payloads = make_engine(long_reply_url)
+    engine.call_groq_model(
+        [{"role": "user", "content": "hi"}], task="reply", intent="greeting", personality="suzi",
+        max_tokens=20, stop=["END"]
+    )
+    assert payloads[-1]["max_tokens"] == 20 and payloads[-1]["stop"] == ["END"]
+
+
+def test_calls_without_an_intent_are_not_trimmed(long_reply_url):
+    engine, payloads = make_engine(long_reply_url)
+    engine.call_groq_model([{"role": "user", "content": "hi"}], task="reply", max_tokens=30)
+    assert "stop" not in payloads[-1]
+    assert engine.reply_stats.snapshot() == {}
@@ -0,0 +1,62 @@
+import time
+
+from session_registry import SessionRegistry, approx_bytes
+
+
+def state(text="hello", context=None):
+    return {"c": [[0, text, "hi"]], "x": dict(context or {}), "t": time.time()}
+
+
+def test_get_returns_a_copy():
+    registry = SessionRegistry(60, 10, 10 ** 6)
+    registry.put("u", state())
+    loaded = registry.get("u")
+    loaded["c"].append([1, "x" * 10_000, ""])
+    loaded["x"]["note"] = "y" * 10_000
+    assert registry.get("u")["c"] == [[0, "hello", "hi"]]
+    assert "note" not in registry.get("u")["x"]
+    assert registry.bytes == approx_bytes(state())
+
+
+def test_put_keeps_its_own_copy():
+    registry = SessionRegistry(60, 10, 10 ** 6)
+    saved = state(context={"name": "Sam"})
+    registry.put("u", saved)
+    saved["x"]["name"] = "changed"
+    assert registry.get("u")["x"] == {"name": "Sam"}
+
+
+def test_least_recently_used_are_evicted_past_the_entry_budget():
+    registry = SessionRegistry(60, 2, 10 ** 6)
+    registry.put("a", state())
+    registry.put("b", state())
+    registry.get("a")
+    registry.put("c", state())
+    assert registry.get("b") is None and registry.get("a") is not None
+    assert registry.get_stats()["evicted"] == 1
+
+
+def test_byte_budget_evicts_and_tracks_rewrites():
+    registry = SessionRegistry(60, 100, approx_bytes(state("x" * 1000)) + approx_bytes(state()))
+    registry.put("big", state("x" * 1000))
+    registry.put("small", state())
+    registry.put("small", state("y" * 10))
+    assert registry.get("big") is None
+    assert registry.bytes == approx_bytes(state("y" * 10))
+
+
+def test_expire_drops_only_due_sessions():
+    registry = SessionRegistry(0.05, 10, 10 ** 6)
+    registry.put("old", state())
+    time.sleep(0.06)
+    registry.put("new", state())
+    assert registry.expire() == 1
+    assert len(registry) == 1 and registry.get("new") is not None
+
+
+def test_rewrites_do_not_grow_the_heap_without_bound():
+    registry = SessionRegistry(60, 10, 10 ** 6)
+    for _ in range(5000):
+        registry.put("u", state())
+    stats = registry.get_stats()
+    assert stats["heap_rebuilds"] >= 1 and stats["heap_size"] <= 2 + 1024 + 1
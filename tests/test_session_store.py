@@ -0,0 +1,101 @@
+import sqlite3
+import time
+
+import pytest
+
+from redis_standin import start_redis_standin
+from session_store import (
+    InProcessSessionStore, SQLiteSessionStore, RedisSessionStore, create_session_store,
+    encode_session, decode_session
+)
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    server, url = start_redis_standin()
+    yield url
+    server.shutdown()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path, redis_url):
+    if request.param == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), ttl_seconds=60)
+    if request.param == "redis":
+        store = RedisSessionStore(redis_url, ttl_seconds=60, dedicated_db=True)
+        store.client.execute('FLUSHDB')
+        return store
+    return InProcessSessionStore(ttl_seconds=60)
+
+
+def state(text="hello", t=None):
+    return {"c": [[0, text, "hi"]], "x": {"name": "Sam"}, "t": time.time() if t is None else t}
+
+
+def test_encoding_round_trips_small_and_large_states():
+    small, large = state(), state("x" * 5000)
+    assert encode_session(small)[:1] == b"j" and encode_session(large)[:1] == b"z"
+    assert decode_session(encode_session(large)) == large
+
+
+def test_put_get_delete(store):
+    store.put("u1", state("first"))
+    store.put("u1", state("second"))
+    assert store.get("u1")["c"][0][1] == "second"
+    assert store.get("missing") is None
+    store.delete("u1")
+    assert store.get("u1") is None
+
+
+def test_stats_count_live_sessions(store):
+    for i in range(3):
+        store.put(f"u{i}", state())
+    store.put("u0", state("rewritten"))
+    store.delete("u1")
+    assert store.count() == 2
+    assert store.get_stats()["live"] == 2
+
+
+def test_sqlite_count_is_kept_by_triggers(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SQLiteSessionStore(path, ttl_seconds=60)
+    store.put("idle", state(t=time.time() - 3600))
+    store.put("active", state())
+    assert store.cleanup() == 1
+    assert store.count() == 1
+    # Another worker opening the file reads the same maintained count
+    assert SQLiteSessionStore(path).count() == 1
+
+
+def test_sqlite_counts_rows_from_before_the_counter(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (user_id TEXT PRIMARY KEY, data BLOB NOT NULL, last_active REAL NOT NULL)")
+    conn.execute("INSERT INTO sessions VALUES ('old', ?, ?)", (encode_session(state()), time.time()))
+    conn.commit()
+    conn.close()
+    assert SQLiteSessionStore(path).count() == 1
+
+
+def test_redis_without_a_dedicated_db_reports_the_maintained_count(redis_url):
+    store = RedisSessionStore(redis_url, ttl_seconds=60)
+    store.client.execute('FLUSHDB')
+    store.client.execute('SET', 'unrelated', 'value')
+    store.put("u1", state())
+    assert store.needs_maintenance
+    assert store.get_stats()["live"] is None  # not counted on the request path
+    store.refresh_stats()
+    assert store.get_stats()["live"] == 1
+
+
+def test_in_process_store_expires_sessions():
+    store = InProcessSessionStore(ttl_seconds=0.01)
+    store.put("u1", state())
+    time.sleep(0.02)
+    assert store.cleanup() == 1
+    assert store.count() == 0
+
+
+def test_unknown_store_is_rejected():
+    with pytest.raises(ValueError):
+        create_session_store("cassandra")
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from nlp_engine.single_flight import SingleFlight, AsyncSingleFlight, payload_key
+
+
+def test_payload_key_ignores_dict_order():
+    assert payload_key({"a": 1, "b": [1, 2]}) == payload_key({"b": [1, 2], "a": 1})
+    assert payload_key({"a": 1}) != payload_key({"a": 2})
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def fn():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fn))) for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.get_stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_sync_error_is_shared_and_key_is_freed():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: "again") == "again"
+
+
+def test_async_callers_share_one_call():
+    async def main():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+        return results, calls, flight.get_stats()
+
+    results, calls, stats = asyncio.run(main())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert stats == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_cancelling_the_first_caller_does_not_fail_the_others():
+    async def main():
+        flight = AsyncSingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower, leader.cancelled()
+
+    assert asyncio.run(main()) == ("result", True)
+
+
+def test_request_is_cancelled_with_its_last_caller():
+    async def main():
+        flight = AsyncSingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.ensure_future(flight.do("k", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        still_running = not cancelled.is_set()
+        callers[1].cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        return still_running, flight.get_stats()["in_flight"]
+
+    assert asyncio.run(main()) == (True, 0)
+
+
+def test_async_error_is_shared():
+    async def main():
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [ValueError] * 3
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# Fit and evaluate the local intent classifier on logged labels.
+#
+#   NLP_INTENT_LOG_PATH=intent_labels.jsonl  (collect labels from live LLM decisions)
+#   python train_intent_classifier.py intent_labels.jsonl
+#   python train_intent_classifier.py more_labels.jsonl --eval-only
+#
+# Input is JSONL with one {"text": ..., "intent": ...} object per line.
+import os
+import sys
+import json
+import argparse
+from collections import Counter
+
+import numpy as np
+
+# Import the NLP package directly: importing Core_Brain would load Whisper and gTTS
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Core_Brain"))
+from nlp_engine.config import SUPPORTED_INTENTS, INTENT_MODEL_PATH, INTENT_CONFIDENCE_THRESHOLD
+from nlp_engine.intent_classifier import LocalIntentClassifier
+
+
+def load_examples(paths):
+    texts, labels = [], []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                text, intent = row.get("text"), row.get("intent", row.get("label"))
+                if text and intent in SUPPORTED_INTENTS:
+                    texts.append(text)
+                    labels.append(intent)
+    return texts, labels
+
+
+def evaluate(classifier, texts, labels, threshold):
+    predictions = classifier.predict_batch(texts)
+    predicted = [intent or "unknown" for intent, _ in predictions]
+    confident = [confidence >= threshold for _, confidence in predictions]
+
+    correct = sum(p == y for p, y in zip(predicted, labels))
+    covered = sum(confident)
+    covered_correct = sum(p == y for p, y, c in zip(predicted, labels, confident) if c)
+
+    print(f"Examples:            {len(labels)}")
+    print(f"Accuracy:            {correct / max(len(labels), 1):.3f}")
+    print(f"Fast-path coverage:  {covered / max(len(labels), 1):.3f}  (confidence >= {threshold})")
+    print(f"Fast-path accuracy:  {covered_correct / max(covered, 1):.3f}")
+    print()
+    print(f"{'intent':<20}{'support':>8}{'precision':>11}{'recall':>8}")
+    for intent in SUPPORTED_INTENTS:
+        support = sum(y == intent for y in labels)
+        predicted_count = sum(p == intent for p in predicted)
+        hits = sum(p == y == intent for p, y in zip(predicted, labels))
+        if support or predicted_count:
+            print(f"{intent:<20}{support:>8}{hits / max(predicted_count, 1):>11.3f}{hits / max(support, 1):>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local intent classifier")
+    parser.add_argument("data", nargs="+", help="JSONL files of {text, intent}")
+    parser.add_argument("--model", default=INTENT_MODEL_PATH, help="where to save/load the .npz model")
+    parser.add_argument("--eval-split", type=float, default=0.2)
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--threshold", type=float, default=INTENT_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--eval-only", action="store_true", help="evaluate an existing model on all data")
+    args = parser.parse_args()
+
+    texts, labels = load_examples(args.data)
+    if not texts:
+        sys.exit("No labelled examples found")
+    print(f"Label distribution: {dict(Counter(labels))}\n")
+
+    if args.eval_only:
+        evaluate(LocalIntentClassifier.load(args.model), texts, labels, args.threshold)
+        return
+
+    order = np.random.default_rng(0).permutation(len(texts))
+    n_eval = int(len(texts) * args.eval_split)
+    eval_idx, train_idx = order[:n_eval], order[n_eval:]
+
+    classifier = LocalIntentClassifier().fit(
+        [texts[i] for i in train_idx], [labels[i] for i in train_idx], epochs=args.epochs
+    )
+
+    if n_eval:
+        evaluate(classifier, [texts[i] for i in eval_idx], [labels[i] for i in eval_idx], args.threshold)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.model)), exist_ok=True)
+    classifier.save(args.model)
+    print(f"\nSaved model to {args.model}")
+
+
+if __name__ == "__main__":
+    main()
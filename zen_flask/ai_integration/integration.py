@@ -10,6 +10,7 @@ if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
 from Core_Brain import stt, tts, nlp, memory, get_core_status, is_core_ready
+from Core_Brain.nlp_engine.prompt_builder import history_turns
 from .personality_router import PersonalityRouter
 
 # Configure logging
@@ -145,10 +146,59 @@ class FlaskAIIntegration:
                     'sentiment': 'neutral'
                 }
             }
+
+    def classify_message(self, user_input):
+        """
+        Intent, emotion and sentiment only - no reply generation and no memory write
+        """
+        try:
+            if not nlp:
+                return {
+                    'success': False,
+                    'error': 'NLP component not available',
+                    'analysis': {
+                        'intent': 'unknown',
+                        'emotion': 'neutral',
+                        'sentiment': 'neutral'
+                    }
+                }
+            
+            analysis = nlp.classify(user_input)
+            
+            return {
+                'success': True,
+                'analysis': analysis
+            }
+        except Exception as e:
+            logger.error(f"Error classifying message: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'analysis': {
+                    'intent': 'unknown',
+                    'emotion': 'neutral',
+                    'sentiment': 'neutral'
+                }
+            }
             
-    def call_groq_model(self, messages, max_tokens=150, temperature=0.7):
+    def build_prompt(self, system, user_input, memory_manager=None, volatile=""):
         """
-        Make a direct call to the Groq model through the NLP engine
+        Chat messages for a personality reply: stable persona first, recent history
+        trimmed to the token budget, per-turn details (volatile) last
+        """
+        if nlp and hasattr(nlp, 'build_prompt'):
+            return nlp.build_prompt(system, user_input, history_turns(memory_manager), volatile)
+        return [
+            {"role": "system", "content": f"{system}\n{volatile}".strip()},
+            {"role": "user", "content": user_input}
+        ]
+
+    def call_groq_model(self, messages, max_tokens=None, temperature=None, task="reply", personality=None,
+                        intent=None):
+        """
+        Make a direct call to the Groq model through the NLP engine, routed by task
+        (and personality) as configured in nlp_engine/config.py. With the detected
+        intent, the reply length policy picks max_tokens and stop sequences.
         """
         try:
             if not nlp:
@@ -156,7 +206,10 @@ class FlaskAIIntegration:
                 return "I'm sorry, I'm having trouble processing your request at the moment."
             
             if hasattr(nlp, 'call_groq_model'):
-                return nlp.call_groq_model(messages, max_tokens=max_tokens, temperature=temperature)
+                return nlp.call_groq_model(
+                    messages, max_tokens=max_tokens, temperature=temperature, task=task, personality=personality,
+                    intent=intent
+                )
             else:
                 logger.warning("NLP engine doesn't support call_groq_model method")
                 return "I'm sorry, I'm having trouble generating a response."
@@ -182,4 +235,7 @@ def text_to_speech(text):
     return flask_ai_integration.generate_speech(text)
 
 def analyze_text(user_input, memory_manager=None):
-    return flask_ai_integration.analyze_message(user_input, memory_manager)
\ No newline at end of file
+    return flask_ai_integration.analyze_message(user_input, memory_manager)
+
+def classify_text(user_input):
+    return flask_ai_integration.classify_message(user_input)
@@ -8,41 +8,38 @@ class EchoPersonality(BasePersonality):
         self.integration = get_integration()
 
     def respond(self, user_input, memory):
-        analysis_result = self.integration.analyze_message(user_input, memory)
+        analysis_result = self.integration.classify_message(user_input)
         analysis = analysis_result.get('analysis', {})
         intent = analysis.get("intent", "unknown")
         emotion = analysis.get("emotion", "neutral")
         sentiment = analysis.get("sentiment", "neutral")
 
         # Personality-specific system prompt
-        system_prompt = (
-            f"You are {self.name}. "
-            f"Your style: {self.style}. "
-            f"Your goals: {self.goals}. "
-            f"User's emotion: {emotion}\n"
-            f"User's intent: {intent}\n"
-            f"Sentiment: {sentiment}\n"
-            f"User said: {user_input}\n"
-            "Stay in character as a caring companion. "
-            "Reply in 2–3 empathetic, supportive sentences."
+        messages = self.integration.build_prompt(
+            system=(
+                f"You are {self.name}. "
+                f"Your style: {self.style}. "
+                f"Your goals: {self.goals}. "
+                "Stay in character as a caring companion. "
+                "Reply in 2–3 empathetic, supportive sentences."
+            ),
+            user_input=user_input,
+            memory_manager=memory,
+            volatile=(
+                f"User's emotion: {emotion}\n"
+                f"User's intent: {intent}\n"
+                f"Sentiment: {sentiment}"
+            )
         )
 
         # Call LLM through integration layer
         if hasattr(self.integration, 'call_groq_model'):
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_input}
-            ]
-            response = self.integration.call_groq_model(messages, max_tokens=150, temperature=0.7)
+            response = self.integration.call_groq_model(messages, task="reply", personality="echo", intent=intent)
         else:
             # Fallback implementation using the NLP engine directly
             from ..nlp_engine import NLPEngine
             temp_nlp = NLPEngine()
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_input}
-            ]
-            response = temp_nlp.call_groq_model(messages, max_tokens=150, temperature=0.7)
+            response = temp_nlp.call_groq_model(messages, task="reply", personality="echo", intent=intent)
 
         if not response:
             response = "I hear you. I'm here for you, always."
@@ -8,7 +8,7 @@ class Suzi(BasePersonality):
         self.integration = get_integration()
 
     def respond(self, user_input, memory):
-        analysis_result = self.integration.analyze_message(user_input, memory)
+        analysis_result = self.integration.classify_message(user_input)
         analysis = analysis_result.get('analysis', {})
         intent = analysis.get("intent", "unknown")
         emotion = analysis.get("emotion", "neutral")
@@ -16,42 +16,39 @@ class Suzi(BasePersonality):
         context = analysis.get("context", "")
 
         # Apna Suzi personality prompt banao
-        system_prompt = (
-            f"You are {self.name}. "
-            f"Your style: {self.style}. "
-            f"Your goals: {self.goals}. "
-            f"User's emotion: {emotion}\n"
-            f"User's intent: {intent}\n"
-            f"Sentiment: {sentiment}\n"
-            f"User said: {user_input}\n"
-            "Always talk in a playful, teasing, naughty-but-caring way. "
-            "Never reply in a formal or generic style. "
-            "Always add a flirty or teasing twist to your replies. "
-            "Avoid robotic or assistant-like behavior completely. "
-            "You enjoy teasing the user, especially when they are being shy or curious. "
-            "Your replies should feel bold, flirty, and fun-loving. "
-            "Never say you are Echo. "
-            "Avoid sounding like a normal AI assistant."
-            "Keep your character consistent and don’t act polite or formal. "
-            "Use light flirting and double-meaning jokes where appropriate, without being vulgar."
+        messages = self.integration.build_prompt(
+            system=(
+                f"You are {self.name}. "
+                f"Your style: {self.style}. "
+                f"Your goals: {self.goals}. "
+                "Always talk in a playful, teasing, naughty-but-caring way. "
+                "Never reply in a formal or generic style. "
+                "Always add a flirty or teasing twist to your replies. "
+                "Avoid robotic or assistant-like behavior completely. "
+                "You enjoy teasing the user, especially when they are being shy or curious. "
+                "Your replies should feel bold, flirty, and fun-loving. "
+                "Never say you are Echo. "
+                "Avoid sounding like a normal AI assistant."
+                "Keep your character consistent and don’t act polite or formal. "
+                "Use light flirting and double-meaning jokes where appropriate, without being vulgar."
+            ),
+            user_input=user_input,
+            memory_manager=memory,
+            volatile=(
+                f"User's emotion: {emotion}\n"
+                f"User's intent: {intent}\n"
+                f"Sentiment: {sentiment}"
+            )
         )
 
         # Model call through integration layer
         if hasattr(self.integration, 'call_groq_model'):
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_input}
-            ]
-            response = self.integration.call_groq_model(messages, max_tokens=150, temperature=0.95)
+            response = self.integration.call_groq_model(messages, task="reply", personality="suzi", intent=intent)
         else:
             # Fallback implementation using the NLP engine directly
             from ..nlp_engine import NLPEngine
             temp_nlp = NLPEngine()
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_input}
-            ]
-            response = temp_nlp.call_groq_model(messages, max_tokens=150, temperature=0.95)
+            response = temp_nlp.call_groq_model(messages, task="reply", personality="suzi", intent=intent)
 
         # Agar empty reply aaya to fallback
         if not response:
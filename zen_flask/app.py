@@ -1,11 +1,18 @@
 import os
 import json
+import time
 import uuid
 import datetime
 import logging
-from flask import Flask, render_template, request, jsonify, make_response, url_for, redirect
+from flask import Flask, render_template, request, jsonify, make_response, url_for, redirect, Response, stream_with_context, g
 import requests
 
+try:
+    from .session_store import create_session_store
+except ImportError:
+    # Run from inside zen_flask (python app.py, gunicorn app:app)
+    from session_store import create_session_store
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,8 +52,13 @@ except ImportError:
 except Exception as e:
     logger.error(f"Firebase initialization failed: {e}")
 
-# In-memory storage for user sessions (use Redis/database in production)
-user_sessions = {}
+# Per-user sessions; SESSION_STORE=redis or sqlite shares them between workers
+session_store = create_session_store()
+
+# Longest anonymous ID accepted from a client
+MAX_ANONYMOUS_ID = 64
+
+_EPOCH = datetime.datetime(1970, 1, 1)
 
 class SimpleMemoryManager:
     """Simplified memory manager that doesn't depend on external modules"""
@@ -67,28 +79,88 @@ class SimpleMemoryManager:
     def get_context(self):
         return self.conversations[-3:] if self.conversations else []
 
-def get_user_memory(user_id):
-    """Get or create user memory manager"""
-    if user_id not in user_sessions:
-        user_sessions[user_id] = {
-            'memory': SimpleMemoryManager(),
-            'last_active': datetime.datetime.utcnow()
+    def to_state(self):
+        """Compact JSON-serializable form for the session store"""
+        return {
+            'c': [
+                [(item['timestamp'] - _EPOCH).total_seconds(), item['user'], item['ai']]
+                for item in self.conversations
+            ],
+            'x': self.user_context
         }
+
+    @classmethod
+    def from_state(cls, state):
+        memory = cls()
+        memory.conversations = [
+            {'timestamp': _EPOCH + datetime.timedelta(seconds=ts), 'user': user, 'ai': ai}
+            for ts, user, ai in state.get('c', [])
+        ]
+        memory.user_context = state.get('x', {})
+        return memory
+
+def get_user_memory(user_id):
+    """Get or create user memory manager; loaded once per request and written back after it"""
+    session_store.start_maintenance()  # expired sessions are dropped in the background
+    memories = g.setdefault('user_memories', {})
+    if user_id not in memories:
+        try:
+            state = session_store.get(user_id)
+        except Exception as e:
+            logger.error(f"Session store read failed for {user_id}: {e}")
+            state = None
+        memories[user_id] = SimpleMemoryManager.from_state(state) if state else SimpleMemoryManager()
+    return memories[user_id]
+
+def save_user_memory(user_id, user_memory):
+    """Write a session back to the store, marking it active now"""
+    state = user_memory.to_state()
+    state['t'] = time.time()
+    try:
+        session_store.put(user_id, state)
+    except Exception as e:
+        logger.error(f"Session store write failed for {user_id}: {e}")
+
+@app.after_request
+def write_back_sessions(response):
+    """Persist the sessions this request touched"""
+    for user_id, user_memory in g.pop('user_memories', {}).items():
+        save_user_memory(user_id, user_memory)
+    # Hand the anonymous ID back so the client reuses one session instead of starting a new one per request
+    if 'anonymous_id' in g:
+        response.headers['X-Anonymous-Id'] = g.anonymous_id
+    return response
+
+def resolve_user_id(data):
+    """Firebase uid for signed-in users, otherwise the client's anonymous ID"""
+    user_id = None
+    if FIREBASE_ENABLED:
+        session_cookie = request.cookies.get('session')
+        if session_cookie:
+            try:
+                decoded_token = auth.verify_session_cookie(session_cookie, check_revoked=True)
+                user_id = decoded_token['uid']
+            except:
+                pass
     
-    # Update last active time
-    user_sessions[user_id]['last_active'] = datetime.datetime.utcnow()
-    return user_sessions[user_id]['memory']
-
-def cleanup_old_sessions():
-    """Clean up sessions older than 24 hours"""
-    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=24)
-    old_sessions = [
-        user_id for user_id, session in user_sessions.items()
-        if session['last_active'] < cutoff
+    # Use anonymous ID if not authenticated
+    if not user_id:
+        user_id = str(data.get('anonymous_id') or '')[:MAX_ANONYMOUS_ID] or f"anon_{uuid.uuid4().hex}"
+        g.anonymous_id = user_id
+    return user_id
+
+def context_payload(user_memory):
+    """Recent interactions in a JSON-serializable form for the backend API"""
+    return [
+        {'timestamp': item['timestamp'].isoformat(), 'user': item['user'], 'ai': item['ai']}
+        for item in user_memory.get_context()
     ]
-    for user_id in old_sessions:
-        del user_sessions[user_id]
-    logger.info(f"Cleaned up {len(old_sessions)} old sessions")
+
+def fallback_reply(user_input, context):
+    """Reply used when the AI backend cannot be reached"""
+    if context:
+        return f"I understand you're saying '{user_input}'. I remember our recent conversation, but my AI backend is currently unavailable. This is a fallback response."
+    return f"Hello! I received your message: '{user_input}'. My AI backend is currently unavailable, so this is a fallback response. How can I help you?"
 
 # Routes
 @app.route('/')
@@ -199,19 +271,7 @@ def get_ai_response():
         personality_name = data.get('personality', 'echo')
         
         # Get user ID for memory management
-        user_id = None
-        if FIREBASE_ENABLED:
-            session_cookie = request.cookies.get('session')
-            if session_cookie:
-                try:
-                    decoded_token = auth.verify_session_cookie(session_cookie, check_revoked=True)
-                    user_id = decoded_token['uid']
-                except:
-                    pass
-        
-        # Use anonymous ID if not authenticated
-        if not user_id:
-            user_id = data.get('anonymous_id', f"anon_{uuid.uuid4().hex[:8]}")
+        user_id = resolve_user_id(data)
         
         # Get user memory
         user_memory = get_user_memory(user_id)
@@ -223,7 +283,8 @@ def get_ai_response():
                 json={
                     'message': user_input,
                     'personality': personality_name,
-                    'context': user_memory.get_context()
+                    'session_id': user_id,
+                    'context': context_payload(user_memory)
                 },
                 timeout=30
             )
@@ -245,11 +306,7 @@ def get_ai_response():
             logger.error(f"Backend API failed: {e}")
         
         # Fallback response with simple context awareness
-        context = user_memory.get_context()
-        if context:
-            fallback_response = f"I understand you're saying '{user_input}'. I remember our recent conversation, but my AI backend is currently unavailable. This is a fallback response."
-        else:
-            fallback_response = f"Hello! I received your message: '{user_input}'. My AI backend is currently unavailable, so this is a fallback response. How can I help you?"
+        fallback_response = fallback_reply(user_input, user_memory.get_context())
         
         # Store interaction
         user_memory.add_interaction(user_input, fallback_response)
@@ -268,6 +325,77 @@ def get_ai_response():
             'success': False
         }), 500
 
+@app.route('/get_ai_response/stream', methods=['POST'])
+def get_ai_response_stream():
+    """Proxy the backend's Server-Sent-Events reply stream to the browser"""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+    
+    user_input = data.get('message')
+    if not user_input:
+        return jsonify({'error': 'No message provided'}), 400
+
+    personality_name = data.get('personality', 'echo')
+    user_id = resolve_user_id(data)
+    user_memory = get_user_memory(user_id)
+
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    def generate():
+        tokens = []
+        final_response = None
+        try:
+            with requests.post(
+                f"{BACKEND_API_URL}/api/response/stream",
+                json={
+                    'message': user_input,
+                    'personality': personality_name,
+                    'session_id': user_id,
+                    'context': context_payload(user_memory)
+                },
+                stream=True,
+                timeout=(5, 60)
+            ) as response:
+                response.raise_for_status()
+
+                event = "message"
+                for line in response.iter_lines(decode_unicode=True):
+                    # Forward every line as-is; blank lines terminate SSE events
+                    yield f"{line}\n"
+
+                    if not line:
+                        event = "message"
+                    elif line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:"):
+                        payload = json.loads(line[len("data:"):].strip())
+                        if event == "token":
+                            tokens.append(payload.get("token", ""))
+                        elif event == "done":
+                            final_response = payload.get("response")
+
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Backend stream failed: {e}")
+            if not tokens:
+                final_response = fallback_reply(user_input, user_memory.get_context())
+                yield sse("token", {'token': final_response})
+                yield sse("done", {'response': final_response, 'source': 'fallback'})
+
+        # Store the interaction once the stream has completed; the request's
+        # write-back already ran when the response started, so save explicitly
+        ai_response = final_response if final_response is not None else "".join(tokens)
+        if ai_response:
+            user_memory.add_interaction(user_input, ai_response)
+            save_user_memory(user_id, user_memory)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/text-to-speech', methods=['POST'])
 def text_to_speech_route():
     try:
@@ -356,13 +484,14 @@ def session_logout():
 @app.route('/health')
 def health_check():
     """Health check endpoint for monitoring"""
-    cleanup_old_sessions()  # Clean up old sessions
-    
+    sessions = session_store.get_stats()
     return jsonify({
         'status': 'healthy',
         'firebase_enabled': FIREBASE_ENABLED,
         'backend_url': BACKEND_API_URL,
-        'active_sessions': len(user_sessions),
+        'session_store': session_store.name,
+        'active_sessions': sessions['live'],
+        'sessions': sessions,
         'timestamp': datetime.datetime.utcnow().isoformat()
     })
 
@@ -397,7 +526,7 @@ def not_found(error):
         'error': 'Not found',
         'message': 'The requested resource was not found',
         'available_endpoints': [
-            '/', '/health', '/api/status', '/chat', '/get_ai_response'
+            '/', '/health', '/api/status', '/chat', '/get_ai_response', '/get_ai_response/stream'
         ]
     }), 404
 
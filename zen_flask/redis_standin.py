@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# Local stand-in for Redis: the handful of commands the session store uses, over the real protocol.
+#
+#   python zen_flask/redis_standin.py --port 6390
+#   SESSION_STORE=redis SESSION_REDIS_URL=redis://127.0.0.1:6390/0 python zen_flask/app.py
+#
+# Keys live in this process's memory and honour expiry. Supported: PING, AUTH,
+# SELECT, GET, SET (EX/PX), DEL, EXISTS, EXPIRE, TTL, SCAN (MATCH/COUNT),
+# DBSIZE, FLUSHDB. Not for production use.
+import time
+import fnmatch
+import argparse
+import threading
+import socketserver
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, RespHandler)
+        self.lock = threading.Lock()
+        self.data = {}      # key -> bytes
+        self.expires = {}   # key -> monotonic deadline
+
+    def live(self, key):
+        """True if key exists and has not expired; the caller holds the lock."""
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()  # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def reply(self, value):
+        if value is None:
+            data = b'$-1\r\n'
+        elif isinstance(value, bool):
+            data = b'+OK\r\n'
+        elif isinstance(value, int):
+            data = b':%d\r\n' % value
+        elif isinstance(value, Exception):
+            data = b'-ERR %s\r\n' % str(value).encode()
+        elif isinstance(value, list):
+            self.wfile.write(b'*%d\r\n' % len(value))
+            for item in value:
+                self.reply(item)
+            return
+        else:
+            data = b'$%d\r\n%s\r\n' % (len(value), value)
+        self.wfile.write(data)
+
+    def handle(self):
+        try:
+            while True:
+                args = self.read_command()
+                if args is None:
+                    return
+                if not args:
+                    continue
+                try:
+                    self.reply(self.dispatch(args[0].upper().decode(), args[1:]))
+                except (ValueError, IndexError) as e:
+                    self.reply(ValueError(f"wrong arguments: {e}"))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def dispatch(self, command, args):
+        server = self.server
+        with server.lock:
+            if command == 'PING':
+                return b'PONG'
+            if command in ('AUTH', 'SELECT'):
+                return True
+            if command == 'GET':
+                return server.data[args[0]] if server.live(args[0]) else None
+            if command == 'SET':
+                key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+                server.data[key] = value
+                server.expires.pop(key, None)
+                if b'EX' in options:
+                    server.expires[key] = time.monotonic() + int(args[2 + options.index(b'EX') + 1])
+                elif b'PX' in options:
+                    server.expires[key] = time.monotonic() + int(args[2 + options.index(b'PX') + 1]) / 1000
+                return True
+            if command == 'DEL':
+                removed = 0
+                for key in args:
+                    if server.live(key):
+                        del server.data[key]
+                        server.expires.pop(key, None)
+                        removed += 1
+                return removed
+            if command == 'EXISTS':
+                return sum(1 for key in args if server.live(key))
+            if command == 'EXPIRE':
+                if not server.live(args[0]):
+                    return 0
+                server.expires[args[0]] = time.monotonic() + int(args[1])
+                return 1
+            if command == 'TTL':
+                if not server.live(args[0]):
+                    return -2
+                deadline = server.expires.get(args[0])
+                return -1 if deadline is None else int(round(deadline - time.monotonic()))
+            if command == 'SCAN':
+                # Every live key in one page; cursor is always 0 afterwards
+                options = [a.upper() for a in args[1:]]
+                pattern = args[1 + options.index(b'MATCH') + 1].decode() if b'MATCH' in options else '*'
+                keys = [key for key in list(server.data)
+                        if server.live(key) and fnmatch.fnmatchcase(key.decode(), pattern)]
+                return [b'0', keys]
+            if command == 'DBSIZE':
+                return sum(1 for key in list(server.data) if server.live(key))
+            if command == 'FLUSHDB':
+                server.data.clear()
+                server.expires.clear()
+                return True
+        return ValueError(f"unknown command '{command}'")
+
+
+def start_redis_standin(host='127.0.0.1', port=0):
+    """Serve on a background thread; returns (server, redis:// URL)."""
+    server = RedisStandIn((host, port))
+    threading.Thread(target=server.serve_forever, name="redis-standin", daemon=True).start()
+    return server, f"redis://{host}:{server.server_address[1]}/0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Redis stand-in for the zen_flask session store")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    server = RedisStandIn((args.host, args.port))
+    print(f"Redis stand-in on redis://{args.host}:{args.port}/0")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
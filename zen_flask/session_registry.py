@@ -0,0 +1,124 @@
+# In-process session registry with bounded memory: heap-ordered expiry and LRU budgets
+import copy
+import time
+import heapq
+import threading
+from collections import OrderedDict
+
+_HEAP_SLACK = 1024  # stale heap entries tolerated beyond one per live session before a rebuild
+
+
+def approx_bytes(state):
+    """Rough in-memory footprint of a session state: its text plus per-object overhead."""
+    size = 200
+    for _, user, ai in state.get('c', ()):
+        size += 120 + len(user) + len(ai)
+    for key, value in state.get('x', {}).items():
+        size += 100 + len(str(key)) + len(str(value))
+    return size
+
+
+class SessionRegistry:
+    """
+    Session states by user id, bounded in count and approximate bytes.
+
+    Expiry is a min-heap of (expires_at, user_id). Writing a session pushes a
+    new heap entry in O(log n) and leaves the old one behind; expire() pops
+    due entries and skips those that no longer match the session, so a sweep
+    costs O(log n) per popped entry instead of a scan of every session. The
+    heap is rebuilt when stale entries pile up.
+
+    Past max_entries sessions or max_bytes, the least recently used sessions
+    are evicted, so memory stays bounded whatever the traffic.
+
+    States go in and come out as copies, like the stores that serialize them:
+    a caller changing its state after put() or a state from get() cannot grow
+    a stored session past what its byte count says.
+    """
+    def __init__(self, ttl_seconds, max_entries, max_bytes):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # user id -> [state, approximate bytes, expires_at], least recently used first
+        self._entries = OrderedDict()
+        self._heap = []
+        self.bytes = 0
+        self.stats = {"expired": 0, "evicted": 0, "evicted_bytes": 0, "sweeps": 0, "heap_rebuilds": 0}
+
+    def _remove(self, user_id):
+        state, size, _ = self._entries.pop(user_id)
+        self.bytes -= size
+        return size
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                self._remove(user_id)
+                self.stats["expired"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            state = entry[0]
+        return copy.deepcopy(state)
+
+    def put(self, user_id, state):
+        state = copy.deepcopy(state)
+        size = approx_bytes(state)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            if user_id in self._entries:
+                self._remove(user_id)
+            self._entries[user_id] = [state, size, expires_at]
+            self.bytes += size
+            heapq.heappush(self._heap, (expires_at, user_id))
+
+            while (len(self._entries) > self.max_entries or self.bytes > self.max_bytes) and len(self._entries) > 1:
+                evicted_id = next(iter(self._entries))
+                self.stats["evicted_bytes"] += self._remove(evicted_id)
+                self.stats["evicted"] += 1
+
+            if len(self._heap) > 2 * len(self._entries) + _HEAP_SLACK:
+                self._heap = [(entry[2], entry_id) for entry_id, entry in self._entries.items()]
+                heapq.heapify(self._heap)
+                self.stats["heap_rebuilds"] += 1
+
+    def delete(self, user_id):
+        with self._lock:
+            if user_id in self._entries:
+                self._remove(user_id)
+
+    def expire(self, now=None):
+        """Drop every session past its expiry; returns how many were dropped."""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, user_id = heapq.heappop(self._heap)
+                entry = self._entries.get(user_id)
+                # A rewritten or evicted session left this heap entry behind
+                if entry is not None and entry[2] == expires_at:
+                    self._remove(user_id)
+                    removed += 1
+            self.stats["expired"] += removed
+            self.stats["sweeps"] += 1
+        return removed
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(
+                self.stats,
+                live=len(self._entries),
+                bytes=self.bytes,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes,
+                heap_size=len(self._heap),
+                ttl_seconds=self.ttl_seconds
+            )
@@ -0,0 +1,384 @@
+# Where zen_flask keeps per-user chat sessions, so every web worker sees the same ones
+import os
+import json
+import time
+import zlib
+import socket
+import sqlite3
+import logging
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+try:
+    from .session_registry import SessionRegistry
+except ImportError:
+    from session_registry import SessionRegistry
+
+logger = logging.getLogger(__name__)
+
+# "memory" (this process only), "redis" (SESSION_REDIS_URL) or "sqlite" (SESSION_DB_PATH, one host)
+SESSION_STORE = os.environ.get('SESSION_STORE', 'memory').lower()
+SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+SESSION_DB_PATH = os.environ.get(
+    'SESSION_DB_PATH', os.path.join(tempfile.gettempdir(), 'zen_sessions.sqlite3')
+)
+# Sessions idle longer than this are dropped
+SESSION_TTL_HOURS = float(os.environ.get('SESSION_TTL_HOURS', '24'))
+# The in-process store keeps at most this many sessions and roughly this many bytes,
+# evicting the least recently used beyond either
+SESSION_MAX_ENTRIES = int(os.environ.get('SESSION_MAX_ENTRIES', '10000'))
+SESSION_MAX_BYTES = int(os.environ.get('SESSION_MAX_BYTES', str(64 * 1024 * 1024)))
+# How often (seconds) a background thread drops expired sessions
+SESSION_SWEEP_SECONDS = float(os.environ.get('SESSION_SWEEP_SECONDS', '60'))
+# Set when SESSION_REDIS_URL's db holds nothing but sessions, so DBSIZE counts them
+SESSION_REDIS_DEDICATED_DB = os.environ.get('SESSION_REDIS_DEDICATED_DB', '0') == '1'
+
+_COMPRESS_OVER = 512  # bytes of JSON above which a session is zlib-compressed
+
+
+def encode_session(state):
+    """
+    Compact bytes for a session state dict: JSON without whitespace, zlib-compressed
+    when large. The first byte says which (b"j" or b"z").
+    """
+    raw = json.dumps(state, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    if len(raw) > _COMPRESS_OVER:
+        return b'z' + zlib.compress(raw)
+    return b'j' + raw
+
+
+def decode_session(data):
+    data = bytes(data)
+    raw = zlib.decompress(data[1:]) if data[:1] == b'z' else data[1:]
+    return json.loads(raw)
+
+
+class SessionStore:
+    """
+    Session states by user id. A state is a JSON-serializable dict whose "t"
+    is its last-active time (epoch seconds). Stores that hold bytes use
+    encode_session / decode_session.
+    """
+    name = "base"
+    # Whether cleanup() has work to do, so the maintenance thread is worth running
+    needs_maintenance = True
+
+    def __init__(self, ttl_seconds=SESSION_TTL_HOURS * 3600):
+        self.ttl_seconds = ttl_seconds
+        self._maintenance_pid = None
+        self.maintenance_stats = {"runs": 0, "removed": 0, "errors": 0}
+
+    def get(self, user_id):
+        raise NotImplementedError
+
+    def put(self, user_id, state):
+        raise NotImplementedError
+
+    def delete(self, user_id):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def live_count(self):
+        """Session count for stats and health checks: cheap, and approximate where counting is not."""
+        return self.count()
+
+    def cleanup(self):
+        """Drop sessions idle past the TTL; returns how many were dropped."""
+        return 0
+
+    def refresh_stats(self):
+        """Recompute stats too costly for a request; run by the maintenance thread after cleanup()."""
+
+    def start_maintenance(self, interval=SESSION_SWEEP_SECONDS):
+        """
+        Run cleanup() every `interval` seconds on a daemon thread. Cheap to call
+        on every request: the thread starts once per process, and again after a fork.
+        """
+        if not self.needs_maintenance or self._maintenance_pid == os.getpid():
+            return
+        self._maintenance_pid = os.getpid()
+        threading.Thread(target=self._maintain, args=(interval,), name="session-maintenance", daemon=True).start()
+
+    def _maintain(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                removed = self.cleanup()
+                self.refresh_stats()
+                self.maintenance_stats["runs"] += 1
+                self.maintenance_stats["removed"] += removed
+            except Exception as e:
+                self.maintenance_stats["errors"] += 1
+                logger.error(f"Session cleanup failed: {e}")
+
+    def get_stats(self):
+        return dict(store=self.name, live=self.live_count(), maintenance=dict(self.maintenance_stats))
+
+
+class InProcessSessionStore(SessionStore):
+    """
+    Sessions in this process (single-worker deployments and development), held
+    in a SessionRegistry so memory stays bounded: expired sessions are swept by
+    the maintenance thread and the least recently used are evicted past the
+    entry or byte budget.
+    """
+    name = "memory"
+
+    def __init__(self, ttl_seconds=SESSION_TTL_HOURS * 3600,
+                 max_entries=SESSION_MAX_ENTRIES, max_bytes=SESSION_MAX_BYTES):
+        super().__init__(ttl_seconds)
+        self.registry = SessionRegistry(ttl_seconds, max_entries, max_bytes)
+
+    def get(self, user_id):
+        return self.registry.get(user_id)
+
+    def put(self, user_id, state):
+        self.registry.put(user_id, state)
+
+    def delete(self, user_id):
+        self.registry.delete(user_id)
+
+    def count(self):
+        return len(self.registry)
+
+    def cleanup(self):
+        return self.registry.expire()
+
+    def get_stats(self):
+        return dict(self.registry.get_stats(), store=self.name, maintenance=dict(self.maintenance_stats))
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite file in WAL mode, shared by every worker on one host
+    without running another service. Triggers keep a row count in session_count,
+    so count() is one primary-key read.
+    """
+    name = "sqlite"
+
+    def __init__(self, path=SESSION_DB_PATH, ttl_seconds=SESSION_TTL_HOURS * 3600):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in (
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    user_id TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    last_active REAL NOT NULL
+                )
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions (last_active)",
+                "CREATE TABLE IF NOT EXISTS session_count (id INTEGER PRIMARY KEY CHECK (id = 0), n INTEGER NOT NULL)",
+                """
+                CREATE TRIGGER IF NOT EXISTS sessions_count_insert AFTER INSERT ON sessions
+                BEGIN UPDATE session_count SET n = n + 1; END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS sessions_count_delete AFTER DELETE ON sessions
+                BEGIN UPDATE session_count SET n = n - 1; END
+                """,
+            ):
+                conn.execute(statement)
+            # Under the write lock, so a file from before the counter is counted once
+            if conn.execute("SELECT 1 FROM session_count").fetchone() is None:
+                conn.execute("INSERT INTO session_count (id, n) SELECT 0, COUNT(*) FROM sessions")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _connect(self):
+        # sqlite3 connections must not cross threads or forks
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, user_id):
+        row = self._connect().execute("SELECT data FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+        return decode_session(row[0]) if row else None
+
+    def put(self, user_id, state):
+        # An upsert, not INSERT OR REPLACE, so rewriting a session leaves the count alone
+        self._connect().execute(
+            "INSERT INTO sessions (user_id, data, last_active) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET data = excluded.data, last_active = excluded.last_active",
+            (user_id, encode_session(state), state['t'])
+        )
+
+    def delete(self, user_id):
+        self._connect().execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    def count(self):
+        return self._connect().execute("SELECT n FROM session_count WHERE id = 0").fetchone()[0]
+
+    def cleanup(self):
+        cursor = self._connect().execute(
+            "DELETE FROM sessions WHERE last_active < ?", (time.time() - self.ttl_seconds,)
+        )
+        return cursor.rowcount
+
+
+class RedisError(Exception):
+    """An error reply from the server."""
+
+
+class RespClient:
+    """
+    Minimal Redis protocol (RESP2) client: one connection per thread, reconnected
+    after a fork or a dropped connection. Enough for the session store; not a
+    general Redis client.
+    """
+    def __init__(self, url=SESSION_REDIS_URL, timeout=2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (sock, sock.makefile('rb'))
+            self._local.pid = os.getpid()
+            if self.password:
+                self._send(conn, 'AUTH', self.password)
+            if self.db:
+                self._send(conn, 'SELECT', self.db)
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            elif not isinstance(arg, (bytes, bytearray)):
+                arg = str(arg).encode('ascii')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RedisError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            size = int(rest)
+            if size < 0:
+                return None
+            data = reader.read(size + 2)
+            return data[:-2]
+        if kind == b'*':
+            size = int(rest)
+            return None if size < 0 else [self._read(reader) for _ in range(size)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _send(self, conn, *args):
+        conn[0].sendall(self._encode(args))
+        return self._read(conn[1])
+
+    def execute(self, *args):
+        """Send one command and return its reply; a stale connection is retried once."""
+        for attempt in range(2):
+            try:
+                return self._send(self._connection(), *args)
+            except (ConnectionError, socket.timeout, OSError):
+                self._close()
+                if attempt:
+                    raise
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions in Redis (or anything speaking its protocol), shared by every web
+    worker on every host. Keys expire after the TTL, so cleanup is Redis's job.
+    On a dedicated db the sessions are counted with DBSIZE; otherwise counting
+    scans every key, so stats report the count of the last maintenance run.
+    """
+    name = "redis"
+    prefix = "zen:session:"
+
+    def __init__(self, url=SESSION_REDIS_URL, ttl_seconds=SESSION_TTL_HOURS * 3600,
+                 dedicated_db=SESSION_REDIS_DEDICATED_DB):
+        super().__init__(ttl_seconds)
+        self.client = RespClient(url)
+        self.dedicated_db = dedicated_db
+        # Only the count needs the maintenance thread
+        self.needs_maintenance = not dedicated_db
+        self._live = None
+
+    def get(self, user_id):
+        data = self.client.execute('GET', self.prefix + user_id)
+        return decode_session(data) if data is not None else None
+
+    def put(self, user_id, state):
+        self.client.execute('SET', self.prefix + user_id, encode_session(state), 'EX', max(1, int(self.ttl_seconds)))
+
+    def delete(self, user_id):
+        self.client.execute('DEL', self.prefix + user_id)
+
+    def count(self):
+        if self.dedicated_db:
+            return self.client.execute('DBSIZE')
+        cursor, total = b'0', 0
+        while True:
+            cursor, keys = self.client.execute('SCAN', cursor, 'MATCH', self.prefix + '*', 'COUNT', 1000)
+            total += len(keys)
+            if cursor in (b'0', '0'):
+                return total
+
+    def live_count(self):
+        # None until the first maintenance run has counted
+        return self.count() if self.dedicated_db else self._live
+
+    def refresh_stats(self):
+        self._live = self.count()
+
+
+STORES = {
+    "memory": InProcessSessionStore,
+    "redis": RedisSessionStore,
+    "sqlite": SQLiteSessionStore,
+}
+
+
+def create_session_store(name=None):
+    """The store named by SESSION_STORE (or `name`)."""
+    name = (name or SESSION_STORE).lower()
+    if name not in STORES:
+        raise ValueError(f"Unknown session store '{name}'; expected one of {sorted(STORES)}")
+    store = STORES[name]()
+    logger.info(f"Session store: {name}")
+    return store